@@ -11,6 +11,7 @@ from .document_processor import DocumentProcessor
 from .embeddings import EmbeddingGenerator
 from .vector_database import VectorDatabase
 from .llm_integration import RAGPipeline, SageMakerLLM, LocalLLM
+from .sagemaker_streaming import AsyncSageMakerLLM
 
 __all__ = [
     "settings",
@@ -19,5 +20,6 @@ __all__ = [
     "VectorDatabase",
     "RAGPipeline",
     "SageMakerLLM",
-    "LocalLLM"
+    "LocalLLM",
+    "AsyncSageMakerLLM"
 ]
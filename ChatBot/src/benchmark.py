@@ -0,0 +1,359 @@
+"""
+Benchmark Module for RAG Chatbot
+Measures ingestion throughput, retrieval latency and end-to-end /query latency
+against a synthetic corpus and a local stub LLM server that mimics the Ollama API
+"""
+import json
+import logging
+import random
+import socket
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+import requests
+
+from .config import settings
+from .document_processor import DocumentProcessor
+from .vector_database import VectorDatabase, ChromaDBStore
+from .llm_integration import RAGPipeline, LocalLLM
+
+logger = logging.getLogger(__name__)
+
+# Vocabulary for synthetic documents; topics keep retrieval queries meaningful
+SYNTHETIC_TOPICS = {
+    "machine learning": ["model", "training", "gradient", "feature", "dataset", "overfitting", "validation"],
+    "cloud computing": ["instance", "region", "autoscaling", "container", "storage", "latency", "endpoint"],
+    "energy markets": ["price", "demand", "forecast", "imbalance", "auction", "delivery", "capacity"],
+    "databases": ["index", "query", "transaction", "replica", "partition", "schema", "cache"],
+    "networking": ["packet", "router", "bandwidth", "protocol", "firewall", "throughput", "socket"],
+}
+FILLER_WORDS = ["the", "a", "of", "and", "with", "for", "in", "on", "by", "is", "uses", "improves"]
+
+
+def generate_synthetic_corpus(output_dir: str, num_docs: int = 50,
+                              paragraphs_per_doc: int = 8, seed: int = 42) -> List[str]:
+    """Write a reproducible synthetic corpus of TXT and HTML files and return their paths"""
+    rng = random.Random(seed)
+    topics = list(SYNTHETIC_TOPICS)
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+
+    file_paths = []
+    for doc_idx in range(num_docs):
+        topic = topics[doc_idx % len(topics)]
+        keywords = SYNTHETIC_TOPICS[topic]
+
+        paragraphs = []
+        for _ in range(paragraphs_per_doc):
+            sentences = []
+            for _ in range(rng.randint(4, 8)):
+                words = [rng.choice(keywords if rng.random() < 0.4 else FILLER_WORDS)
+                         for _ in range(rng.randint(8, 16))]
+                sentences.append(f"{topic.capitalize()} {' '.join(words)}.")
+            paragraphs.append(" ".join(sentences))
+
+        # Alternate formats so parsing covers more than one loader
+        if doc_idx % 2 == 0:
+            file_path = Path(output_dir) / f"synthetic_{doc_idx:04d}.txt"
+            file_path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+        else:
+            file_path = Path(output_dir) / f"synthetic_{doc_idx:04d}.html"
+            body = "".join(f"<p>{p}</p>" for p in paragraphs)
+            file_path.write_text(f"<html><head><title>{topic}</title></head><body>{body}</body></html>",
+                                 encoding="utf-8")
+        file_paths.append(str(file_path))
+
+    logger.info(f"Generated synthetic corpus with {len(file_paths)} documents in {output_dir}")
+    return file_paths
+
+
+def generate_synthetic_queries(num_queries: int = 100, seed: int = 7) -> List[str]:
+    """Generate questions that mention the synthetic corpus topics"""
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(num_queries):
+        topic = rng.choice(list(SYNTHETIC_TOPICS))
+        keyword = rng.choice(SYNTHETIC_TOPICS[topic])
+        queries.append(f"How does {keyword} relate to {topic}?")
+    return queries
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    """Summarize latency samples (seconds) as milliseconds"""
+    if not samples:
+        return {"count": 0}
+    values = np.array(samples) * 1000.0
+    return {
+        "count": len(samples),
+        "mean_ms": float(np.mean(values)),
+        "p50_ms": float(np.percentile(values, 50)),
+        "p99_ms": float(np.percentile(values, 99)),
+        "max_ms": float(np.max(values)),
+    }
+
+
+class _StubOllamaHandler(BaseHTTPRequestHandler):
+    """Request handler implementing the subset of the Ollama API used by OllamaClient"""
+
+    def _send_json(self, payload: Dict[str, Any], status: int = 200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_json(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self._send_json({"models": [{"name": self.server.model_name, "size": 0, "details": {}}]})
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        request = self._read_json()
+        time.sleep(self.server.latency_s)
+        answer = " ".join(["stub"] * self.server.response_tokens)
+
+        if self.path == "/api/chat":
+            self._send_json({
+                "model": request.get("model", self.server.model_name),
+                "message": {"role": "assistant", "content": answer},
+                "done": True,
+            })
+        elif self.path == "/api/generate":
+            self._send_json({
+                "model": request.get("model", self.server.model_name),
+                "response": answer,
+                "done": True,
+            })
+        else:
+            self._send_json({"error": "not found"}, status=404)
+
+    def log_message(self, format, *args):
+        """Silence per-request logging"""
+        pass
+
+
+class StubOllamaServer:
+    """Local HTTP server that mimics the Ollama API with a fixed generation latency"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency_ms: float = 50.0,
+                 response_tokens: int = 64, model_name: Optional[str] = None):
+        self.httpd = ThreadingHTTPServer((host, port), _StubOllamaHandler)
+        self.httpd.latency_s = latency_ms / 1000.0
+        self.httpd.response_tokens = response_tokens
+        self.httpd.model_name = model_name or settings.ollama_model_name
+        self.thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve requests from a background thread"""
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self.thread.start()
+        logger.info(f"Stub Ollama server listening on {self.base_url}")
+
+    def stop(self):
+        """Shut down the server"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def _free_port(host: str = "127.0.0.1") -> int:
+    """Ask the OS for an unused TCP port"""
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def _create_vector_db(store_type: str) -> VectorDatabase:
+    """Create a vector database isolated from the application's persisted data"""
+    store = None
+    if store_type == "chroma":
+        # Use a throwaway collection so benchmark runs never open or touch real documents
+        store = ChromaDBStore(collection_name=f"benchmark_{uuid.uuid4().hex}")
+    vector_db = VectorDatabase(store_type, store=store)
+
+    try:
+        # Load the model up front so ingestion timings do not include it
+        vector_db.warm_up()
+    except Exception:
+        _drop_vector_db(vector_db)
+        raise
+    return vector_db
+
+
+def _drop_vector_db(vector_db: VectorDatabase):
+    """Remove benchmark data from persistent stores"""
+    if isinstance(vector_db.store, ChromaDBStore):
+        vector_db.store.client.delete_collection(vector_db.store.collection_name)
+
+
+def benchmark_ingestion(processor: DocumentProcessor, vector_db: VectorDatabase,
+                        file_paths: List[str]) -> Dict[str, Any]:
+    """Time the parse, chunk, embed and index stages separately"""
+    start = time.perf_counter()
+    texts = [(file_path, processor.load_document(file_path)) for file_path in file_paths]
+    parse_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    documents = []
+    for file_path, text in texts:
+        metadata = {"source": file_path, "filename": Path(file_path).name, "file_type": Path(file_path).suffix}
+        documents.extend(processor.chunk_text(text, metadata))
+    chunk_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    embeddings = vector_db.embedder.encode_documents(documents)
+    embed_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    vector_db.store.add_documents(documents, embeddings)
+    index_s = time.perf_counter() - start
+
+    total_s = parse_s + chunk_s + embed_s + index_s
+    total_bytes = sum(len(text.encode("utf-8")) for _, text in texts)
+    return {
+        "documents": len(file_paths),
+        "chunks": len(documents),
+        "bytes": total_bytes,
+        "parse_s": parse_s,
+        "chunk_s": chunk_s,
+        "embed_s": embed_s,
+        "index_s": index_s,
+        "total_s": total_s,
+        "docs_per_s": len(file_paths) / total_s if total_s else 0.0,
+        "chunks_per_s": len(documents) / total_s if total_s else 0.0,
+        "embed_chunks_per_s": len(documents) / embed_s if embed_s else 0.0,
+    }
+
+
+def benchmark_retrieval(vector_db: VectorDatabase, queries: List[str], k: int = 5) -> Dict[str, Any]:
+    """Measure query embedding and similarity search latency"""
+    embed_samples, search_samples, total_samples = [], [], []
+    for query in queries:
+        start = time.perf_counter()
+        query_embedding = vector_db.embedder.encode_query(query)
+        embedded = time.perf_counter()
+        vector_db.store.similarity_search(query_embedding, k)
+        finished = time.perf_counter()
+
+        embed_samples.append(embedded - start)
+        search_samples.append(finished - embedded)
+        total_samples.append(finished - start)
+
+    return {
+        "k": k,
+        "embed_query": latency_summary(embed_samples),
+        "search": latency_summary(search_samples),
+        "total": latency_summary(total_samples),
+    }
+
+
+def benchmark_query_endpoint(vector_db: VectorDatabase, queries: List[str],
+                             llm_base_url: str, num_docs: int = 5) -> Dict[str, Any]:
+    """Measure full /query latency through the FastAPI app backed by the stub LLM"""
+    import uvicorn
+    from . import web_interface
+
+    web_interface.rag_pipeline = RAGPipeline(vector_db, LocalLLM(base_url=llm_base_url))
+
+    port = _free_port()
+    # lifespan is disabled so the startup hook does not replace the benchmark pipeline
+    server = uvicorn.Server(uvicorn.Config(
+        web_interface.app, host="127.0.0.1", port=port, log_level="warning", lifespan="off"
+    ))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.01)
+
+    samples, errors = [], 0
+    try:
+        with requests.Session() as session:
+            for query in queries:
+                start = time.perf_counter()
+                response = session.post(
+                    f"http://127.0.0.1:{port}/query",
+                    json={"question": query, "num_docs": num_docs},
+                    timeout=60
+                )
+                samples.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    errors += 1
+    finally:
+        server.should_exit = True
+        thread.join()
+        web_interface.rag_pipeline = None
+
+    result = latency_summary(samples)
+    result["errors"] = errors
+    return result
+
+
+def run_benchmark(store_types: List[str], num_docs: int = 50, num_queries: int = 100,
+                  k: int = 5, llm_latency_ms: float = 50.0,
+                  output_path: str = "benchmark_results.json") -> Dict[str, Any]:
+    """Run the full benchmark suite and write results as JSON"""
+    results: Dict[str, Any] = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "config": {
+            "embedding_model": settings.embedding_model,
+            "chunk_size": settings.chunk_size,
+            "chunk_overlap": settings.chunk_overlap,
+            "num_docs": num_docs,
+            "num_queries": num_queries,
+            "k": k,
+            "llm_latency_ms": llm_latency_ms,
+        },
+        "stores": {},
+    }
+
+    queries = generate_synthetic_queries(num_queries)
+    processor = DocumentProcessor()
+
+    with tempfile.TemporaryDirectory() as corpus_dir, StubOllamaServer(latency_ms=llm_latency_ms) as llm_server:
+        file_paths = generate_synthetic_corpus(corpus_dir, num_docs)
+
+        for store_type in store_types:
+            logger.info(f"Benchmarking {store_type} vector store")
+            start = time.perf_counter()
+            vector_db = _create_vector_db(store_type)
+            setup_s = time.perf_counter() - start
+
+            try:
+                results["stores"][store_type] = {
+                    "setup_s": setup_s,
+                    "ingestion": benchmark_ingestion(processor, vector_db, file_paths),
+                    "retrieval": benchmark_retrieval(vector_db, queries, k),
+                    "query": benchmark_query_endpoint(vector_db, queries, llm_server.base_url, k),
+                }
+            finally:
+                _drop_vector_db(vector_db)
+
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    with open(output_path, "w") as f:
+        json.dump(results, f, indent=2)
+
+    logger.info(f"Benchmark results written to {output_path}")
+    return results
@@ -17,12 +17,24 @@ class Settings(BaseSettings):
     # SageMaker Configuration
     sagemaker_endpoint_name: str = Field(default="llama3-endpoint", env="SAGEMAKER_ENDPOINT_NAME")
     sagemaker_role_arn: Optional[str] = Field(default=None, env="SAGEMAKER_ROLE_ARN")
+    sagemaker_endpoint_url: Optional[str] = Field(default=None, env="SAGEMAKER_ENDPOINT_URL")
+    sagemaker_batching: bool = Field(default=False, env="SAGEMAKER_BATCHING")
+    sagemaker_max_batch_size: int = Field(default=8, env="SAGEMAKER_MAX_BATCH_SIZE")
+    sagemaker_max_batch_wait_ms: float = Field(default=10.0, env="SAGEMAKER_MAX_BATCH_WAIT_MS")
     
     # Vector Database Configuration
     vector_db_type: str = Field(default="chroma", env="VECTOR_DB_TYPE")
     pinecone_api_key: Optional[str] = Field(default=None, env="PINECONE_API_KEY")
     pinecone_index_name: str = Field(default="rag-chatbot-index", env="PINECONE_INDEX_NAME")
     
+    # Sharded Search Configuration (VECTOR_DB_TYPE=sharded)
+    shard_dir: str = Field(default="./vector_shards", env="SHARD_DIR")
+    num_shards: int = Field(default=4, env="NUM_SHARDS")
+    shard_host: str = Field(default="127.0.0.1", env="SHARD_HOST")
+    shard_base_port: int = Field(default=7600, env="SHARD_BASE_PORT")
+    # Shard requests are pickled, so the key is required; searchers refuse non-loopback hosts without it
+    shard_authkey: Optional[str] = Field(default=None, env="SHARD_AUTHKEY")
+    
     # Embedding Model Configuration
     embedding_model: str = Field(
         default="sentence-transformers/all-MiniLM-L6-v2", 
@@ -30,6 +42,7 @@ class Settings(BaseSettings):
     )
     chunk_size: int = Field(default=512, env="CHUNK_SIZE")
     chunk_overlap: int = Field(default=50, env="CHUNK_OVERLAP")
+    embedding_warmup: bool = Field(default=True, env="EMBEDDING_WARMUP")
     
     # LLM Configuration
     llm_model_name: str = Field(
@@ -38,6 +51,7 @@ class Settings(BaseSettings):
     )
     max_tokens: int = Field(default=2048, env="MAX_TOKENS")
     temperature: float = Field(default=0.7, env="TEMPERATURE")
+    batch_query_concurrency: int = Field(default=4, env="BATCH_QUERY_CONCURRENCY")
     
     # Ollama Configuration
     ollama_base_url: str = Field(default="http://localhost:11434", env="OLLAMA_BASE_URL")
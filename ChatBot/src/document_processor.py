@@ -7,9 +7,6 @@ import logging
 from typing import List, Optional
 from pathlib import Path
 
-import PyPDF2
-from docx import Document
-from bs4 import BeautifulSoup
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain.schema import Document as LangChainDocument
 
@@ -35,6 +32,8 @@ class DocumentProcessor:
     def load_pdf(self, file_path: str) -> str:
         """Extract text from PDF file"""
         try:
+            import PyPDF2
+            
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
                 text = ""
@@ -48,6 +47,8 @@ class DocumentProcessor:
     def load_docx(self, file_path: str) -> str:
         """Extract text from DOCX file"""
         try:
+            from docx import Document
+            
             doc = Document(file_path)
             text = ""
             for paragraph in doc.paragraphs:
@@ -69,6 +70,8 @@ class DocumentProcessor:
     def load_html(self, file_path: str) -> str:
         """Extract text from HTML file"""
         try:
+            from bs4 import BeautifulSoup
+            
             with open(file_path, 'r', encoding='utf-8') as file:
                 soup = BeautifulSoup(file.read(), 'html.parser')
                 return soup.get_text().strip()
@@ -3,9 +3,9 @@ Embedding Module for RAG Chatbot
 Handles text embedding generation using Hugging Face Sentence Transformers
 """
 import logging
+import threading
 from typing import List, Optional
 import numpy as np
-from sentence_transformers import SentenceTransformer
 from langchain.schema import Document
 
 from .config import settings
@@ -16,14 +16,19 @@ logger = logging.getLogger(__name__)
 class EmbeddingGenerator:
     """Generate embeddings for text chunks using Sentence Transformers"""
     
-    def __init__(self, model_name: Optional[str] = None):
+    def __init__(self, model_name: Optional[str] = None, lazy: bool = True):
         self.model_name = model_name or settings.embedding_model
         self.model = None
-        self._load_model()
+        self._model_lock = threading.Lock()
+        if not lazy:
+            self._load_model()
     
     def _load_model(self):
         """Load the sentence transformer model"""
         try:
+            # Imported here so commands that never embed skip the torch import
+            from sentence_transformers import SentenceTransformer
+            
             logger.info(f"Loading embedding model: {self.model_name}")
             self.model = SentenceTransformer(self.model_name)
             logger.info("Embedding model loaded successfully")
@@ -31,11 +36,23 @@ class EmbeddingGenerator:
             logger.error(f"Failed to load embedding model: {e}")
             raise
     
+    def _ensure_model(self):
+        """Load the model on first use"""
+        if self.model is None:
+            with self._model_lock:
+                if self.model is None:
+                    self._load_model()
+    
+    def warm_up(self):
+        """Load the model and run one encode so the first request does not pay for it"""
+        self._ensure_model()
+        self.model.encode(["warm-up"], convert_to_numpy=True, show_progress_bar=False)
+        logger.info("Embedding model warmed up")
+    
     def encode_texts(self, texts: List[str]) -> np.ndarray:
         """Generate embeddings for a list of texts"""
         try:
-            if not self.model:
-                raise ValueError("Model not loaded")
+            self._ensure_model()
             
             logger.info(f"Generating embeddings for {len(texts)} texts")
             embeddings = self.model.encode(
@@ -62,8 +79,7 @@ class EmbeddingGenerator:
     
     def get_embedding_dimension(self) -> int:
         """Get the dimension of the embedding vectors"""
-        if not self.model:
-            raise ValueError("Model not loaded")
+        self._ensure_model()
         return self.model.get_sentence_embedding_dimension()
 
 
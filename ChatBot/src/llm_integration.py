@@ -3,9 +3,9 @@ LLM Integration Module for RAG Chatbot
 Supports both AWS SageMaker and local LLM deployments
 """
 import logging
-from typing import List, Optional, Dict, Any
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 import json
-import boto3
 from langchain.schema import Document
 
 from .config import settings
@@ -26,12 +26,16 @@ class SageMakerLLM(LLMInterface):
     
     def __init__(self, endpoint_name: Optional[str] = None):
         self.endpoint_name = endpoint_name or settings.sagemaker_endpoint_name
+        
+        # boto3 is only needed when SageMaker is actually used
+        import boto3
         self.sagemaker_runtime = boto3.client(
             'sagemaker-runtime',
             region_name=settings.aws_region
         )
     
-    def _format_prompt(self, query: str, context_docs: List[Document]) -> str:
+    @staticmethod
+    def _format_prompt(query: str, context_docs: List[Document]) -> str:
         """Format the prompt with context and query"""
         context_text = "\n\n".join([doc.page_content for doc in context_docs])
         
@@ -46,6 +50,30 @@ Answer:"""
         
         return prompt
     
+    @staticmethod
+    def _generation_parameters() -> Dict[str, Any]:
+        """Sampling parameters sent with every request"""
+        return {
+            "max_new_tokens": settings.max_tokens,
+            "temperature": settings.temperature,
+            "do_sample": True,
+            "top_p": 0.9
+        }
+    
+    @staticmethod
+    def _extract_generated_text(response_body: Any, prompt: str) -> str:
+        """Extract generated text from a TGI-style response and strip the echoed prompt"""
+        if isinstance(response_body, list) and len(response_body) > 0:
+            generated_text = response_body[0].get('generated_text', '')
+        else:
+            generated_text = response_body.get('generated_text', '')
+        
+        # Clean up the response (remove the original prompt)
+        if prompt in generated_text:
+            generated_text = generated_text.replace(prompt, '').strip()
+        
+        return generated_text
+    
     def generate_response(self, query: str, context: List[Document]) -> str:
         """Generate response using SageMaker endpoint"""
         try:
@@ -55,12 +83,7 @@ Answer:"""
             # Prepare payload
             payload = {
                 "inputs": prompt,
-                "parameters": {
-                    "max_new_tokens": settings.max_tokens,
-                    "temperature": settings.temperature,
-                    "do_sample": True,
-                    "top_p": 0.9
-                }
+                "parameters": self._generation_parameters()
             }
             
             # Call SageMaker endpoint
@@ -73,17 +96,7 @@ Answer:"""
             # Parse response
             response_body = json.loads(response['Body'].read().decode())
             
-            # Extract generated text
-            if isinstance(response_body, list) and len(response_body) > 0:
-                generated_text = response_body[0].get('generated_text', '')
-            else:
-                generated_text = response_body.get('generated_text', '')
-            
-            # Clean up the response (remove the original prompt)
-            if prompt in generated_text:
-                generated_text = generated_text.replace(prompt, '').strip()
-            
-            return generated_text
+            return self._extract_generated_text(response_body, prompt)
             
         except Exception as e:
             logger.error(f"Error generating response with SageMaker: {e}")
@@ -93,13 +106,13 @@ Answer:"""
 class LocalLLM(LLMInterface):
     """Local LLM implementation using Ollama"""
     
-    def __init__(self, model_name: Optional[str] = None):
+    def __init__(self, model_name: Optional[str] = None, base_url: Optional[str] = None):
         self.model_name = model_name or settings.ollama_model_name
         
         # Import Ollama integration
         try:
             from .ollama_integration import OllamaLLM
-            self.ollama_llm = OllamaLLM(self.model_name)
+            self.ollama_llm = OllamaLLM(self.model_name, base_url)
             self.is_available = True
         except ImportError:
             logger.warning("Ollama integration not available. Install with: pip install ollama")
@@ -121,6 +134,19 @@ class RAGPipeline:
         self.vector_db = vector_db
         self.llm = llm
     
+    @staticmethod
+    def _format_sources(relevant_docs: List[Tuple[Document, float]]) -> List[Dict[str, Any]]:
+        """Summarize retrieved documents for the response payload"""
+        sources = []
+        for doc, score in relevant_docs:
+            source_info = {
+                "content": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
+                "metadata": doc.metadata,
+                "similarity_score": score
+            }
+            sources.append(source_info)
+        return sources
+    
     def query(self, question: str, num_docs: int = 5) -> Dict[str, Any]:
         """Process a query through the complete RAG pipeline"""
         try:
@@ -144,14 +170,7 @@ class RAGPipeline:
             answer = self.llm.generate_response(question, docs)
             
             # Step 3: Prepare response with sources
-            sources = []
-            for doc, score in relevant_docs:
-                source_info = {
-                    "content": doc.page_content[:200] + "..." if len(doc.page_content) > 200 else doc.page_content,
-                    "metadata": doc.metadata,
-                    "similarity_score": score
-                }
-                sources.append(source_info)
+            sources = self._format_sources(relevant_docs)
             
             response = {
                 "answer": answer,
@@ -171,6 +190,81 @@ class RAGPipeline:
                 "confidence": 0.0
             }
 
+    def _answer(self, index: int, question: str, relevant_docs: List[Tuple[Document, float]]) -> Dict[str, Any]:
+        """Generate the answer for one question of a batch"""
+        result = {"index": index, "question": question}
+        
+        if not relevant_docs:
+            result.update({
+                "answer": "I couldn't find any relevant information to answer your question.",
+                "sources": [],
+                "confidence": 0.0,
+                "num_sources": 0
+            })
+            return result
+        
+        docs = [doc for doc, score in relevant_docs]
+        scores = [score for doc, score in relevant_docs]
+        
+        result.update({
+            "answer": self.llm.generate_response(question, docs),
+            "sources": self._format_sources(relevant_docs),
+            "confidence": max(scores),
+            "num_sources": len(relevant_docs)
+        })
+        return result
+    
+    def query_batch(self, questions: List[str], num_docs: int = 5,
+                    max_concurrency: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Process many queries with batched retrieval and bounded-concurrency generation.
+        
+        All questions are embedded in one call and searched in one multi-query lookup.
+        Results are yielded as generations complete, each tagged with its input index.
+        Concurrency is capped at settings.batch_query_concurrency.
+        """
+        limit = settings.batch_query_concurrency
+        max_concurrency = limit if max_concurrency is None else max(1, min(max_concurrency, limit))
+        logger.info(f"Processing batch of {len(questions)} queries (concurrency: {max_concurrency})")
+        
+        try:
+            batch_docs = self.vector_db.search_batch(questions, k=num_docs)
+        except Exception as e:
+            logger.error(f"Error in batch retrieval: {e}")
+            for index, question in enumerate(questions):
+                yield {
+                    "index": index,
+                    "question": question,
+                    "answer": "I apologize, but I encountered an error while processing your question.",
+                    "sources": [],
+                    "confidence": 0.0,
+                    "num_sources": 0,
+                    "error": str(e)
+                }
+            return
+        
+        with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+            futures = {
+                executor.submit(self._answer, index, question, relevant_docs): (index, question)
+                for index, (question, relevant_docs) in enumerate(zip(questions, batch_docs))
+            }
+            
+            for future in as_completed(futures):
+                index, question = futures[future]
+                try:
+                    yield future.result()
+                except Exception as e:
+                    logger.error(f"Error generating answer for batch query {index}: {e}")
+                    yield {
+                        "index": index,
+                        "question": question,
+                        "answer": "I apologize, but I encountered an error while processing your question.",
+                        "sources": [],
+                        "confidence": 0.0,
+                        "num_sources": 0,
+                        "error": str(e)
+                    }
+
 
 # Example usage
 if __name__ == "__main__":
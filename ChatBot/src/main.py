@@ -3,13 +3,18 @@ Main application entry point for RAG Chatbot
 """
 import argparse
 import logging
+import time
 from pathlib import Path
 
+_import_start = time.perf_counter()
+
+# Heavy backends (torch, chromadb, faiss, boto3, FastAPI) are imported lazily by the
+# components that need them, so these imports stay cheap for every command
 from .config import settings
 from .document_processor import DocumentProcessor
 from .vector_database import VectorDatabase
 from .llm_integration import RAGPipeline, SageMakerLLM, LocalLLM
-from .web_interface import main as run_web_interface
+from .startup import StartupTimer
 
 # Configure logging
 logging.basicConfig(
@@ -18,6 +23,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+startup_timer = StartupTimer("startup", start=_import_start)
+startup_timer.mark("imports", _import_start)
+
 
 def setup_environment():
     """Set up necessary directories and environment"""
@@ -36,8 +44,11 @@ def process_documents_cli(file_paths: list):
         logger.info(f"Processing {len(file_paths)} documents")
         
         # Initialize components
-        processor = DocumentProcessor()
-        vector_db = VectorDatabase(settings.vector_db_type)
+        with startup_timer.phase("document_processor"):
+            processor = DocumentProcessor()
+        with startup_timer.phase("vector_db"):
+            vector_db = VectorDatabase(settings.vector_db_type)
+        startup_timer.log()
         
         # Process documents
         documents = processor.process_documents(file_paths)
@@ -64,26 +75,30 @@ def interactive_chat():
         logger.info("Starting interactive chat session")
         
         # Initialize components
-        vector_db = VectorDatabase(settings.vector_db_type)
+        with startup_timer.phase("vector_db"):
+            vector_db = VectorDatabase(settings.vector_db_type)
         
         # Try to load existing vector store
         try:
-            vector_db.load()
+            with startup_timer.phase("vector_store_load"):
+                vector_db.load()
             logger.info("Loaded existing vector store")
         except:
             logger.warning("No existing vector store found. Please process documents first.")
             return
         
         # Initialize LLM
-        try:
-            llm = SageMakerLLM()
-            logger.info("Using SageMaker LLM")
-        except:
-            llm = LocalLLM()
-            logger.info("Using Local LLM")
+        with startup_timer.phase("llm"):
+            try:
+                llm = SageMakerLLM()
+                logger.info("Using SageMaker LLM")
+            except:
+                llm = LocalLLM()
+                logger.info("Using Local LLM")
         
         # Initialize RAG pipeline
         rag_pipeline = RAGPipeline(vector_db, llm)
+        startup_timer.log()
         
         print("\n" + "="*50)
         print("RAG Chatbot Interactive Session")
@@ -129,8 +144,11 @@ def main():
     parser = argparse.ArgumentParser(description="RAG Chatbot Application")
     parser.add_argument(
         'command',
-        choices=['web', 'chat', 'process'],
-        help='Command to run: web (start web interface), chat (interactive chat), process (process documents)'
+        choices=['web', 'chat', 'process', 'benchmark', 'build-shards', 'serve-shards'],
+        help='Command to run: web (start web interface), chat (interactive chat), process (process documents), '
+             'benchmark (measure ingestion, retrieval and query latency), '
+             'build-shards (partition a saved FAISS store into shards), '
+             'serve-shards (start one searcher process per shard)'
     )
     parser.add_argument(
         '--files',
@@ -148,6 +166,46 @@ def main():
         default=settings.app_port,
         help='Port for web interface'
     )
+    parser.add_argument(
+        '--store-types',
+        nargs='+',
+        default=['faiss', 'chroma'],
+        help='Vector store types to benchmark (for benchmark command)'
+    )
+    parser.add_argument(
+        '--num-docs',
+        type=int,
+        default=50,
+        help='Number of synthetic documents to generate (for benchmark command)'
+    )
+    parser.add_argument(
+        '--num-queries',
+        type=int,
+        default=100,
+        help='Number of queries to run per store (for benchmark command)'
+    )
+    parser.add_argument(
+        '--llm-latency-ms',
+        type=float,
+        default=50.0,
+        help='Simulated generation latency of the stub LLM server (for benchmark command)'
+    )
+    parser.add_argument(
+        '--num-shards',
+        type=int,
+        default=settings.num_shards,
+        help='Number of shards to build (for build-shards command)'
+    )
+    parser.add_argument(
+        '--store-path',
+        default='./vector_store',
+        help='Saved FAISS store to partition (for build-shards command)'
+    )
+    parser.add_argument(
+        '--output',
+        default='benchmark_results.json',
+        help='Path of the JSON results file (for benchmark command)'
+    )
     
     args = parser.parse_args()
     
@@ -156,6 +214,9 @@ def main():
     
     if args.command == 'web':
         logger.info("Starting web interface")
+        with startup_timer.phase("web_imports"):
+            from .web_interface import main as run_web_interface
+        startup_timer.log()
         run_web_interface()
         
     elif args.command == 'chat':
@@ -178,6 +239,38 @@ def main():
             process_documents_cli(valid_files)
         else:
             print("Error: No valid files provided")
+    
+    elif args.command == 'benchmark':
+        from .benchmark import run_benchmark
+        
+        run_benchmark(
+            store_types=args.store_types,
+            num_docs=args.num_docs,
+            num_queries=args.num_queries,
+            llm_latency_ms=args.llm_latency_ms,
+            output_path=args.output
+        )
+    
+    elif args.command == 'build-shards':
+        from .sharded_search import build_shards_from_faiss
+        
+        build_shards_from_faiss(args.store_path, settings.shard_dir, args.num_shards)
+    
+    elif args.command == 'serve-shards':
+        from .sharded_search import SearcherPool
+        
+        # Web workers run in other processes, so they need the same key from the environment
+        if not settings.shard_authkey:
+            print("Error: Set SHARD_AUTHKEY for serve-shards and the web workers")
+            return
+        
+        pool = SearcherPool()
+        pool.start()
+        try:
+            pool.wait()
+        except KeyboardInterrupt:
+            logger.info("Stopping shard searchers")
+            pool.stop()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,245 @@
+"""
+Async SageMaker Integration Module for RAG Chatbot
+Streams tokens with invoke_endpoint_with_response_stream and optionally
+micro-batches concurrent prompts into one multi-input request for TGI-style endpoints
+"""
+import asyncio
+import json
+import logging
+from typing import List, Optional, Dict, Any, AsyncIterator, Awaitable, Callable, Tuple
+
+from langchain.schema import Document
+
+from .config import settings
+from .llm_integration import SageMakerLLM
+
+logger = logging.getLogger(__name__)
+
+ERROR_RESPONSE = "I apologize, but I encountered an error while generating a response."
+
+
+class TokenStreamParser:
+    """Reassemble streamed payload parts into token texts
+
+    Payload parts are arbitrary byte slices of newline-delimited JSON, optionally
+    prefixed with ``data:`` as in TGI server-sent events.
+    """
+
+    def __init__(self):
+        self._buffer = b""
+
+    def feed(self, chunk: bytes) -> List[str]:
+        """Consume a payload part and return the token texts completed by it"""
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split(b"\n")
+        return [text for text in (self._parse_line(line) for line in lines) if text]
+
+    def flush(self) -> List[str]:
+        """Parse whatever is left once the stream ends"""
+        line, self._buffer = self._buffer, b""
+        text = self._parse_line(line)
+        return [text] if text else []
+
+    @staticmethod
+    def _parse_line(line: bytes) -> Optional[str]:
+        line = line.strip()
+        if line.startswith(b"data:"):
+            line = line[len(b"data:"):].strip()
+        if not line:
+            return None
+
+        try:
+            event = json.loads(line)
+        except json.JSONDecodeError:
+            logger.warning(f"Skipping malformed stream line: {line[:100]!r}")
+            return None
+
+        token = event.get("token") or {}
+        if token.get("special"):
+            return None
+        return token.get("text")
+
+
+class MicroBatcher:
+    """Group concurrent prompts into one call of ``submit_batch``
+
+    A batch is sent when ``max_batch_size`` prompts are waiting or ``max_wait_ms``
+    has passed since the first prompt arrived, whichever comes first.
+    """
+
+    def __init__(self, submit_batch: Callable[[List[str]], Awaitable[List[str]]],
+                 max_batch_size: int = 8, max_wait_ms: float = 10.0):
+        self.submit_batch = submit_batch
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+
+    async def submit(self, prompt: str) -> str:
+        """Queue a prompt and wait for its generated text"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((prompt, future))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._schedule_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait_s, self._schedule_flush)
+
+        return await future
+
+    def _schedule_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        if self._pending:
+            self._timer = asyncio.get_running_loop().call_later(self.max_wait_s, self._schedule_flush)
+        if not batch:
+            return
+
+        task = asyncio.ensure_future(self._flush(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, batch: List[Tuple[str, asyncio.Future]]):
+        prompts = [prompt for prompt, _ in batch]
+        try:
+            results = await self.submit_batch(prompts)
+            if len(results) != len(prompts):
+                raise ValueError(f"Expected {len(prompts)} generations, got {len(results)}")
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+class AsyncSageMakerLLM:
+    """Asynchronous SageMaker LLM client with token streaming and opt-in micro-batching"""
+
+    def __init__(self, endpoint_name: Optional[str] = None, endpoint_url: Optional[str] = None,
+                 batching: Optional[bool] = None, max_batch_size: Optional[int] = None,
+                 max_batch_wait_ms: Optional[float] = None):
+        self.endpoint_name = endpoint_name or settings.sagemaker_endpoint_name
+        self.endpoint_url = endpoint_url or settings.sagemaker_endpoint_url or None
+        self.batching = settings.sagemaker_batching if batching is None else batching
+        self.batcher = MicroBatcher(
+            self._invoke_batch,
+            max_batch_size=max_batch_size or settings.sagemaker_max_batch_size,
+            max_wait_ms=settings.sagemaker_max_batch_wait_ms if max_batch_wait_ms is None else max_batch_wait_ms
+        )
+        self._client_context = None
+        self._client = None
+        self._start_lock = asyncio.Lock()
+
+    async def start(self):
+        """Open the underlying aiobotocore client"""
+        async with self._start_lock:
+            if self._client is not None:
+                return
+
+            # aiobotocore is only needed when the async client is actually used
+            from aiobotocore.session import get_session
+
+            self._client_context = get_session().create_client(
+                'sagemaker-runtime',
+                region_name=settings.aws_region,
+                endpoint_url=self.endpoint_url,
+                aws_access_key_id=settings.aws_access_key_id,
+                aws_secret_access_key=settings.aws_secret_access_key
+            )
+            self._client = await self._client_context.__aenter__()
+
+    async def close(self):
+        """Close the underlying client"""
+        if self._client_context is not None:
+            await self._client_context.__aexit__(None, None, None)
+        self._client_context = None
+        self._client = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def _invoke(self, payload: Dict[str, Any]) -> Any:
+        await self.start()
+        response = await self._client.invoke_endpoint(
+            EndpointName=self.endpoint_name,
+            ContentType='application/json',
+            Body=json.dumps(payload)
+        )
+        async with response['Body'] as stream:
+            return json.loads(await stream.read())
+
+    async def _invoke_batch(self, prompts: List[str]) -> List[str]:
+        """Send several prompts as one multi-input request"""
+        response_body = await self._invoke({
+            "inputs": prompts,
+            "parameters": SageMakerLLM._generation_parameters()
+        })
+        logger.debug(f"Batched {len(prompts)} prompts into one SageMaker request")
+
+        generations = []
+        for prompt, item in zip(prompts, response_body):
+            # Some containers wrap each generation in its own list
+            generations.append(SageMakerLLM._extract_generated_text(item, prompt))
+        return generations
+
+    async def generate_response(self, query: str, context: List[Document]) -> str:
+        """Generate a complete response, micro-batched with concurrent calls when enabled"""
+        try:
+            prompt = SageMakerLLM._format_prompt(query, context)
+
+            if self.batching:
+                return await self.batcher.submit(prompt)
+
+            response_body = await self._invoke({
+                "inputs": prompt,
+                "parameters": SageMakerLLM._generation_parameters()
+            })
+            return SageMakerLLM._extract_generated_text(response_body, prompt)
+
+        except Exception as e:
+            logger.error(f"Error generating response with SageMaker: {e}")
+            return ERROR_RESPONSE
+
+    async def stream_response(self, query: str, context: List[Document]) -> AsyncIterator[str]:
+        """Yield response tokens as the endpoint streams them"""
+        try:
+            await self.start()
+            prompt = SageMakerLLM._format_prompt(query, context)
+            response = await self._client.invoke_endpoint_with_response_stream(
+                EndpointName=self.endpoint_name,
+                ContentType='application/json',
+                Body=json.dumps({
+                    "inputs": prompt,
+                    "parameters": SageMakerLLM._generation_parameters(),
+                    "stream": True
+                })
+            )
+
+            parser = TokenStreamParser()
+            async for event in response['Body']:
+                if 'PayloadPart' in event:
+                    for token in parser.feed(event['PayloadPart']['Bytes']):
+                        yield token
+                elif 'ModelStreamError' in event or 'InternalStreamFailure' in event:
+                    raise RuntimeError(f"SageMaker stream error: {event}")
+
+            for token in parser.flush():
+                yield token
+
+        except Exception as e:
+            logger.error(f"Error streaming response from SageMaker: {e}")
+            yield ERROR_RESPONSE
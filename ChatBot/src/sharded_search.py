@@ -0,0 +1,297 @@
+"""
+Sharded Vector Search Module for RAG Chatbot
+Partitions the corpus into memory-mapped shards served by searcher processes,
+with a scatter-gather coordinator that merges the per-shard top-k results
+"""
+import ipaddress
+import json
+import logging
+import multiprocessing
+import pickle
+import queue
+import secrets
+import threading
+import time
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+from langchain.schema import Document
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "manifest.json"
+
+
+def _shard_paths(shard_dir: str, shard_id: int) -> Tuple[Path, Path]:
+    """Vector and document file paths of one shard"""
+    base = Path(shard_dir) / f"shard_{shard_id:03d}"
+    return base.with_suffix(".npy"), base.with_suffix(".docs")
+
+
+def build_shards(documents: List[Document], embeddings: np.ndarray, shard_dir: str,
+                 num_shards: int) -> dict:
+    """Normalize embeddings and partition them with their documents into contiguous shards"""
+    if len(documents) != len(embeddings):
+        raise ValueError(f"Got {len(documents)} documents but {len(embeddings)} embeddings")
+
+    Path(shard_dir).mkdir(parents=True, exist_ok=True)
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    normalized = normalized.astype('float32')
+
+    boundaries = np.linspace(0, len(documents), num_shards + 1, dtype=int)
+    shard_sizes = []
+    for shard_id in range(num_shards):
+        start, end = boundaries[shard_id], boundaries[shard_id + 1]
+        vectors_path, docs_path = _shard_paths(shard_dir, shard_id)
+
+        # .npy keeps vectors loadable with mmap_mode so every searcher shares the page cache
+        np.save(vectors_path, normalized[start:end])
+        with open(docs_path, 'wb') as f:
+            pickle.dump(documents[start:end], f)
+        shard_sizes.append(int(end - start))
+
+    manifest = {
+        "num_shards": num_shards,
+        "dimension": int(normalized.shape[1]),
+        "num_documents": len(documents),
+        "shard_sizes": shard_sizes,
+    }
+    with open(Path(shard_dir) / MANIFEST_FILE, 'w') as f:
+        json.dump(manifest, f, indent=2)
+
+    logger.info(f"Built {num_shards} shards for {len(documents)} documents in {shard_dir}")
+    return manifest
+
+
+def build_shards_from_faiss(store_path: str, shard_dir: str, num_shards: int) -> dict:
+    """Re-partition a FAISS store saved by FAISSStore.save into shards"""
+    import faiss
+
+    index = faiss.read_index(f"{store_path}.index")
+    with open(f"{store_path}.docs", 'rb') as f:
+        documents = pickle.load(f)
+
+    embeddings = index.reconstruct_n(0, index.ntotal)
+    return build_shards(documents, embeddings, shard_dir, num_shards)
+
+
+def load_manifest(shard_dir: str) -> dict:
+    """Read the shard manifest"""
+    with open(Path(shard_dir) / MANIFEST_FILE) as f:
+        return json.load(f)
+
+
+class ShardSearcher:
+    """Exact inner-product search over one memory-mapped shard"""
+
+    def __init__(self, shard_dir: str, shard_id: int):
+        vectors_path, docs_path = _shard_paths(shard_dir, shard_id)
+        self.shard_id = shard_id
+        self.vectors = np.load(vectors_path, mmap_mode='r')
+        with open(docs_path, 'rb') as f:
+            self.documents = pickle.load(f)
+
+    def search(self, query_embeddings: np.ndarray, k: int) -> List[List[Tuple[float, Document]]]:
+        """Return the shard-local top-k (score, document) pairs for each query"""
+        if len(self.documents) == 0:
+            return [[] for _ in range(len(query_embeddings))]
+
+        scores = query_embeddings @ self.vectors.T
+        k = min(k, scores.shape[1])
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+
+        results = []
+        for row_scores, row_top in zip(scores, top):
+            ranked = row_top[np.argsort(-row_scores[row_top])]
+            results.append([(float(row_scores[idx]), self.documents[idx]) for idx in ranked])
+        return results
+
+
+def _limit_threads(num_threads: int):
+    """Cap BLAS threads so searchers scale across processes instead of oversubscribing cores"""
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(num_threads)
+    except ImportError:
+        logger.debug("threadpoolctl not installed; BLAS thread count not limited")
+
+
+def _handle_connection(conn, searcher: ShardSearcher):
+    """Answer search requests from one coordinator connection until it closes"""
+    try:
+        while True:
+            command, query_embeddings, k = conn.recv()
+            if command == "search":
+                conn.send(searcher.search(query_embeddings, k))
+            elif command == "ping":
+                conn.send(len(searcher.documents))
+    except EOFError:
+        pass
+    finally:
+        conn.close()
+
+
+def serve_shard(shard_dir: str, shard_id: int, address: Tuple[str, int], authkey: bytes,
+                num_threads: int = 1):
+    """Searcher process entry point: serve one shard on a local socket"""
+    _limit_threads(num_threads)
+    searcher = ShardSearcher(shard_dir, shard_id)
+
+    with Listener(address, authkey=authkey) as listener:
+        logger.info(f"Shard {shard_id} ({len(searcher.documents)} documents) listening on {address}")
+        while True:
+            conn = listener.accept()
+            threading.Thread(target=_handle_connection, args=(conn, searcher), daemon=True).start()
+
+
+def is_loopback_host(host: str) -> bool:
+    """Whether a host name or address only accepts connections from this machine"""
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def configured_authkey(authkey: Optional[bytes] = None) -> Optional[bytes]:
+    """The explicit authkey, else SHARD_AUTHKEY, else None"""
+    if authkey:
+        return authkey
+    if settings.shard_authkey:
+        return settings.shard_authkey.encode()
+    return None
+
+
+def shard_addresses(num_shards: int, host: Optional[str] = None,
+                    base_port: Optional[int] = None) -> List[Tuple[str, int]]:
+    """Socket address of every searcher process"""
+    host = host or settings.shard_host
+    base_port = base_port or settings.shard_base_port
+    return [(host, base_port + shard_id) for shard_id in range(num_shards)]
+
+
+class SearcherPool:
+    """Start one searcher process per shard on this host"""
+
+    def __init__(self, shard_dir: Optional[str] = None, host: Optional[str] = None,
+                 base_port: Optional[int] = None, threads_per_searcher: int = 1,
+                 authkey: Optional[bytes] = None):
+        self.shard_dir = shard_dir or settings.shard_dir
+        self.manifest = load_manifest(self.shard_dir)
+        self.addresses = shard_addresses(self.manifest["num_shards"], host, base_port)
+        self.threads_per_searcher = threads_per_searcher
+        self.processes: List[multiprocessing.Process] = []
+
+        # Requests are unpickled by the searchers, so the authkey is all that guards them
+        self.authkey = configured_authkey(authkey)
+        if self.authkey is None:
+            host = self.addresses[0][0] if self.addresses else settings.shard_host
+            if not is_loopback_host(host):
+                raise ValueError(f"Refusing to serve shards on non-loopback host {host} without SHARD_AUTHKEY")
+            # Only clients given pool.authkey can connect
+            self.authkey = secrets.token_bytes(32)
+            logger.warning("SHARD_AUTHKEY not set; searchers use a random key known only to this process")
+
+    def start(self):
+        """Spawn the searcher processes"""
+        context = multiprocessing.get_context("spawn")
+        for shard_id, address in enumerate(self.addresses):
+            process = context.Process(
+                target=serve_shard,
+                args=(self.shard_dir, shard_id, address, self.authkey, self.threads_per_searcher),
+                name=f"shard-searcher-{shard_id}",
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+        logger.info(f"Started {len(self.processes)} shard searchers for {self.shard_dir}")
+
+    def stop(self):
+        """Terminate the searcher processes"""
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            process.join()
+        self.processes = []
+
+    def wait(self):
+        """Block until the searchers exit"""
+        for process in self.processes:
+            process.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+class ShardedSearchClient:
+    """Scatter-gather coordinator that fans queries out to every shard and merges the top-k"""
+
+    def __init__(self, addresses: List[Tuple[str, int]], authkey: Optional[bytes] = None,
+                 connect_timeout: float = 30.0):
+        self.addresses = addresses
+        self.authkey = configured_authkey(authkey)
+        if self.authkey is None:
+            raise ValueError("SHARD_AUTHKEY must be set to connect to shard searchers")
+        self.connect_timeout = connect_timeout
+        # Each pooled entry holds one connection per shard; concurrent queries take separate entries
+        self._pool: "queue.LifoQueue" = queue.LifoQueue()
+
+    def _connect(self, address: Tuple[str, int]):
+        """Connect to a searcher, retrying while it starts up"""
+        deadline = time.monotonic() + self.connect_timeout
+        while True:
+            try:
+                return Client(address, authkey=self.authkey)
+            except ConnectionRefusedError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.1)
+
+    def _acquire(self) -> list:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return [self._connect(address) for address in self.addresses]
+
+    def search_batch(self, query_embeddings: np.ndarray, k: int = 5) -> List[List[Tuple[Document, float]]]:
+        """Search every shard and merge the results per query"""
+        query_embeddings = query_embeddings / np.linalg.norm(query_embeddings, axis=1, keepdims=True)
+        query_embeddings = np.ascontiguousarray(query_embeddings, dtype='float32')
+
+        connections = self._acquire()
+        try:
+            # Scatter to all shards before gathering so they search in parallel
+            for conn in connections:
+                conn.send(("search", query_embeddings, k))
+            shard_results = [conn.recv() for conn in connections]
+        except Exception:
+            for conn in connections:
+                conn.close()
+            raise
+        self._pool.put(connections)
+
+        merged = []
+        for query_idx in range(len(query_embeddings)):
+            candidates = [hit for results in shard_results for hit in results[query_idx]]
+            candidates.sort(key=lambda hit: hit[0], reverse=True)
+            merged.append([(doc, score) for score, doc in candidates[:k]])
+        return merged
+
+    def close(self):
+        """Close all pooled connections"""
+        while True:
+            try:
+                connections = self._pool.get_nowait()
+            except queue.Empty:
+                break
+            for conn in connections:
+                conn.close()
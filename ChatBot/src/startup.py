@@ -0,0 +1,39 @@
+"""
+Startup Timing Module for RAG Chatbot
+Records how long each initialization phase takes so cold starts can be tracked
+"""
+import logging
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """Collect named phase durations and log them as one startup breakdown"""
+
+    def __init__(self, name: str = "startup", start: Optional[float] = None):
+        self.name = name
+        self.start = start if start is not None else time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    def mark(self, phase: str, since: float):
+        """Record a phase that began at a perf_counter value"""
+        self.phases[phase] = time.perf_counter() - since
+
+    @contextmanager
+    def phase(self, phase: str):
+        """Time the enclosed block as a named phase"""
+        phase_start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.mark(phase, phase_start)
+
+    def log(self):
+        """Log the breakdown and total elapsed time"""
+        total = time.perf_counter() - self.start
+        breakdown = ", ".join(f"{phase}={seconds * 1000:.1f}ms" for phase, seconds in self.phases.items())
+        logger.info(f"{self.name} timing: {breakdown}, total={total * 1000:.1f}ms")
+        return {**self.phases, "total": total}
@@ -8,8 +8,6 @@ from typing import List, Optional, Tuple, Any
 from abc import ABC, abstractmethod
 
 import numpy as np
-import chromadb
-import faiss
 from langchain.schema import Document
 
 from .config import settings
@@ -31,6 +29,10 @@ class VectorStore(ABC):
         """Search for similar documents"""
         pass
     
+    def similarity_search_batch(self, query_embeddings: np.ndarray, k: int = 5) -> List[List[Tuple[Document, float]]]:
+        """Search for similar documents for several queries at once"""
+        return [self.similarity_search(query_embedding, k) for query_embedding in query_embeddings]
+    
     @abstractmethod
     def save(self, path: str):
         """Save the vector store to disk"""
@@ -46,6 +48,8 @@ class ChromaDBStore(VectorStore):
     """ChromaDB implementation of vector store"""
     
     def __init__(self, collection_name: str = "rag_documents"):
+        import chromadb
+        
         self.collection_name = collection_name
         self.client = chromadb.PersistentClient(path="./chroma_db")
         self.collection = self.client.get_or_create_collection(
@@ -100,6 +104,31 @@ class ChromaDBStore(VectorStore):
             logger.error(f"Error searching ChromaDB: {e}")
             raise
     
+    def similarity_search_batch(self, query_embeddings: np.ndarray, k: int = 5) -> List[List[Tuple[Document, float]]]:
+        """Search for similar documents for several queries in a single ChromaDB query"""
+        try:
+            results = self.collection.query(
+                query_embeddings=query_embeddings.tolist(),
+                n_results=k
+            )
+            
+            batch_results = []
+            for doc_texts, metadatas, distances in zip(
+                results['documents'],
+                results['metadatas'],
+                results['distances']
+            ):
+                batch_results.append([
+                    (Document(page_content=doc_text, metadata=metadata), 1 - distance)
+                    for doc_text, metadata, distance in zip(doc_texts, metadatas, distances)
+                ])
+            
+            return batch_results
+            
+        except Exception as e:
+            logger.error(f"Error batch searching ChromaDB: {e}")
+            raise
+    
     def save(self, path: str):
         """ChromaDB automatically persists data"""
         logger.info("ChromaDB data is automatically persisted")
@@ -112,14 +141,26 @@ class ChromaDBStore(VectorStore):
 class FAISSStore(VectorStore):
     """FAISS implementation of vector store"""
     
-    def __init__(self, dimension: int):
+    def __init__(self, dimension: Optional[int] = None):
         self.dimension = dimension
-        self.index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
+        self.index = None
         self.documents = []
+        if dimension is not None:
+            self._create_index(dimension)
+    
+    def _create_index(self, dimension: int):
+        """Create an empty index; deferred until the embedding dimension is known"""
+        import faiss
+        
+        self.dimension = dimension
+        self.index = faiss.IndexFlatIP(dimension)  # Inner product for cosine similarity
     
     def add_documents(self, documents: List[Document], embeddings: np.ndarray):
         """Add documents to FAISS index"""
         try:
+            if self.index is None:
+                self._create_index(embeddings.shape[1])
+            
             # Normalize embeddings for cosine similarity
             normalized_embeddings = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
             self.index.add(normalized_embeddings.astype('float32'))
@@ -134,6 +175,9 @@ class FAISSStore(VectorStore):
     def similarity_search(self, query_embedding: np.ndarray, k: int = 5) -> List[Tuple[Document, float]]:
         """Search for similar documents in FAISS"""
         try:
+            if self.index is None:
+                return []
+            
             # Normalize query embedding
             query_embedding = query_embedding / np.linalg.norm(query_embedding)
             query_embedding = query_embedding.reshape(1, -1).astype('float32')
@@ -151,9 +195,41 @@ class FAISSStore(VectorStore):
             logger.error(f"Error searching FAISS: {e}")
             raise
     
+    def similarity_search_batch(self, query_embeddings: np.ndarray, k: int = 5) -> List[List[Tuple[Document, float]]]:
+        """Search for similar documents for several queries with one FAISS search call"""
+        try:
+            if self.index is None:
+                return [[] for _ in range(len(query_embeddings))]
+            
+            # Normalize query embeddings row-wise
+            query_embeddings = query_embeddings / np.linalg.norm(query_embeddings, axis=1, keepdims=True)
+            query_embeddings = np.ascontiguousarray(query_embeddings, dtype='float32')
+            
+            scores, indices = self.index.search(query_embeddings, k)
+            
+            batch_results = []
+            for row_scores, row_indices in zip(scores, indices):
+                batch_results.append([
+                    (self.documents[idx], float(score))
+                    for score, idx in zip(row_scores, row_indices)
+                    if 0 <= idx < len(self.documents)
+                ])
+            
+            return batch_results
+            
+        except Exception as e:
+            logger.error(f"Error batch searching FAISS: {e}")
+            raise
+    
     def save(self, path: str):
         """Save FAISS index and documents"""
         try:
+            import faiss
+            
+            if self.index is None:
+                logger.warning("FAISS index is empty, nothing to save")
+                return
+            
             faiss.write_index(self.index, f"{path}.index")
             with open(f"{path}.docs", 'wb') as f:
                 pickle.dump(self.documents, f)
@@ -165,7 +241,10 @@ class FAISSStore(VectorStore):
     def load(self, path: str):
         """Load FAISS index and documents"""
         try:
+            import faiss
+            
             self.index = faiss.read_index(f"{path}.index")
+            self.dimension = self.index.d
             with open(f"{path}.docs", 'rb') as f:
                 self.documents = pickle.load(f)
             logger.info(f"Loaded FAISS store from {path}")
@@ -174,22 +253,60 @@ class FAISSStore(VectorStore):
             raise
 
 
+class ShardedFAISSStore(VectorStore):
+    """Read-only store that searches shards served by searcher processes on this host"""
+    
+    def __init__(self, shard_dir: Optional[str] = None):
+        from .sharded_search import ShardedSearchClient, load_manifest, shard_addresses
+        
+        self.shard_dir = shard_dir or settings.shard_dir
+        self.manifest = load_manifest(self.shard_dir)
+        self.client = ShardedSearchClient(shard_addresses(self.manifest["num_shards"]))
+    
+    def add_documents(self, documents: List[Document], embeddings: np.ndarray):
+        """Shards are built offline; see the build-shards command"""
+        raise NotImplementedError("Sharded store is read-only; rebuild shards with 'python -m src.main build-shards'")
+    
+    def similarity_search(self, query_embedding: np.ndarray, k: int = 5) -> List[Tuple[Document, float]]:
+        """Search all shards for similar documents"""
+        return self.similarity_search_batch(query_embedding.reshape(1, -1), k)[0]
+    
+    def similarity_search_batch(self, query_embeddings: np.ndarray, k: int = 5) -> List[List[Tuple[Document, float]]]:
+        """Scatter the queries to every shard and merge the top-k"""
+        try:
+            return self.client.search_batch(query_embeddings, k)
+        except Exception as e:
+            logger.error(f"Error searching shards: {e}")
+            raise
+    
+    def save(self, path: str):
+        """Shards are persisted when they are built"""
+        logger.info("Sharded store data is persisted by build-shards")
+    
+    def load(self, path: str):
+        """Shards are loaded by the searcher processes"""
+        logger.info(f"Using {self.manifest['num_shards']} shards from {self.shard_dir}")
+
+
 class VectorDatabase:
     """Main vector database interface"""
     
-    def __init__(self, store_type: str = None):
+    def __init__(self, store_type: str = None, store: Optional[VectorStore] = None):
         self.store_type = store_type or settings.vector_db_type
         self.embedder = EmbeddingGenerator()
-        self.store = None
-        self._initialize_store()
+        self.store = store
+        if self.store is None:
+            self._initialize_store()
     
     def _initialize_store(self):
         """Initialize the appropriate vector store"""
         if self.store_type == "chroma":
             self.store = ChromaDBStore()
         elif self.store_type == "faiss":
-            dimension = self.embedder.get_embedding_dimension()
-            self.store = FAISSStore(dimension)
+            # Dimension is taken from the first embeddings added, so the model is not loaded here
+            self.store = FAISSStore()
+        elif self.store_type == "sharded":
+            self.store = ShardedFAISSStore()
         elif self.store_type == "pinecone":
             # Note: Pinecone implementation would require pinecone-client
             raise NotImplementedError("Pinecone implementation not included in this example")
@@ -229,6 +346,29 @@ class VectorDatabase:
             logger.error(f"Error searching documents: {e}")
             raise
     
+    def search_batch(self, queries: List[str], k: int = 5) -> List[List[Tuple[Document, float]]]:
+        """Search for relevant documents for several queries using one batched embedding call"""
+        try:
+            if not queries:
+                return []
+            
+            # Generate all query embeddings at once
+            query_embeddings = self.embedder.encode_texts(queries)
+            
+            # Search in store
+            results = self.store.similarity_search_batch(query_embeddings, k)
+            
+            logger.info(f"Batch searched {len(queries)} queries")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error batch searching documents: {e}")
+            raise
+    
+    def warm_up(self):
+        """Load the embedding model ahead of the first request"""
+        self.embedder.warm_up()
+    
     def save(self, path: str = "./vector_store"):
         """Save the vector store"""
         self.store.save(path)
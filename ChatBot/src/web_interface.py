@@ -2,19 +2,21 @@
 Web Interface for RAG Chatbot using FastAPI
 Provides REST API endpoints and basic web interface
 """
+import json
 import logging
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from fastapi import FastAPI, HTTPException, UploadFile, File, Form
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse
-from pydantic import BaseModel
+from fastapi.responses import HTMLResponse, StreamingResponse
+from pydantic import BaseModel, Field
 import uvicorn
 
 from .config import settings
 from .document_processor import DocumentProcessor
 from .vector_database import VectorDatabase
 from .llm_integration import RAGPipeline, SageMakerLLM, LocalLLM
+from .startup import StartupTimer
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -32,6 +34,11 @@ class QueryRequest(BaseModel):
     question: str
     num_docs: int = 5
 
+class BatchQueryRequest(BaseModel):
+    questions: List[str]
+    num_docs: int = 5
+    max_concurrency: Optional[int] = Field(None, ge=1)
+
 class QueryResponse(BaseModel):
     answer: str
     sources: List[Dict[str, Any]]
@@ -55,31 +62,42 @@ async def startup_event():
     
     try:
         logger.info("Initializing RAG Chatbot components...")
+        timer = StartupTimer("web startup")
         
         # Initialize document processor
-        processor = DocumentProcessor()
+        with timer.phase("document_processor"):
+            processor = DocumentProcessor()
         
         # Initialize vector database
-        vector_db = VectorDatabase(settings.vector_db_type)
+        with timer.phase("vector_db"):
+            vector_db = VectorDatabase(settings.vector_db_type)
         
         # Try to load existing vector store
         try:
-            vector_db.load()
+            with timer.phase("vector_store_load"):
+                vector_db.load()
             logger.info("Loaded existing vector store")
         except:
             logger.info("No existing vector store found, will create new one")
         
+        # Load the embedding model before serving so the first query is not slow
+        if settings.embedding_warmup:
+            with timer.phase("embedding_warmup"):
+                vector_db.warm_up()
+        
         # Initialize LLM (try SageMaker first, fallback to Local)
-        try:
-            llm = SageMakerLLM()
-            logger.info("Using SageMaker LLM")
-        except:
-            llm = LocalLLM()
-            logger.info("Using Local LLM")
+        with timer.phase("llm"):
+            try:
+                llm = SageMakerLLM()
+                logger.info("Using SageMaker LLM")
+            except:
+                llm = LocalLLM()
+                logger.info("Using Local LLM")
         
         # Initialize RAG pipeline
         rag_pipeline = RAGPipeline(vector_db, llm)
         
+        timer.log()
         logger.info("RAG Chatbot initialized successfully")
         
     except Exception as e:
@@ -244,6 +262,25 @@ async def query_chatbot(request: QueryRequest):
         logger.error(f"Error processing query: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/query/batch")
+async def query_chatbot_batch(request: BatchQueryRequest):
+    """Query the RAG chatbot with many questions, streaming results back as NDJSON"""
+    if not rag_pipeline:
+        raise HTTPException(status_code=500, detail="RAG pipeline not initialized")
+    
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="No questions provided")
+    
+    def generate_lines():
+        for result in rag_pipeline.query_batch(
+            request.questions,
+            num_docs=request.num_docs,
+            max_concurrency=request.max_concurrency
+        ):
+            yield json.dumps(result) + "\n"
+    
+    return StreamingResponse(generate_lines(), media_type="application/x-ndjson")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
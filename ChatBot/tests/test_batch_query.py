@@ -0,0 +1,125 @@
+"""
+Tests for batched RAG queries and the /query/batch NDJSON endpoint.
+"""
+
+import json
+import threading
+import time
+import sys
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain.schema import Document
+from src import web_interface
+from src.config import settings
+from src.llm_integration import LLMInterface, RAGPipeline
+
+
+class StubVectorDB:
+    """Returns one scored document per question from a single batched lookup."""
+
+    def __init__(self):
+        self.batches = []
+
+    def search_batch(self, queries, k=5):
+        self.batches.append(list(queries))
+        return [[(Document(page_content=f"context for {query}"), 0.5)] for query in queries]
+
+
+class StubLLM(LLMInterface):
+    """Answers after a delay that shrinks with the question number and records its peak concurrency."""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def generate_response(self, query, context):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        try:
+            # Later questions finish first, so completion order differs from input order
+            time.sleep(0.05 / (1 + int(query.split()[-1])))
+            if query in self.fail_on:
+                raise RuntimeError(f"generation failed for {query}")
+            return f"answer to {query}"
+        finally:
+            with self.lock:
+                self.active -= 1
+
+
+QUESTIONS = [f"question {i}" for i in range(8)]
+
+
+def test_query_batch_tags_results_with_index():
+    """Test every question is answered once, matched to its input index, after one batched retrieval"""
+    vector_db = StubVectorDB()
+    pipeline = RAGPipeline(vector_db, StubLLM())
+
+    results = list(pipeline.query_batch(QUESTIONS, num_docs=1, max_concurrency=4))
+
+    assert vector_db.batches == [QUESTIONS]
+    assert sorted(result["index"] for result in results) == list(range(len(QUESTIONS)))
+    for result in results:
+        assert result["question"] == QUESTIONS[result["index"]]
+        assert result["answer"] == f"answer to {QUESTIONS[result['index']]}"
+        assert result["num_sources"] == 1
+
+
+def test_query_batch_isolates_failed_questions():
+    """Test a failing generation only turns its own result into an error"""
+    pipeline = RAGPipeline(StubVectorDB(), StubLLM(fail_on={"question 3"}))
+
+    results = {result["index"]: result for result in pipeline.query_batch(QUESTIONS, max_concurrency=2)}
+
+    assert len(results) == len(QUESTIONS)
+    assert "generation failed" in results[3]["error"]
+    assert all("error" not in result for index, result in results.items() if index != 3)
+
+
+def test_query_batch_caps_concurrency(monkeypatch):
+    """Test requested concurrency never exceeds the configured limit"""
+    monkeypatch.setattr(settings, "batch_query_concurrency", 2)
+    llm = StubLLM()
+    pipeline = RAGPipeline(StubVectorDB(), llm)
+
+    results = list(pipeline.query_batch(QUESTIONS, max_concurrency=1000))
+
+    assert len(results) == len(QUESTIONS)
+    assert llm.peak == 2
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(web_interface, "rag_pipeline", RAGPipeline(StubVectorDB(), StubLLM(fail_on={"question 5"})))
+    return TestClient(web_interface.app)
+
+
+def test_batch_endpoint_streams_ndjson(client):
+    """Test /query/batch streams one JSON line per question"""
+    response = client.post("/query/batch", json={"questions": QUESTIONS, "num_docs": 1, "max_concurrency": 3})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(result["index"] for result in results) == list(range(len(QUESTIONS)))
+    assert [result["index"] for result in results if "error" in result] == [5]
+
+
+@pytest.mark.parametrize("max_concurrency", [0, -1])
+def test_batch_endpoint_rejects_invalid_concurrency(client, max_concurrency):
+    """Test a concurrency below one is a validation error, not a default or a server error"""
+    response = client.post("/query/batch", json={"questions": QUESTIONS, "max_concurrency": max_concurrency})
+
+    assert response.status_code == 422
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
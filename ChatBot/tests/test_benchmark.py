@@ -0,0 +1,143 @@
+"""
+Smoke tests for the benchmark harness against the stub Ollama server.
+"""
+
+import json
+import zlib
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain.schema import Document
+from src import benchmark
+from src.benchmark import StubOllamaServer, benchmark_query_endpoint, benchmark_retrieval, generate_synthetic_queries
+from src.llm_integration import LocalLLM
+from src.vector_database import VectorDatabase, VectorStore
+
+
+class HashEmbedder:
+    """Deterministic bag-of-words embeddings, so the harness runs without a model download."""
+
+    dimension = 32
+
+    def encode_texts(self, texts):
+        embeddings = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                embeddings[row, zlib.crc32(word.encode()) % self.dimension] += 1.0
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.maximum(norms, 1e-12)
+
+    def encode_documents(self, documents):
+        return self.encode_texts([doc.page_content for doc in documents])
+
+    def encode_query(self, query):
+        return self.encode_texts([query])[0]
+
+    def warm_up(self):
+        pass
+
+
+class InMemoryStore(VectorStore):
+    """Brute-force cosine search over the added embeddings."""
+
+    def __init__(self):
+        self.documents = []
+        self.embeddings = np.zeros((0, HashEmbedder.dimension), dtype=np.float32)
+
+    def add_documents(self, documents, embeddings):
+        self.documents.extend(documents)
+        self.embeddings = np.vstack([self.embeddings, embeddings])
+
+    def similarity_search(self, query_embedding, k=5):
+        scores = self.embeddings @ query_embedding
+        return [(self.documents[i], float(scores[i])) for i in np.argsort(-scores)[:k]]
+
+    def save(self, path):
+        pass
+
+    def load(self, path):
+        pass
+
+
+def make_vector_db(documents=()):
+    vector_db = VectorDatabase("memory", store=InMemoryStore())
+    vector_db.embedder = HashEmbedder()
+    if documents:
+        vector_db.add_documents(list(documents))
+    return vector_db
+
+
+def test_stub_server_serves_ollama_api():
+    """Test LocalLLM gets the stub answer through the Ollama chat API"""
+    with StubOllamaServer(latency_ms=0, response_tokens=3) as server:
+        llm = LocalLLM(base_url=server.base_url)
+        answer = llm.generate_response("What is a forecast?", [Document(page_content="forecast")])
+
+    assert answer == "stub stub stub"
+
+
+def test_retrieval_and_query_endpoint_smoke():
+    """Test retrieval and /query latencies are measured for every query without errors"""
+    documents = [Document(page_content=f"{topic} {' '.join(words)}", metadata={"topic": topic})
+                 for topic, words in benchmark.SYNTHETIC_TOPICS.items()]
+    vector_db = make_vector_db(documents)
+    queries = generate_synthetic_queries(5)
+
+    retrieval = benchmark_retrieval(vector_db, queries, k=2)
+    assert retrieval["total"]["count"] == len(queries)
+
+    with StubOllamaServer(latency_ms=0) as server:
+        result = benchmark_query_endpoint(vector_db, queries, server.base_url, num_docs=2)
+
+    assert result["count"] == len(queries)
+    assert result["errors"] == 0
+    assert result["p99_ms"] >= result["p50_ms"] > 0
+
+
+def test_run_benchmark_writes_results(tmp_path, monkeypatch):
+    """Test the full run ingests the synthetic corpus and writes a JSON report"""
+    pytest.importorskip("bs4")
+    created = []
+
+    def create_vector_db(store_type):
+        created.append(store_type)
+        return make_vector_db()
+
+    monkeypatch.setattr(benchmark, "_create_vector_db", create_vector_db)
+    output_path = tmp_path / "results.json"
+
+    results = benchmark.run_benchmark(["memory"], num_docs=4, num_queries=3, k=2,
+                                      llm_latency_ms=0, output_path=str(output_path))
+
+    assert created == ["memory"]
+    assert json.loads(output_path.read_text()) == results
+    assert results["timestamp"].endswith("+00:00")
+    store = results["stores"]["memory"]
+    assert store["ingestion"]["documents"] == 4 and store["ingestion"]["chunks"] > 0
+    assert store["query"]["count"] == 3 and store["query"]["errors"] == 0
+
+
+def test_chroma_benchmark_uses_its_own_collection(tmp_path, monkeypatch):
+    """Test the benchmark never opens the application collection and removes its own"""
+    chromadb = pytest.importorskip("chromadb")
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(benchmark.VectorDatabase, "warm_up", lambda self: None)
+
+    vector_db = benchmark._create_vector_db("chroma")
+    name = vector_db.store.collection_name
+    client = chromadb.PersistentClient(path="./chroma_db")
+    assert name.startswith("benchmark_")
+    assert [c if isinstance(c, str) else c.name for c in client.list_collections()] == [name]
+
+    benchmark._drop_vector_db(vector_db)
+    assert client.list_collections() == []
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
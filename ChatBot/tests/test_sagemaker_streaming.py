@@ -0,0 +1,159 @@
+"""
+Tests for the async SageMaker client against a local HTTP stand-in.
+"""
+
+import asyncio
+import binascii
+import json
+import struct
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import sys
+import os
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from langchain.schema import Document
+from src.sagemaker_streaming import AsyncSageMakerLLM, MicroBatcher, TokenStreamParser
+
+
+def encode_event(payload: bytes) -> bytes:
+    """Encode a PayloadPart in the AWS event stream binary format."""
+    headers = b""
+    for name, value in ((":event-type", "PayloadPart"),
+                        (":content-type", "application/octet-stream"),
+                        (":message-type", "event")):
+        name, value = name.encode(), value.encode()
+        headers += struct.pack(">B", len(name)) + name + b"\x07" + struct.pack(">H", len(value)) + value
+
+    prelude = struct.pack(">II", 16 + len(headers) + len(payload), len(headers))
+    message = prelude + struct.pack(">I", binascii.crc32(prelude)) + headers + payload
+    return message + struct.pack(">I", binascii.crc32(message))
+
+
+class SageMakerStandInHandler(BaseHTTPRequestHandler):
+    """Implements the invocations and invocations-response-stream routes."""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        self.server.requests.append(body)
+
+        if self.path.endswith("/invocations-response-stream"):
+            tokens = ["Hello", " from", " SageMaker", "</s>"]
+            stream = b"".join(
+                b"data:" + json.dumps({"token": {"text": token, "special": token == "</s>"}}).encode() + b"\n\n"
+                for token in tokens
+            )
+            # Split at arbitrary offsets so events do not line up with JSON lines
+            parts = [stream[i:i + 7] for i in range(0, len(stream), 7)]
+            content = b"".join(encode_event(part) for part in parts)
+            content_type = "application/vnd.amazon.eventstream"
+        else:
+            inputs = body["inputs"]
+            if isinstance(inputs, list):
+                result = [[{"generated_text": f"answer {i}"}] for i in range(len(inputs))]
+            else:
+                result = [{"generated_text": "single answer"}]
+            content = json.dumps(result).encode()
+            content_type = "application/json"
+
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def stand_in(monkeypatch):
+    """Run the stand-in on a free local port with dummy AWS credentials."""
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SageMakerStandInHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def endpoint_url(server) -> str:
+    host, port = server.server_address[:2]
+    return f"http://{host}:{port}"
+
+
+class TestAsyncSageMakerLLM:
+    """Test suite for streaming and micro-batched SageMaker calls."""
+
+    context = [Document(page_content="SageMaker hosts the model.")]
+
+    def test_token_stream_parser_split_lines(self):
+        """Test that tokens split across payload parts are reassembled."""
+        parser = TokenStreamParser()
+
+        assert parser.feed(b'data:{"token": {"te') == []
+        assert parser.feed(b'xt": "Hi"}}\n\ndata:{"token": {"text": "!"}}') == ["Hi"]
+        assert parser.flush() == ["!"]
+
+    def test_stream_response(self, stand_in):
+        """Test token streaming through invoke_endpoint_with_response_stream."""
+        async def collect():
+            async with AsyncSageMakerLLM("llama3-endpoint", endpoint_url=endpoint_url(stand_in)) as llm:
+                return [token async for token in llm.stream_response("Who hosts it?", self.context)]
+
+        tokens = asyncio.run(collect())
+
+        assert tokens == ["Hello", " from", " SageMaker"]
+        assert stand_in.requests[0]["stream"] is True
+
+    def test_generate_response_single(self, stand_in):
+        """Test a non-batched request."""
+        async def generate():
+            async with AsyncSageMakerLLM("llama3-endpoint", endpoint_url=endpoint_url(stand_in),
+                                         batching=False) as llm:
+                return await llm.generate_response("Who hosts it?", self.context)
+
+        assert asyncio.run(generate()) == "single answer"
+        assert isinstance(stand_in.requests[0]["inputs"], str)
+
+    def test_generate_response_micro_batched(self, stand_in):
+        """Test that concurrent prompts share one multi-input request."""
+        async def generate():
+            async with AsyncSageMakerLLM("llama3-endpoint", endpoint_url=endpoint_url(stand_in),
+                                         batching=True, max_batch_size=4, max_batch_wait_ms=50) as llm:
+                return await asyncio.gather(*[
+                    llm.generate_response(f"Question {i}?", self.context) for i in range(4)
+                ])
+
+        answers = asyncio.run(generate())
+
+        assert answers == ["answer 0", "answer 1", "answer 2", "answer 3"]
+        assert len(stand_in.requests) == 1
+        assert len(stand_in.requests[0]["inputs"]) == 4
+
+    def test_micro_batcher_deadline(self):
+        """Test that a partial batch is flushed once the wait deadline passes."""
+        batches = []
+
+        async def submit_batch(prompts):
+            batches.append(prompts)
+            return [prompt.upper() for prompt in prompts]
+
+        async def run():
+            batcher = MicroBatcher(submit_batch, max_batch_size=8, max_wait_ms=5)
+            return await asyncio.gather(batcher.submit("a"), batcher.submit("b"))
+
+        assert asyncio.run(run()) == ["A", "B"]
+        assert batches == [["a", "b"]]
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
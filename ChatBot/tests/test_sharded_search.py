@@ -0,0 +1,128 @@
+"""
+Tests for sharded vector search with searcher processes.
+"""
+
+import socket
+import sys
+import os
+
+import numpy as np
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from multiprocessing import AuthenticationError
+
+from langchain.schema import Document
+from src.config import settings
+from src.sharded_search import (
+    SearcherPool,
+    ShardSearcher,
+    ShardedSearchClient,
+    build_shards,
+    load_manifest
+)
+
+
+def free_base_port(num_ports: int) -> int:
+    """Find a run of consecutive free local ports."""
+    for _ in range(20):
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            base_port = sock.getsockname()[1]
+        if base_port + num_ports >= 65535:
+            continue
+        try:
+            for offset in range(num_ports):
+                with socket.socket() as sock:
+                    sock.bind(("127.0.0.1", base_port + offset))
+            return base_port
+        except OSError:
+            continue
+    pytest.skip("No consecutive free ports available")
+
+
+@pytest.fixture
+def corpus():
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(103, 16)).astype(np.float32)
+    documents = [Document(page_content=f"doc {i}", metadata={"id": i}) for i in range(len(embeddings))]
+    return documents, embeddings
+
+
+def brute_force_top_k(embeddings, query, k):
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    scores = normalized @ (query / np.linalg.norm(query))
+    return list(np.argsort(-scores)[:k])
+
+
+class TestShardedSearch:
+    """Test suite for shard building and scatter-gather search."""
+
+    def test_build_shards(self, corpus, tmp_path):
+        """Test that shards partition every document exactly once."""
+        documents, embeddings = corpus
+
+        manifest = build_shards(documents, embeddings, str(tmp_path), num_shards=4)
+
+        assert manifest == load_manifest(str(tmp_path))
+        assert sum(manifest["shard_sizes"]) == len(documents)
+        assert ShardSearcher(str(tmp_path), 0).vectors.shape == (manifest["shard_sizes"][0], 16)
+
+    def test_scatter_gather_matches_brute_force(self, corpus, tmp_path):
+        """Test that merged shard results equal an exhaustive search."""
+        documents, embeddings = corpus
+        build_shards(documents, embeddings, str(tmp_path), num_shards=3)
+        queries = embeddings[:5] + 0.1
+
+        with SearcherPool(str(tmp_path), base_port=free_base_port(3)) as pool:
+            client = ShardedSearchClient(pool.addresses, pool.authkey)
+            try:
+                results = client.search_batch(queries, k=7)
+            finally:
+                client.close()
+
+        for query, hits in zip(queries, results):
+            scores = [score for _, score in hits]
+            assert [doc.metadata["id"] for doc, _ in hits] == brute_force_top_k(embeddings, query, 7)
+            assert scores == sorted(scores, reverse=True)
+
+    def test_pool_without_authkey_uses_random_key(self, corpus, tmp_path, monkeypatch):
+        """Test that without SHARD_AUTHKEY each pool gets its own key and other keys are rejected."""
+        monkeypatch.setattr(settings, "shard_authkey", None)
+        documents, embeddings = corpus
+        build_shards(documents, embeddings, str(tmp_path), num_shards=1)
+
+        with pytest.raises(ValueError):
+            ShardedSearchClient([("127.0.0.1", 1)])
+
+        with SearcherPool(str(tmp_path), base_port=free_base_port(1)) as pool:
+            assert len(pool.authkey) == 32
+            assert pool.authkey != SearcherPool(str(tmp_path)).authkey
+
+            client = ShardedSearchClient(pool.addresses, pool.authkey)
+            try:
+                assert len(client.search_batch(embeddings[:1], k=3)[0]) == 3
+            finally:
+                client.close()
+
+            intruder = ShardedSearchClient(pool.addresses, b"rag-chatbot-shards")
+            with pytest.raises(AuthenticationError):
+                intruder.search_batch(embeddings[:1], k=3)
+
+    def test_pool_refuses_public_host_without_authkey(self, corpus, tmp_path, monkeypatch):
+        """Test that searchers are not exposed beyond loopback without an explicit key."""
+        monkeypatch.setattr(settings, "shard_authkey", None)
+        documents, embeddings = corpus
+        build_shards(documents, embeddings, str(tmp_path), num_shards=2)
+
+        with pytest.raises(ValueError, match="non-loopback"):
+            SearcherPool(str(tmp_path), host="0.0.0.0")
+
+        pool = SearcherPool(str(tmp_path), host="0.0.0.0", authkey=b"explicit-key")
+        assert pool.authkey == b"explicit-key"
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
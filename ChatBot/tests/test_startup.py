@@ -0,0 +1,81 @@
+"""
+Tests for lazy backend imports and the startup timing breakdown.
+"""
+
+import json
+import logging
+import subprocess
+import sys
+import os
+import time
+
+import pytest
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src import startup
+from src.startup import StartupTimer
+
+CHATBOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+HEAVY_MODULES = ["chromadb", "faiss", "sentence_transformers", "boto3"]
+
+
+def test_main_import_skips_heavy_backends():
+    """Test importing the CLI entry point loads none of the heavy backends"""
+    # A fresh interpreter, since other tests may already have imported them. Import
+    # attempts are recorded, so the check holds whether or not the backends are installed
+    code = (
+        "import json, sys\n"
+        f"heavy, attempted = {HEAVY_MODULES!r}, []\n"
+        "class RecordHeavyImports:\n"
+        "    def find_spec(self, name, path=None, target=None):\n"
+        "        if name.split('.')[0] in heavy:\n"
+        "            attempted.append(name)\n"
+        "        return None\n"
+        "sys.meta_path.insert(0, RecordHeavyImports())\n"
+        "import src.main\n"
+        "print(json.dumps(sorted(set(attempted) | {m for m in heavy if m in sys.modules})))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=CHATBOT_DIR,
+                            capture_output=True, text=True, timeout=120)
+
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout.splitlines()[-1]) == []
+
+
+def test_startup_timer_breakdown(monkeypatch, caplog):
+    """Test phases are recorded in order and logged with the total since start"""
+    now = [100.0]
+    monkeypatch.setattr(startup.time, "perf_counter", lambda: now[0])
+    timer = StartupTimer("web startup")
+
+    now[0] = 100.25
+    timer.mark("imports", 100.0)
+    with timer.phase("vector_db"):
+        now[0] = 101.0
+    with pytest.raises(RuntimeError):
+        with timer.phase("llm"):
+            now[0] = 101.5
+            raise RuntimeError("llm unavailable")
+
+    now[0] = 102.0
+    with caplog.at_level(logging.INFO, logger=startup.__name__):
+        breakdown = timer.log()
+
+    assert breakdown == {"imports": 0.25, "vector_db": 0.75, "llm": 0.5, "total": 2.0}
+    assert list(breakdown) == ["imports", "vector_db", "llm", "total"]
+    assert "web startup timing: imports=250.0ms, vector_db=750.0ms, llm=500.0ms, total=2000.0ms" in caplog.text
+
+
+def test_startup_timer_measures_from_given_start():
+    """Test a timer created late still counts time since the given start"""
+    start = time.perf_counter() - 1.0
+
+    breakdown = StartupTimer(start=start).log()
+
+    assert breakdown["total"] >= 1.0
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -5,8 +5,6 @@ Produce sample sensor data to Kafka for testing the ETL pipeline.
 
 import json
 import time
-import random
-from datetime import datetime, timedelta
 from confluent_kafka import Producer
 import sys
 import os
@@ -16,6 +14,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 from src.utils.config import Config
 from src.utils.logger import setup_logger
+from src.utils.sample_data import generate_sensor_events
 
 logger = setup_logger(__name__)
 
@@ -38,34 +37,9 @@ def generate_sensor_data(device_id: str, num_samples: int = 100):
     """
     producer = Producer(Config.get_kafka_producer_config())
     
-    base_timestamp = datetime.now() - timedelta(hours=num_samples)
-    base_value = 50.0
-    
     logger.info(f"Generating {num_samples} samples for device {device_id}...")
     
-    for i in range(num_samples):
-        timestamp = base_timestamp + timedelta(hours=i)
-        
-        # Generate realistic sensor data with components:
-        # - Trend: slow increase over time
-        # - Seasonality: daily pattern
-        # - Noise: random fluctuations
-        trend = 0.05 * i
-        seasonality = 10 * random.random() * (1 + 0.5 * (i % 24) / 24)
-        noise = random.gauss(0, 2)
-        
-        value = base_value + trend + seasonality + noise
-        
-        event = {
-            'device_id': device_id,
-            'value': round(value, 2),
-            'timestamp': timestamp.isoformat(),
-            'metadata': {
-                'sensor_type': 'temperature',
-                'unit': 'celsius'
-            }
-        }
-        
+    for i, event in enumerate(generate_sensor_events(device_id, num_samples)):
         # Produce to Kafka
         producer.produce(
             Config.KAFKA_RAW_TOPIC,
@@ -30,7 +30,7 @@ if [ -f "models/time_series_lstm.keras" ]; then
     echo "========================================="
     echo ""
     echo "Model saved at: models/time_series_lstm.keras"
-    ls -lh models/time_series_lstm.keras
+    ls -lh models/time_series_lstm.keras models/time_series_lstm.*.tflite
 else
     echo ""
     echo "Error: Model file was not created!"
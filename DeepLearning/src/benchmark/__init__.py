@@ -0,0 +1 @@
+"""Throughput and latency benchmarks for the pipeline services."""
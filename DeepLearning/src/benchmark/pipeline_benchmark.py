@@ -0,0 +1,300 @@
+"""
+In-process throughput benchmark for the pipeline services.
+
+This script:
+1. Replays data/sample_timeseries.csv or synthetic produce_sample_data events
+   into an in-memory broker at a configurable rate
+2. Runs the ETL and inference workers (or the fused worker) on that broker,
+   each in its own thread
+3. Matches every output message to its input by device and timestamp
+4. Reports messages/s, p50/p99 latency and CPU time per stage
+
+Stage CPU is the CPU time of the stage's thread. Work TensorFlow runs on
+its own thread pool (Keras and tf_function backends) is only included in the
+process total; the TFLite backend with one thread runs on the stage thread.
+"""
+
+import argparse
+import functools
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.utils.config import Config
+from src.utils.logger import setup_logger
+from src.utils.feature_codec import decode_features
+from src.utils.sample_data import generate_sensor_events, load_sample_csv, repeat_events
+from src.utils.transport import InMemoryBroker, InMemoryMessage
+from src.etl_service.kafka_etl_worker import ETLWorker
+from src.inference_service.kafka_ml_inference import InferenceWorker
+from src.inference_service.model_loader import ModelLoader
+from src.inference_service.runtime import warm_up
+from src.fused_service.kafka_fused_worker import FusedWorker
+
+logger = setup_logger(__name__)
+
+PIPELINES = ('split', 'fused')
+
+MessageKey = Tuple[str, str]
+
+
+def load_events(
+    source: str,
+    repeat: int = 1,
+    devices: int = 3,
+    samples_per_device: int = 50
+) -> List[dict]:
+    """
+    Load the events to replay.
+
+    Args:
+        source: 'synthetic' for produce_sample_data events, otherwise a CSV path
+        repeat: Copies of the CSV recording, shifted in time
+        devices: Number of synthetic devices
+        samples_per_device: Synthetic events per device
+
+    Returns:
+        Raw sensor events; synthetic devices are interleaved like live traffic
+    """
+    if source != 'synthetic':
+        return repeat_events(load_sample_csv(source), repeat)
+
+    streams = [list(generate_sensor_events(f'sensor-{i + 1:03d}', samples_per_device)) for i in range(devices)]
+    return [event for step in zip(*streams) for event in step]
+
+
+def replay(producer, events: List[dict], rate: float, topic: str = Config.KAFKA_RAW_TOPIC):
+    """
+    Produce events at a fixed rate.
+
+    Sends are scheduled at start + i / rate, so a slow send does not lower the
+    average rate; a rate of 0 sends as fast as possible.
+    """
+    started = time.perf_counter()
+    for i, event in enumerate(events):
+        if rate > 0:
+            delay = started + i / rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        producer.produce(topic, key=event['device_id'].encode('utf-8'), value=json.dumps(event).encode('utf-8'))
+    producer.flush()
+
+
+def expected_windows(events: List[dict], window_size: int) -> int:
+    """Number of feature windows the events produce from empty window state."""
+    counts: Dict[str, int] = {}
+    for event in events:
+        counts[event['device_id']] = counts.get(event['device_id'], 0) + 1
+    return sum(max(0, count - window_size + 1) for count in counts.values())
+
+
+def _json_key(message: InMemoryMessage) -> MessageKey:
+    payload = json.loads(message.value())
+    return payload['device_id'], payload['timestamp']
+
+
+def _feature_key(message: InMemoryMessage) -> MessageKey:
+    payload = decode_features(message.value(), message.headers())
+    return payload['device_id'], payload['latest_timestamp']
+
+
+def _times(messages: List[InMemoryMessage], key) -> Dict[MessageKey, float]:
+    return {key(message): message.produced_at for message in messages}
+
+
+def stage_report(
+    stage: str,
+    inputs: Dict[MessageKey, float],
+    outputs: Dict[MessageKey, float],
+    cpu_s: Optional[float]
+) -> dict:
+    """
+    Summarize one stage from the produce times of its input and output messages.
+
+    Throughput is input messages over the time from the first input to the
+    last output; latency covers the inputs that produced an output.
+    """
+    latencies = np.array([(produced_at - inputs[key]) * 1000
+                          for key, produced_at in outputs.items() if key in inputs])
+    duration = (max(outputs.values()) - min(inputs.values())) if inputs and outputs else 0.0
+    return {
+        'stage': stage,
+        'messages_in': len(inputs),
+        'messages_out': len(outputs),
+        'throughput_msgs_s': len(inputs) / duration if duration > 0 else 0.0,
+        'latency_p50_ms': float(np.percentile(latencies, 50)) if len(latencies) else None,
+        'latency_p99_ms': float(np.percentile(latencies, 99)) if len(latencies) else None,
+        'cpu_s': cpu_s,
+        'cpu_us_per_msg': cpu_s / len(inputs) * 1e6 if cpu_s is not None and inputs else None
+    }
+
+
+def _run_stage(run, cpu_times: Dict[str, float], stage: str):
+    started = time.thread_time()
+    try:
+        run()
+    finally:
+        cpu_times[stage] = time.thread_time() - started
+
+
+def run_benchmark(
+    events: List[dict],
+    model_loader: ModelLoader,
+    rate: float = 0.0,
+    pipeline: str = 'split',
+    batched: bool = True,
+    num_partitions: int = 4,
+    timeout_s: float = 120.0
+) -> List[dict]:
+    """
+    Replay events through the services on an in-memory broker.
+
+    Args:
+        events: Raw sensor events in replay order
+        model_loader: Loader with a loaded backend
+        rate: Replay rate in messages/s (0 for unthrottled)
+        pipeline: 'split' (ETL worker + inference worker) or 'fused'
+        batched: Run the ETL worker in batch mode
+        num_partitions: Partitions per topic
+        timeout_s: Longest wait for the last prediction after the replay
+
+    Returns:
+        One report per stage, then the end-to-end report
+    """
+    if pipeline not in PIPELINES:
+        raise ValueError(f"Unknown pipeline '{pipeline}', expected one of {PIPELINES}")
+
+    broker = InMemoryBroker(num_partitions=num_partitions)
+    if pipeline == 'split':
+        etl_worker = ETLWorker(broker)
+        stages = {'etl': etl_worker, 'inference': InferenceWorker(broker, model_loader)}
+        runs = {'etl': functools.partial(etl_worker.run, batched=batched), 'inference': stages['inference'].run}
+        window_size = etl_worker.window_store.window_size
+    else:
+        stages = {'fused': FusedWorker(broker, model_loader, features_tap=False)}
+        runs = {'fused': stages['fused'].run}
+        window_size = stages['fused'].window_store.window_size
+
+    expected = expected_windows(events, window_size)
+    cpu_times: Dict[str, float] = {}
+    threads = [threading.Thread(target=_run_stage, args=(run, cpu_times, stage), name=f'bench-{stage}')
+               for stage, run in runs.items()]
+
+    process_started = time.process_time()
+    for thread in threads:
+        thread.start()
+
+    replay_cpu_started = time.thread_time()
+    replay(broker.producer(), events, rate)
+    cpu_times['replay'] = time.thread_time() - replay_cpu_started
+
+    deadline = time.monotonic() + timeout_s
+    while len(broker.messages(Config.KAFKA_PREDICTIONS_TOPIC)) < expected and time.monotonic() < deadline:
+        time.sleep(0.01)
+
+    for worker in stages.values():
+        worker.stop()
+    for thread in threads:
+        thread.join()
+    process_cpu = time.process_time() - process_started
+
+    predictions = broker.messages(Config.KAFKA_PREDICTIONS_TOPIC)
+    if len(predictions) < expected:
+        logger.warning(f'Timed out with {len(predictions)} of {expected} predictions')
+
+    raw_times = _times(broker.messages(Config.KAFKA_RAW_TOPIC), _json_key)
+    prediction_times = _times(predictions, _json_key)
+
+    # The replay stage has no input topic; report its send rate and CPU only
+    reports = [{**stage_report('replay', raw_times, raw_times, cpu_times['replay']),
+                'latency_p50_ms': None, 'latency_p99_ms': None}]
+    if pipeline == 'split':
+        feature_times = _times(broker.messages(Config.KAFKA_FEATURES_TOPIC), _feature_key)
+        reports.append(stage_report('etl', raw_times, feature_times, cpu_times['etl']))
+        reports.append(stage_report('inference', feature_times, prediction_times, cpu_times['inference']))
+    else:
+        reports.append(stage_report('fused', raw_times, prediction_times, cpu_times['fused']))
+    reports.append(stage_report('end_to_end', raw_times, prediction_times, process_cpu))
+    return reports
+
+
+def _format(value, spec: str) -> str:
+    return '-' if value is None else format(value, spec)
+
+
+def log_reports(reports: List[dict]):
+    """Log the stage reports as a table."""
+    logger.info(f"{'stage':<11} {'in':>7} {'out':>7} {'msgs/s':>10} {'p50 ms':>9} {'p99 ms':>9} "
+                f"{'cpu s':>8} {'cpu us/msg':>11}")
+    for report in reports:
+        logger.info(f"{report['stage']:<11} {report['messages_in']:>7} {report['messages_out']:>7} "
+                    f"{report['throughput_msgs_s']:>10.0f} {_format(report['latency_p50_ms'], '>9.2f')} "
+                    f"{_format(report['latency_p99_ms'], '>9.2f')} {_format(report['cpu_s'], '>8.2f')} "
+                    f"{_format(report['cpu_us_per_msg'], '>11.1f')}")
+
+
+def main():
+    """Run the pipeline benchmark from the command line."""
+    parser = argparse.ArgumentParser(description='In-process throughput benchmark for the pipeline services')
+    parser.add_argument('--source', default='data/sample_timeseries.csv',
+                        help="CSV file to replay, or 'synthetic' for produce_sample_data events")
+    parser.add_argument('--repeat', type=int, default=100, help='Copies of the CSV recording')
+    parser.add_argument('--devices', type=int, default=3, help='Synthetic devices')
+    parser.add_argument('--samples-per-device', type=int, default=1000, help='Synthetic events per device')
+    parser.add_argument('--rate', type=float, default=0.0, help='Replay rate in messages/s (0: unthrottled)')
+    parser.add_argument('--pipeline', choices=PIPELINES, default='split')
+    parser.add_argument('--per-message', action='store_true', help='Run the ETL worker per message')
+    parser.add_argument('--backend', default=Config.INFERENCE_BACKEND)
+    parser.add_argument('--model', help='Keras model to serve (default: an untrained model of Config.WINDOW_SIZE)')
+    parser.add_argument('--partitions', type=int, default=4)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    parser.add_argument('--output', help='Write the reports to this JSON file')
+    args = parser.parse_args()
+
+    events = load_events(args.source, args.repeat, args.devices, args.samples_per_device)
+
+    with tempfile.TemporaryDirectory() as model_dir:
+        if args.model:
+            model_loader = ModelLoader(args.model, model_version=Config.MODEL_VERSION)
+        else:
+            # Latency does not depend on the weights, so an untrained model will do
+            from src.models.lstm_model import build_lstm_model
+            model_path = os.path.join(model_dir, 'untrained.keras')
+            build_lstm_model(Config.WINDOW_SIZE, 1).save(model_path)
+            model_loader = ModelLoader(model_path, model_version='untrained')
+
+        model = model_loader.load_model()
+        backend = model_loader.load_backend(args.backend, num_threads=Config.INFERENCE_THREADS)
+        # Trace and allocate for every batch size the micro-batcher can produce
+        warm_up(backend, model, range(1, Config.BATCH_SIZE + 1))
+
+        logger.info(f"Replaying {len(events)} events from {args.source} "
+                    f"at {args.rate or 'unthrottled'} msgs/s ({args.pipeline} pipeline, {args.backend} backend)")
+        reports = run_benchmark(
+            events,
+            model_loader,
+            rate=args.rate,
+            pipeline=args.pipeline,
+            batched=not args.per_message,
+            num_partitions=args.partitions,
+            timeout_s=args.timeout
+        )
+
+    log_reports(reports)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(reports, f, indent=2)
+        logger.info(f'Reports written to {args.output}')
+
+
+if __name__ == "__main__":
+    main()
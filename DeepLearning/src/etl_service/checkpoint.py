@@ -0,0 +1,164 @@
+"""Redis checkpoints of per-device window state for rebalance-safe ETL workers."""
+
+import time
+import numpy as np
+from collections import defaultdict
+from typing import Dict, Iterable, Optional, Set
+
+from src.etl_service.window_store import RingBufferWindowStore
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Hash field holding the last input offset covered by a partition checkpoint
+OFFSET_FIELD = '__offset__'
+
+
+class RedisWindowCheckpointer:
+    """
+    Periodically save changed device windows to Redis and restore them on assignment.
+
+    State is kept in one Redis hash per input partition, mapping device_id to
+    the window as raw float32 bytes, plus the last input offset the saved
+    windows include. Raw messages are keyed by device, so a device always
+    lives in the same partition and moves between workers with it.
+    """
+
+    def __init__(
+        self,
+        store: RingBufferWindowStore,
+        client,
+        topic: str,
+        key_prefix: str = 'etl:windows',
+        interval_s: float = 5.0,
+        batch_size: int = 500
+    ):
+        """
+        Initialize the checkpointer.
+
+        Args:
+            store: Window store to checkpoint
+            client: redis.Redis client
+            topic: Input topic whose partitions own the devices
+            key_prefix: Prefix of the per-partition Redis hashes
+            interval_s: Seconds between periodic checkpoints
+            batch_size: Devices written per HSET command
+        """
+        self.store = store
+        self.client = client
+        self.topic = topic
+        self.key_prefix = key_prefix
+        self.interval_s = interval_s
+        self.batch_size = batch_size
+        self.dirty: Dict[int, Set[str]] = defaultdict(set)
+        self.offsets: Dict[int, int] = {}
+        self.restored_offsets: Dict[int, int] = {}
+        self.partition_devices: Dict[int, Set[str]] = defaultdict(set)
+        self.last_checkpoint = time.monotonic()
+
+    def partition_key(self, partition: int) -> str:
+        """Redis hash holding the checkpoint of one partition."""
+        return f'{self.key_prefix}:{self.topic}:{partition}'
+
+    def already_applied(self, partition: int, offset: int) -> bool:
+        """Check whether a message is already part of the restored window state."""
+        restored = self.restored_offsets.get(partition)
+        return restored is not None and offset <= restored
+
+    def track(self, device_id: str, partition: int, offset: int):
+        """Record that a message from a partition updated a device window."""
+        self.dirty[partition].add(device_id)
+        self.partition_devices[partition].add(device_id)
+        self.offsets[partition] = offset
+
+    def maybe_checkpoint(self):
+        """Checkpoint if the interval has passed since the last checkpoint."""
+        if time.monotonic() - self.last_checkpoint >= self.interval_s:
+            self.checkpoint()
+
+    def checkpoint(self, partitions: Optional[Iterable[int]] = None) -> int:
+        """
+        Write changed windows to Redis, one MULTI/EXEC transaction per partition.
+
+        A partition's windows and its offset are applied together, so a crash
+        or Redis error never leaves saved windows ahead of the saved offset.
+
+        Args:
+            partitions: Partitions to checkpoint (default: all with changes)
+
+        Returns:
+            Number of device windows written
+        """
+        self.last_checkpoint = time.monotonic()
+        partitions = list(self.dirty) if partitions is None else [p for p in partitions if p in self.dirty]
+        if not partitions:
+            return 0
+
+        written = 0
+        for partition in partitions:
+            devices = self.dirty[partition]
+            mapping = {
+                device_id: self.store.window(device_id).astype('<f4').tobytes()
+                for device_id in devices if device_id in self.store
+            }
+            mapping[OFFSET_FIELD] = str(self.offsets[partition])
+
+            items = list(mapping.items())
+            pipe = self.client.pipeline(transaction=True)
+            for start in range(0, len(items), self.batch_size):
+                pipe.hset(self.partition_key(partition), mapping=dict(items[start:start + self.batch_size]))
+            pipe.execute()
+
+            # Only forget changes once they are saved, so a failed write is retried next time
+            del self.dirty[partition]
+            written += len(mapping) - 1
+
+        logger.debug(f'Checkpointed {written} windows for partitions {partitions}')
+        return written
+
+    def restore(self, partitions: Iterable[int]) -> int:
+        """
+        Load the saved windows of newly assigned partitions into the store.
+
+        Args:
+            partitions: Assigned partition numbers
+
+        Returns:
+            Number of device windows restored
+        """
+        partitions = list(partitions)
+        if not partitions:
+            return 0
+
+        pipe = self.client.pipeline(transaction=False)
+        for partition in partitions:
+            pipe.hgetall(self.partition_key(partition))
+
+        restored = 0
+        for partition, saved in zip(partitions, pipe.execute()):
+            for field, value in saved.items():
+                field = field.decode('utf-8') if isinstance(field, bytes) else field
+                if field == OFFSET_FIELD:
+                    self.restored_offsets[partition] = int(value)
+                    continue
+                self.store.restore(field, np.frombuffer(value, dtype='<f4'))
+                self.partition_devices[partition].add(field)
+                restored += 1
+
+        logger.info(f'Restored {restored} device windows for partitions {partitions}')
+        return restored
+
+    def release(self, partitions: Iterable[int]):
+        """
+        Checkpoint and drop the windows of revoked partitions.
+
+        Args:
+            partitions: Revoked partition numbers
+        """
+        partitions = list(partitions)
+        self.checkpoint(partitions)
+        for partition in partitions:
+            for device_id in self.partition_devices.pop(partition, ()):
+                self.store.remove(device_id)
+            self.offsets.pop(partition, None)
+            self.restored_offsets.pop(partition, None)
@@ -11,9 +11,10 @@ This worker:
 import json
 import numpy as np
 import logging
-from typing import Dict, List
-from confluent_kafka import Consumer, Producer, KafkaError
+import threading
 from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+from confluent_kafka import KafkaError
 import sys
 import os
 
@@ -22,23 +23,13 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 from src.utils.config import Config
 from src.utils.logger import setup_logger
-from src.etl_service.transform import transform_window
+from src.utils.transport import KafkaTransport, Transport
+from src.etl_service.window_store import RingBufferWindowStore
+from src.etl_service.transform import transform_windows
+from src.utils.feature_codec import encode_features
 
 logger = setup_logger(__name__)
 
-# Sliding window buffer per device (in-memory state)
-device_buffers: Dict[str, List[float]] = defaultdict(list)
-
-# Initialize Kafka consumer and producer
-consumer = Consumer(Config.get_kafka_consumer_config('etl-group'))
-producer = Producer(Config.get_kafka_producer_config())
-
-# Subscribe to input topic
-consumer.subscribe([Config.KAFKA_RAW_TOPIC])
-
-logger.info(f"ETL Worker started. Consuming from '{Config.KAFKA_RAW_TOPIC}'...")
-logger.info(f"Window size: {Config.WINDOW_SIZE}")
-
 
 def delivery_report(err, msg):
     """Callback for producer delivery reports."""
@@ -48,114 +39,323 @@ def delivery_report(err, msg):
         logger.debug(f'Message delivered to {msg.topic()} [{msg.partition()}]')
 
 
-def send_to_dlq(device_id: str, original_message: str, error_reason: str):
-    """
-    Send malformed messages to Dead Letter Queue for later analysis.
-    
-    Args:
-        device_id: Device identifier
-        original_message: The original message that failed
-        error_reason: Reason for failure
-    """
-    dlq_payload = {
-        'device_id': device_id,
-        'original_message': original_message,
-        'error_reason': error_reason,
-        'timestamp': str(np.datetime64('now'))
-    }
+def create_checkpointer(window_store: RingBufferWindowStore):
+    """Create the Redis window checkpointer configured in Config."""
+    import redis
+    from src.etl_service.checkpoint import RedisWindowCheckpointer
     
-    producer.produce(
-        Config.KAFKA_DLQ_TOPIC,
-        key=device_id.encode('utf-8'),
-        value=json.dumps(dlq_payload).encode('utf-8')
+    return RedisWindowCheckpointer(
+        window_store,
+        redis.Redis(**Config.get_redis_config()),
+        Config.KAFKA_RAW_TOPIC,
+        key_prefix=Config.CHECKPOINT_KEY_PREFIX,
+        interval_s=Config.CHECKPOINT_INTERVAL_S,
+        batch_size=Config.CHECKPOINT_BATCH_SIZE
     )
-    producer.poll(0)
-    logger.warning(f'Message sent to DLQ: {error_reason}')
 
 
-def stream_etl():
-    """Main ETL processing loop."""
-    processed_count = 0
-    error_count = 0
-    
-    try:
-        while True:
-            msg = consumer.poll(timeout=1.0)
-            
-            if msg is None:
-                continue
+class ETLWorker:
+    """Turns raw sensor messages into normalized feature windows."""
+
+    def __init__(
+        self,
+        transport: Transport,
+        window_store: Optional[RingBufferWindowStore] = None,
+        checkpointer=None,
+        group_id: str = 'etl-group'
+    ):
+        """
+        Create the consumer and producer and subscribe to the raw topic.
+        
+        Args:
+            transport: Source of the consumer and producer
+            window_store: Per-device window state (default: empty store of Config.WINDOW_SIZE)
+            checkpointer: Optional RedisWindowCheckpointer over window_store
+            group_id: Consumer group
+        """
+        # Sliding window per device (in-memory state): one preallocated row per device
+        # with running mean/variance, so each message is an O(1) update
+        self.window_store = window_store if window_store is not None else RingBufferWindowStore(Config.WINDOW_SIZE)
+        self.checkpointer = checkpointer
+        self.consumer = transport.consumer(group_id)
+        self.producer = transport.producer()
+        self.processed_count = 0
+        self.error_count = 0
+        self._stop = threading.Event()
+        
+        # Subscribe to input topic
+        if checkpointer is not None:
+            self.consumer.subscribe([Config.KAFKA_RAW_TOPIC], on_assign=self.on_assign, on_revoke=self.on_revoke)
+        else:
+            self.consumer.subscribe([Config.KAFKA_RAW_TOPIC])
+        
+        logger.info(f"ETL Worker started. Consuming from '{Config.KAFKA_RAW_TOPIC}'...")
+        logger.info(f"Window size: {self.window_store.window_size}")
+        logger.info(f"Feature format: {Config.FEATURE_FORMAT}")
+
+    def on_assign(self, consumer, partitions):
+        """Restore saved windows of newly assigned partitions."""
+        self.checkpointer.restore(p.partition for p in partitions if p.topic == Config.KAFKA_RAW_TOPIC)
+
+    def on_revoke(self, consumer, partitions):
+        """Checkpoint and drop windows of partitions moving to another worker."""
+        self.checkpointer.release(p.partition for p in partitions if p.topic == Config.KAFKA_RAW_TOPIC)
+
+    def stop(self):
+        """Ask the running loop to exit after its current iteration."""
+        self._stop.set()
+
+    def send_to_dlq(self, device_id: str, original_message: str, error_reason: str):
+        """
+        Send malformed messages to Dead Letter Queue for later analysis.
+        
+        Args:
+            device_id: Device identifier
+            original_message: The original message that failed
+            error_reason: Reason for failure
+        """
+        dlq_payload = {
+            'device_id': device_id,
+            'original_message': original_message,
+            'error_reason': error_reason,
+            'timestamp': str(np.datetime64('now'))
+        }
+        
+        self.producer.produce(
+            Config.KAFKA_DLQ_TOPIC,
+            key=device_id.encode('utf-8'),
+            value=json.dumps(dlq_payload).encode('utf-8')
+        )
+        self.producer.poll(0)
+        logger.warning(f'Message sent to DLQ: {error_reason}')
+
+    def produce_feature(self, device_id: str, feature_vector: np.ndarray, timestamp: str):
+        """Queue a feature window, serving delivery reports if the local queue is full."""
+        value, headers = encode_features(device_id, feature_vector, timestamp, Config.FEATURE_FORMAT)
+        try:
+            self.producer.produce(
+                Config.KAFKA_FEATURES_TOPIC,
+                key=device_id.encode('utf-8'),
+                value=value,
+                headers=headers,
+                callback=delivery_report
+            )
+        except BufferError:
+            self.producer.poll(1.0)
+            self.producer.produce(
+                Config.KAFKA_FEATURES_TOPIC,
+                key=device_id.encode('utf-8'),
+                value=value,
+                headers=headers,
+                callback=delivery_report
+            )
+
+    def stream_etl(self):
+        """Main ETL processing loop."""
+        checkpointer = self.checkpointer
+        
+        try:
+            while not self._stop.is_set():
+                msg = self.consumer.poll(timeout=1.0)
+                
+                if checkpointer is not None:
+                    checkpointer.maybe_checkpoint()
+                
+                if msg is None:
+                    continue
+                
+                if msg.error():
+                    if msg.error().code() == KafkaError._PARTITION_EOF:
+                        logger.debug(f'Reached end of partition {msg.partition()}')
+                    else:
+                        logger.error(f'Consumer error: {msg.error()}')
+                    continue
+                
+                # Skip messages already contained in restored window state, before
+                # parsing so replayed malformed messages are not sent to the DLQ again
+                if checkpointer is not None and checkpointer.already_applied(msg.partition(), msg.offset()):
+                    continue
+                
+                # Parse incoming message
+                try:
+                    raw_value = msg.value().decode('utf-8')
+                    data = json.loads(raw_value)
+                    device_id = data['device_id']
+                    value = float(data['value'])
+                    timestamp = data['timestamp']
+                except (json.JSONDecodeError, KeyError, ValueError) as e:
+                    self.error_count += 1
+                    logger.warning(f'Invalid message format: {e}')
+                    self.send_to_dlq('unknown', raw_value if 'raw_value' in locals() else 'undecodable', str(e))
+                    continue
                 
+                # Maintain chronologically ordered state in memory
+                window_ready = self.window_store.append(device_id, value)
+                if checkpointer is not None:
+                    checkpointer.track(device_id, msg.partition(), msg.offset())
+                
+                # Process once window is full
+                if window_ready:
+                    try:
+                        # Apply ETL transformation using the running window statistics
+                        normalized = self.window_store.normalized_window(device_id)
+                        
+                        # Publish to output topic in the configured wire format
+                        self.produce_feature(device_id, normalized, timestamp)
+                        self.producer.poll(0)
+                        
+                        self.processed_count += 1
+                        
+                        if self.processed_count % 10 == 0:
+                            logger.info(f'Processed {self.processed_count} windows (errors: {self.error_count})')
+                    
+                    except Exception as e:
+                        self.error_count += 1
+                        logger.error(f'Transformation error for device {device_id}: {e}')
+                        self.send_to_dlq(device_id, json.dumps(data), f'Transformation error: {e}')
+        
+        except KeyboardInterrupt:
+            logger.info('ETL worker interrupted by user')
+        finally:
+            self.close()
+
+    def process_batch(self, messages: list) -> Tuple[int, int]:
+        """
+        Transform a batch of raw messages with one vectorized normalization pass.
+        
+        Messages are grouped by device (keeping arrival order), every window that
+        became ready is stacked into one matrix and normalized together, and all
+        feature payloads are produced before a single poll.
+        
+        Args:
+            messages: Messages returned by consumer.consume()
+        
+        Returns:
+            Tuple of (windows produced, errors)
+        """
+        checkpointer = self.checkpointer
+        error_count = 0
+        device_values: Dict[str, List[float]] = defaultdict(list)
+        device_timestamps: Dict[str, List[str]] = defaultdict(list)
+        
+        for msg in messages:
             if msg.error():
-                if msg.error().code() == KafkaError._PARTITION_EOF:
-                    logger.debug(f'Reached end of partition {msg.partition()}')
-                else:
+                if msg.error().code() != KafkaError._PARTITION_EOF:
                     logger.error(f'Consumer error: {msg.error()}')
                 continue
             
-            # Parse incoming message
+            # Replayed messages, valid or not, are already reflected in the restored state
+            if checkpointer is not None and checkpointer.already_applied(msg.partition(), msg.offset()):
+                continue
+            
+            raw_value = None
             try:
                 raw_value = msg.value().decode('utf-8')
                 data = json.loads(raw_value)
                 device_id = data['device_id']
                 value = float(data['value'])
                 timestamp = data['timestamp']
-            except (json.JSONDecodeError, KeyError, ValueError) as e:
+            except (UnicodeDecodeError, json.JSONDecodeError, KeyError, ValueError) as e:
                 error_count += 1
                 logger.warning(f'Invalid message format: {e}')
-                send_to_dlq('unknown', raw_value if 'raw_value' in locals() else 'undecodable', str(e))
+                self.send_to_dlq('unknown', raw_value if raw_value is not None else 'undecodable', str(e))
                 continue
             
-            # Maintain chronologically ordered state in memory
-            device_buffers[device_id].append(value)
+            if checkpointer is not None:
+                checkpointer.track(device_id, msg.partition(), msg.offset())
             
-            # Process once window is full
-            if len(device_buffers[device_id]) >= Config.WINDOW_SIZE:
-                # Extract latest window
-                window_data = device_buffers[device_id][-Config.WINDOW_SIZE:]
+            device_values[device_id].append(value)
+            device_timestamps[device_id].append(timestamp)
+        
+        # Update windows and collect every window that became ready
+        ready_windows = []
+        ready_meta = []
+        for device_id, values in device_values.items():
+            windows = self.window_store.extend(device_id, values)
+            if len(windows):
+                ready_windows.append(windows)
+                timestamps = device_timestamps[device_id][-len(windows):]
+                ready_meta.extend((device_id, timestamp) for timestamp in timestamps)
+        
+        if not ready_windows:
+            self.producer.poll(0)
+            return 0, error_count
+        
+        try:
+            normalized = transform_windows(np.concatenate(ready_windows))
+        except Exception as e:
+            logger.error(f'Batch transformation error: {e}')
+            for device_id, timestamp in ready_meta:
+                self.send_to_dlq(device_id, json.dumps({'device_id': device_id, 'timestamp': timestamp}),
+                                 f'Transformation error: {e}')
+            return 0, error_count + len(ready_meta)
+        
+        for (device_id, timestamp), feature_vector in zip(ready_meta, normalized):
+            self.produce_feature(device_id, feature_vector, timestamp)
+        
+        # Serve delivery callbacks once per batch instead of once per message
+        self.producer.poll(0)
+        
+        return len(ready_meta), error_count
+
+    def stream_etl_batched(self):
+        """Main ETL processing loop consuming micro-batches of messages."""
+        logger.info(f'Batch mode: up to {Config.CONSUME_BATCH_SIZE} messages per consume call')
+        
+        try:
+            while not self._stop.is_set():
+                messages = self.consumer.consume(
+                    num_messages=Config.CONSUME_BATCH_SIZE,
+                    timeout=Config.CONSUME_TIMEOUT
+                )
                 
-                try:
-                    # Apply ETL transformation
-                    normalized = transform_window(window_data)
-                    
-                    # Structure feature payload for ML
-                    feature_payload = {
-                        "device_id": device_id,
-                        "feature_vector": normalized.tolist(),
-                        "latest_timestamp": timestamp,
-                        "window_size": Config.WINDOW_SIZE
-                    }
-                    
-                    # Publish to output topic
-                    producer.produce(
-                        Config.KAFKA_FEATURES_TOPIC,
-                        key=device_id.encode('utf-8'),
-                        value=json.dumps(feature_payload).encode('utf-8'),
-                        callback=delivery_report
-                    )
-                    producer.poll(0)
-                    
-                    processed_count += 1
-                    
-                    if processed_count % 10 == 0:
-                        logger.info(f'Processed {processed_count} windows (errors: {error_count})')
-                    
-                except Exception as e:
-                    error_count += 1
-                    logger.error(f'Transformation error for device {device_id}: {e}')
-                    send_to_dlq(device_id, json.dumps(data), f'Transformation error: {e}')
+                if self.checkpointer is not None:
+                    self.checkpointer.maybe_checkpoint()
+                
+                if not messages:
+                    self.producer.poll(0)
+                    continue
                 
-                # Slide window by removing oldest value
-                device_buffers[device_id] = device_buffers[device_id][1:]
+                processed, errors = self.process_batch(messages)
                 
-    except KeyboardInterrupt:
-        logger.info('ETL worker interrupted by user')
-    finally:
-        # Flush remaining messages and close connections
-        logger.info(f'Final stats - Processed: {processed_count}, Errors: {error_count}')
-        producer.flush()
-        consumer.close()
+                previous_count = self.processed_count
+                self.processed_count += processed
+                self.error_count += errors
+                
+                if self.processed_count // 1000 > previous_count // 1000:
+                    logger.info(f'Processed {self.processed_count} windows (errors: {self.error_count})')
+        
+        except KeyboardInterrupt:
+            logger.info('ETL worker interrupted by user')
+        finally:
+            self.close()
+
+    def run(self, batched: bool = Config.ETL_BATCH_MODE):
+        """Run the per-message or the batched loop until stopped."""
+        if batched:
+            self.stream_etl_batched()
+        else:
+            self.stream_etl()
+
+    def close(self):
+        """Flush remaining messages, save window state and close connections."""
+        logger.info(f'Final stats - Processed: {self.processed_count}, Errors: {self.error_count}')
+        self.producer.flush()
+        if self.checkpointer is not None:
+            self.checkpointer.checkpoint()
+        self.consumer.close()
         logger.info('ETL worker shut down gracefully')
 
 
+def create_worker(transport: Optional[Transport] = None) -> ETLWorker:
+    """Create an ETL worker from Config, on Kafka unless another transport is given."""
+    window_store = RingBufferWindowStore(Config.WINDOW_SIZE)
+    
+    # Optional Redis checkpoints so windows survive rebalances and restarts
+    checkpointer = create_checkpointer(window_store) if Config.CHECKPOINT_ENABLED else None
+    
+    return ETLWorker(transport or KafkaTransport(), window_store, checkpointer)
+
+
 if __name__ == "__main__":
-    stream_etl()
+    create_worker().run()
@@ -52,11 +52,49 @@ def transform_window(window_data: List[float]) -> np.ndarray:
     mean = np.mean(window_arr)
     std = np.std(window_arr)
     
+    return normalize_with_stats(window_arr, mean, std)
+
+
+def transform_windows(windows: np.ndarray) -> np.ndarray:
+    """
+    Vectorized transform_window over many windows at once.
+    
+    Args:
+        windows: Array of shape (num_windows, window_size)
+    
+    Returns:
+        Normalized float32 array of the same shape
+    """
+    windows = np.asarray(windows, dtype=np.float32)
+    
+    means = windows.mean(axis=1, keepdims=True)
+    stds = windows.std(axis=1, keepdims=True)
+    
+    # Constant windows are only centered, as in transform_window
+    safe_stds = np.where(stds < 1e-5, np.float32(1.0), stds)
+    
+    return (windows - means) / safe_stds
+
+
+def normalize_with_stats(window_arr: np.ndarray, mean: float, std: float) -> np.ndarray:
+    """
+    Z-score normalize a window with precomputed statistics.
+    
+    Args:
+        window_arr: Window values
+        mean: Window mean
+        std: Window standard deviation
+    
+    Returns:
+        Normalized float32 numpy array
+    """
+    window_arr = np.asarray(window_arr, dtype=np.float32)
+    
     # Avoid division by zero for constant values
     if std < 1e-5:
-        normalized = window_arr - mean
+        normalized = window_arr - np.float32(mean)
     else:
-        normalized = (window_arr - mean) / std
+        normalized = (window_arr - np.float32(mean)) / np.float32(std)
     
     return normalized
 
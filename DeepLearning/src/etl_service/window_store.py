@@ -0,0 +1,199 @@
+"""Preallocated ring-buffer window store with incremental window statistics."""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Dict, List, Sequence, Tuple
+
+from src.etl_service.transform import calculate_sma_incremental, normalize_with_stats
+
+
+class RingBufferWindowStore:
+    """
+    Fixed-size sliding windows for many devices in one preallocated 2-D array.
+
+    Each device owns one row (slot) of ``buffer``. New values overwrite the
+    oldest value in place, and the window mean and variance are updated with
+    Welford-style running updates, so appending a value is O(1) regardless of
+    the window size.
+    """
+
+    def __init__(
+        self,
+        window_size: int,
+        initial_capacity: int = 1024,
+        recompute_interval: int = 10000
+    ):
+        """
+        Initialize the window store.
+
+        Args:
+            window_size: Number of values per window
+            initial_capacity: Number of device slots to preallocate (doubles when full)
+            recompute_interval: Sliding updates per device between exact statistics
+                recomputations, which bound floating-point drift
+        """
+        self.window_size = window_size
+        self.recompute_interval = recompute_interval
+        self.slots: Dict[str, int] = {}
+        self._allocate(initial_capacity)
+        self._free_slots: List[int] = list(range(initial_capacity - 1, -1, -1))
+
+    def _allocate(self, capacity: int):
+        """Create the per-slot arrays with the given capacity."""
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity, self.window_size), dtype=np.float32)
+        self.heads = np.zeros(capacity, dtype=np.int64)    # Next write position
+        self.counts = np.zeros(capacity, dtype=np.int64)   # Values held, up to window_size
+        self.means = np.zeros(capacity, dtype=np.float64)
+        self.m2 = np.zeros(capacity, dtype=np.float64)     # Sum of squared deviations
+        self.updates = np.zeros(capacity, dtype=np.int64)  # Sliding updates since recompute
+
+    def _grow(self):
+        """Double the capacity, keeping existing state."""
+        old = (self.buffer, self.heads, self.counts, self.means, self.m2, self.updates)
+        old_capacity = self.capacity
+        self._allocate(old_capacity * 2)
+        for new_arr, old_arr in zip(
+            (self.buffer, self.heads, self.counts, self.means, self.m2, self.updates), old
+        ):
+            new_arr[:old_capacity] = old_arr
+        self._free_slots.extend(range(self.capacity - 1, old_capacity - 1, -1))
+
+    def slot(self, device_id: str) -> int:
+        """Get the slot of a device, assigning a free one on first use."""
+        slot = self.slots.get(device_id)
+        if slot is None:
+            if not self._free_slots:
+                self._grow()
+            slot = self._free_slots.pop()
+            self.slots[device_id] = slot
+        return slot
+
+    def append(self, device_id: str, value: float) -> bool:
+        """
+        Add a value to a device window.
+
+        Args:
+            device_id: Device identifier
+            value: Newly arrived data point
+
+        Returns:
+            True if the window is full and ready for transformation
+        """
+        slot = self.slot(device_id)
+        head = self.heads[slot]
+        count = self.counts[slot]
+        old_mean = self.means[slot]
+        # Round to the buffer dtype so the value later evicted matches the one added
+        value = float(np.float32(value))
+
+        if count < self.window_size:
+            # Growing window: standard Welford update
+            count += 1
+            delta = value - old_mean
+            new_mean = old_mean + delta / count
+            self.m2[slot] += delta * (value - new_mean)
+            self.counts[slot] = count
+        else:
+            # Full window: replace the oldest value
+            old_value = float(self.buffer[slot, head])
+            new_mean = calculate_sma_incremental(old_mean, value, old_value, self.window_size)
+            self.m2[slot] += (value - old_value) * (value - new_mean + old_value - old_mean)
+            self.updates[slot] += 1
+
+        self.means[slot] = new_mean
+        self.buffer[slot, head] = value
+        self.heads[slot] = (head + 1) % self.window_size
+
+        if self.updates[slot] >= self.recompute_interval:
+            self._recompute(slot)
+
+        return count >= self.window_size
+
+    def extend(self, device_id: str, values: Sequence[float]) -> np.ndarray:
+        """
+        Add several values to a device window.
+
+        Args:
+            device_id: Device identifier
+            values: New data points in arrival order
+
+        Returns:
+            Array of shape (num_ready, window_size) holding, in order, the window
+            as it stood after each new value that left the window full
+        """
+        values = np.asarray(values, dtype=np.float32)
+        history = self.window(device_id) if device_id in self.slots else values[:0]
+
+        for value in values:
+            self.append(device_id, value)
+
+        extended = np.concatenate([history, values])
+        if len(extended) < self.window_size:
+            return np.empty((0, self.window_size), dtype=np.float32)
+
+        # Keep only windows that end on one of the new values
+        first_end = max(self.window_size - 1, len(history))
+        return sliding_window_view(extended, self.window_size)[first_end - (self.window_size - 1):]
+
+    def _recompute(self, slot: int):
+        """Recompute exact statistics for a full window."""
+        window = self.buffer[slot].astype(np.float64)
+        self.means[slot] = window.mean()
+        self.m2[slot] = np.sum((window - self.means[slot]) ** 2)
+        self.updates[slot] = 0
+
+    def is_ready(self, device_id: str) -> bool:
+        """Check whether a device window is full."""
+        slot = self.slots.get(device_id)
+        return slot is not None and self.counts[slot] >= self.window_size
+
+    def window(self, device_id: str) -> np.ndarray:
+        """Return a device window in chronological order (oldest first)."""
+        slot = self.slots[device_id]
+        count = self.counts[slot]
+        if count < self.window_size:
+            return self.buffer[slot, :count].copy()
+        return np.roll(self.buffer[slot], -self.heads[slot])
+
+    def stats(self, device_id: str) -> Tuple[float, float]:
+        """Return the running (mean, population std) of a device window."""
+        slot = self.slots[device_id]
+        count = self.counts[slot]
+        if count == 0:
+            return 0.0, 0.0
+        variance = max(self.m2[slot], 0.0) / count
+        return float(self.means[slot]), float(np.sqrt(variance))
+
+    def normalized_window(self, device_id: str) -> np.ndarray:
+        """Z-score normalize a device window using the running statistics."""
+        mean, std = self.stats(device_id)
+        return normalize_with_stats(self.window(device_id), mean, std)
+
+    def restore(self, device_id: str, values: Sequence[float]):
+        """
+        Replace a device window with previously saved values.
+
+        Args:
+            device_id: Device identifier
+            values: Window values in chronological order (at most window_size are kept)
+        """
+        self.remove(device_id)
+        for value in np.asarray(values, dtype=np.float32)[-self.window_size:]:
+            self.append(device_id, value)
+
+    def remove(self, device_id: str):
+        """Drop a device and release its slot."""
+        slot = self.slots.pop(device_id, None)
+        if slot is None:
+            return
+        self.buffer[slot] = 0.0
+        self.heads[slot] = self.counts[slot] = self.updates[slot] = 0
+        self.means[slot] = self.m2[slot] = 0.0
+        self._free_slots.append(slot)
+
+    def __len__(self) -> int:
+        return len(self.slots)
+
+    def __contains__(self, device_id: str) -> bool:
+        return device_id in self.slots
@@ -0,0 +1 @@
+"""Fused ETL + inference microservice for low-latency deployments."""
@@ -0,0 +1,257 @@
+"""
+Kafka Fused Worker - ETL and inference in one process.
+
+This worker:
+1. Consumes raw sensor data from Kafka
+2. Maintains sliding windows per device and normalizes them
+3. Runs the LSTM model on ready windows in deadline-bounded micro-batches
+4. Publishes predictions directly, optionally tapping features to Kafka
+
+It skips the prepared-ml-features hop between the ETL and inference
+services, for deployments that need low end-to-end latency.
+"""
+
+import json
+import numpy as np
+from collections import defaultdict
+import threading
+from typing import Dict, List, Optional
+from confluent_kafka import KafkaError
+import sys
+import os
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.utils.config import Config
+from src.utils.logger import setup_logger
+from src.utils.feature_codec import encode_features
+from src.utils.transport import KafkaTransport, Transport
+from src.etl_service.window_store import RingBufferWindowStore
+from src.etl_service.transform import transform_windows
+from src.inference_service.model_loader import ModelLoader, load_serving_model
+from src.inference_service.micro_batcher import MicroBatcher, predict_batch
+
+logger = setup_logger(__name__)
+
+
+def delivery_report(err, msg):
+    """Callback for producer delivery reports."""
+    if err is not None:
+        logger.error(f'Message delivery failed: {err}')
+    else:
+        logger.debug(f'Message delivered to {msg.topic()} [{msg.partition()}]')
+
+
+class FusedWorker:
+    """Turns raw sensor messages into predictions without an intermediate topic."""
+
+    def __init__(
+        self,
+        transport: Transport,
+        model_loader: ModelLoader,
+        window_store: Optional[RingBufferWindowStore] = None,
+        features_tap: bool = Config.FUSED_FEATURES_TAP,
+        group_id: str = 'fused-group'
+    ):
+        """
+        Create the consumer and producer and subscribe to the raw topic.
+
+        Args:
+            transport: Source of the consumer and producer
+            model_loader: Loader with a loaded backend (see load_serving_model)
+            window_store: Per-device window state (default: empty store of Config.WINDOW_SIZE)
+            features_tap: Also publish every feature window to the features topic
+            group_id: Consumer group
+        """
+        self.model_loader = model_loader
+        self.window_store = window_store if window_store is not None else RingBufferWindowStore(Config.WINDOW_SIZE)
+        self.features_tap = features_tap
+        self.consumer = transport.consumer(group_id)
+        self.producer = transport.producer()
+        self.prediction_count = 0
+        self.error_count = 0
+        self._stop = threading.Event()
+
+        self.consumer.subscribe([Config.KAFKA_RAW_TOPIC])
+
+        logger.info(f"Fused worker started. Consuming from '{Config.KAFKA_RAW_TOPIC}', "
+                    f"publishing to '{Config.KAFKA_PREDICTIONS_TOPIC}'")
+        if features_tap:
+            logger.info(f"Feature tap enabled: also publishing to '{Config.KAFKA_FEATURES_TOPIC}'")
+
+    def stop(self):
+        """Ask the running loop to exit after its current iteration."""
+        self._stop.set()
+
+    def send_to_dlq(self, original_message: str, error_reason: str):
+        """Send a malformed raw message to the Dead Letter Queue."""
+        dlq_payload = {
+            'device_id': 'unknown',
+            'original_message': original_message,
+            'error_reason': error_reason,
+            'timestamp': str(np.datetime64('now'))
+        }
+
+        self.producer.produce(
+            Config.KAFKA_DLQ_TOPIC,
+            key=b'unknown',
+            value=json.dumps(dlq_payload).encode('utf-8')
+        )
+        logger.warning(f'Message sent to DLQ: {error_reason}')
+
+    def produce(self, topic: str, device_id: str, value: bytes, headers=None):
+        """Queue a message, serving delivery reports if the local queue is full."""
+        try:
+            self.producer.produce(topic, key=device_id.encode('utf-8'), value=value,
+                                  headers=headers, callback=delivery_report)
+        except BufferError:
+            self.producer.poll(1.0)
+            self.producer.produce(topic, key=device_id.encode('utf-8'), value=value,
+                                  headers=headers, callback=delivery_report)
+
+    def transform_messages(self, messages: list, batcher: MicroBatcher) -> int:
+        """
+        Update device windows from raw messages and queue every ready window for inference.
+
+        Full micro-batches are flushed as windows are queued, so no forward pass
+        gets more than Config.BATCH_SIZE windows however large the consume batch.
+
+        Args:
+            messages: Messages returned by consumer.consume()
+            batcher: Micro-batcher collecting (device_id, timestamp, feature_vector) items
+
+        Returns:
+            Number of malformed messages
+        """
+        error_count = 0
+        device_values: Dict[str, List[float]] = defaultdict(list)
+        device_timestamps: Dict[str, List[str]] = defaultdict(list)
+
+        for msg in messages:
+            if msg.error():
+                if msg.error().code() != KafkaError._PARTITION_EOF:
+                    logger.error(f'Consumer error: {msg.error()}')
+                continue
+
+            raw_value = None
+            try:
+                raw_value = msg.value().decode('utf-8')
+                data = json.loads(raw_value)
+                device_id = data['device_id']
+                value = float(data['value'])
+                timestamp = data['timestamp']
+            except (UnicodeDecodeError, json.JSONDecodeError, KeyError, ValueError, TypeError) as e:
+                error_count += 1
+                logger.warning(f'Invalid message format: {e}')
+                self.send_to_dlq(raw_value if raw_value is not None else 'undecodable', str(e))
+                continue
+
+            # Values and timestamps only grow together, so ready windows keep their own metadata
+            device_values[device_id].append(value)
+            device_timestamps[device_id].append(timestamp)
+
+        ready_windows = []
+        ready_meta = []
+        for device_id, values in device_values.items():
+            windows = self.window_store.extend(device_id, values)
+            if len(windows):
+                ready_windows.append(windows)
+                ready_meta.extend((device_id, timestamp)
+                                  for timestamp in device_timestamps[device_id][-len(windows):])
+
+        if ready_windows:
+            normalized = transform_windows(np.concatenate(ready_windows)).astype(np.float32)
+            for (device_id, timestamp), feature_vector in zip(ready_meta, normalized):
+                if self.features_tap:
+                    value, headers = encode_features(device_id, feature_vector, timestamp, Config.FEATURE_FORMAT)
+                    self.produce(Config.KAFKA_FEATURES_TOPIC, device_id, value, headers)
+                if batcher.add((device_id, timestamp, feature_vector)):
+                    self.flush_predictions(batcher)
+
+        return error_count
+
+    def publish_predictions(self, batch: list) -> int:
+        """
+        Run one batched forward pass and publish a prediction per queued window.
+
+        Args:
+            batch: Queued (device_id, timestamp, feature_vector) tuples
+
+        Returns:
+            Number of predictions published
+        """
+        model_loader = self.model_loader
+        # Activate a newly prepared model version between batches
+        model_loader.swap_if_ready()
+        predictions = predict_batch(model_loader.backend, [feature_vector for _, _, feature_vector in batch])
+
+        for (device_id, timestamp, _), predicted_value in zip(batch, predictions):
+            inference_result = {
+                "device_id": device_id,
+                "predicted_value": float(predicted_value),
+                "timestamp": timestamp,
+                "model_version": model_loader.model_version
+            }
+            self.produce(Config.KAFKA_PREDICTIONS_TOPIC, device_id, json.dumps(inference_result).encode('utf-8'))
+
+        return len(batch)
+
+    def flush_predictions(self, batcher: MicroBatcher):
+        """Publish predictions for the queued windows, counting a failed batch as errors."""
+        batch = batcher.drain()
+        try:
+            published = self.publish_predictions(batch)
+        except Exception as e:
+            self.error_count += len(batch)
+            logger.error(f'Inference error for batch of {len(batch)}: {e}')
+            return
+
+        previous_count = self.prediction_count
+        self.prediction_count += published
+        if self.prediction_count // 100 > previous_count // 100:
+            logger.info(f'Generated {self.prediction_count} predictions (errors: {self.error_count})')
+
+    def run(self):
+        """Main loop: raw messages in, predictions out."""
+        batcher = MicroBatcher(Config.BATCH_SIZE, Config.MAX_BATCH_LATENCY_MS)
+
+        try:
+            while not self._stop.is_set():
+                # Never wait past the deadline of a partially filled batch
+                messages = self.consumer.consume(
+                    num_messages=Config.CONSUME_BATCH_SIZE,
+                    timeout=batcher.time_remaining(default=Config.CONSUME_TIMEOUT)
+                )
+
+                if messages:
+                    try:
+                        self.error_count += self.transform_messages(messages, batcher)
+                    except Exception as e:
+                        self.error_count += len(messages)
+                        logger.error(f'Transformation error: {e}')
+
+                if batcher.is_due():
+                    self.flush_predictions(batcher)
+
+                self.producer.poll(0)
+
+        except KeyboardInterrupt:
+            logger.info('Fused worker interrupted by user')
+        finally:
+            if len(batcher):
+                self.flush_predictions(batcher)
+            logger.info(f'Final stats - Predictions: {self.prediction_count}, Errors: {self.error_count}')
+            self.model_loader.stop_watching()
+            self.producer.flush()
+            self.consumer.close()
+            logger.info('Fused worker shut down gracefully')
+
+
+def create_worker(transport: Optional[Transport] = None) -> FusedWorker:
+    """Load the configured model and create a fused worker, on Kafka unless another transport is given."""
+    return FusedWorker(transport or KafkaTransport(), load_serving_model())
+
+
+if __name__ == "__main__":
+    create_worker().run()
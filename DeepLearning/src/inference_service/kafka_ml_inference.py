@@ -4,15 +4,16 @@ Kafka ML Inference Service - Real-time predictions using LSTM model.
 This service:
 1. Consumes prepared features from Kafka
 2. Loads pre-trained LSTM model
-3. Performs real-time inference
+3. Performs real-time inference in deadline-bounded micro-batches
 4. Publishes predictions back to Kafka
 """
 
 import json
 import numpy as np
 import logging
-import tensorflow as tf
-from confluent_kafka import Consumer, Producer, KafkaError
+import threading
+from typing import Optional
+from confluent_kafka import KafkaError
 import sys
 import os
 
@@ -21,32 +22,13 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 from src.utils.config import Config
 from src.utils.logger import setup_logger
-from src.inference_service.model_loader import ModelLoader
+from src.utils.transport import KafkaTransport, Transport
+from src.inference_service.model_loader import ModelLoader, load_serving_model
+from src.inference_service.micro_batcher import MicroBatcher, predict_batch
+from src.utils.feature_codec import FeatureDecodeError, decode_features
 
 logger = setup_logger(__name__)
 
-# Configure TensorFlow GPU settings
-ModelLoader.configure_gpu_memory(memory_growth=True)
-
-# Load pre-trained LSTM model
-model_loader = ModelLoader(Config.MODEL_PATH)
-try:
-    model = model_loader.load_model()
-    logger.info(f'Model loaded successfully from {Config.MODEL_PATH}')
-    logger.info(f'Model input shape: {model.input_shape}')
-    logger.info(f'Model output shape: {model.output_shape}')
-except Exception as e:
-    logger.error(f'Failed to load model: {e}')
-    raise
-
-# Initialize Kafka consumer and producer
-consumer = Consumer(Config.get_kafka_consumer_config('ml-inference-group'))
-producer = Producer(Config.get_kafka_producer_config())
-
-consumer.subscribe([Config.KAFKA_FEATURES_TOPIC])
-
-logger.info(f"ML Inference Service started. Consuming from '{Config.KAFKA_FEATURES_TOPIC}'...")
-
 
 def delivery_report(err, msg):
     """Callback for producer delivery reports."""
@@ -56,86 +38,147 @@ def delivery_report(err, msg):
         logger.debug(f'Prediction delivered to {msg.topic()} [{msg.partition()}]')
 
 
-def run_inference():
-    """Main inference loop."""
-    prediction_count = 0
-    error_count = 0
-    
-    try:
-        while True:
-            msg = consumer.poll(timeout=1.0)
-            
-            if msg is None:
-                continue
-                
-            if msg.error():
-                if msg.error().code() == KafkaError._PARTITION_EOF:
-                    logger.debug(f'Reached end of partition {msg.partition()}')
-                else:
-                    logger.error(f'Consumer error: {msg.error()}')
-                continue
+class InferenceWorker:
+    """Turns feature windows into model predictions."""
+
+    def __init__(self, transport: Transport, model_loader: ModelLoader, group_id: str = 'ml-inference-group'):
+        """
+        Create the consumer and producer and subscribe to the features topic.
+        
+        Args:
+            transport: Source of the consumer and producer
+            model_loader: Loader with a loaded backend (see load_serving_model)
+            group_id: Consumer group
+        """
+        self.model_loader = model_loader
+        self.consumer = transport.consumer(group_id)
+        self.producer = transport.producer()
+        self.prediction_count = 0
+        self.error_count = 0
+        self._stop = threading.Event()
+        
+        self.consumer.subscribe([Config.KAFKA_FEATURES_TOPIC])
+        
+        logger.info(f"ML Inference Service started. Consuming from '{Config.KAFKA_FEATURES_TOPIC}'...")
+
+    def stop(self):
+        """Ask the running loop to exit after its current iteration."""
+        self._stop.set()
+
+    def publish_predictions(self, batch: list) -> int:
+        """
+        Run one batched forward pass and publish a prediction per queued message.
+        
+        Args:
+            batch: Queued (device_id, timestamp, feature_array) tuples
+        
+        Returns:
+            Number of predictions published
+        """
+        model_loader = self.model_loader
+        # Activate a newly prepared model version between batches
+        model_loader.swap_if_ready()
+        predictions = predict_batch(model_loader.backend, [feature_array for _, _, feature_array in batch])
+        
+        for (device_id, timestamp, _), predicted_value in zip(batch, predictions):
+            inference_result = {
+                "device_id": device_id,
+                "predicted_value": float(predicted_value),
+                "timestamp": timestamp,
+                "model_version": model_loader.model_version
+            }
             
-            # Parse incoming feature payload
+            self.producer.produce(
+                Config.KAFKA_PREDICTIONS_TOPIC,
+                key=device_id.encode('utf-8'),
+                value=json.dumps(inference_result).encode('utf-8'),
+                callback=delivery_report
+            )
+            logger.debug(f'Prediction for device {device_id}: {predicted_value:.4f}')
+        
+        self.producer.poll(0)
+        return len(batch)
+
+    def run(self):
+        """Main inference loop with deadline-bounded micro-batching."""
+        batcher = MicroBatcher(Config.BATCH_SIZE, Config.MAX_BATCH_LATENCY_MS)
+        
+        logger.info(f'Micro-batching up to {Config.BATCH_SIZE} windows '
+                    f'or {Config.MAX_BATCH_LATENCY_MS} ms per forward pass')
+        
+        def flush():
+            batch = batcher.drain()
             try:
-                payload = json.loads(msg.value().decode('utf-8'))
-                device_id = payload['device_id']
-                feature_vector = payload['feature_vector']
-                timestamp = payload['latest_timestamp']
-                window_size = payload['window_size']
-            except (json.JSONDecodeError, KeyError) as e:
-                error_count += 1
-                logger.warning(f'Invalid payload format: {e}')
-                continue
-            
-            # Reshape feature vector to match TensorFlow expected input
-            # Shape: (batch_size, time_steps, features) -> (1, window_size, 1)
-            try:
-                feature_array = np.array(feature_vector, dtype=np.float32).reshape(1, window_size, 1)
-            except ValueError as e:
-                error_count += 1
-                logger.warning(f'Invalid feature vector shape for device {device_id}: {e}')
-                continue
+                published = self.publish_predictions(batch)
+            except Exception as e:
+                self.error_count += len(batch)
+                logger.error(f'Inference error for batch of {len(batch)}: {e}')
+                return
             
-            # Execute model prediction
-            try:
-                prediction = model.predict(feature_array, verbose=0)
-                predicted_value = float(prediction[0][0])
+            previous_count = self.prediction_count
+            self.prediction_count += published
+            if self.prediction_count // 100 > previous_count // 100:
+                logger.info(f'Generated {self.prediction_count} predictions (errors: {self.error_count})')
+        
+        try:
+            while not self._stop.is_set():
+                # Wake up in time to flush a partial batch at its deadline
+                msg = self.consumer.poll(timeout=batcher.time_remaining(default=1.0))
                 
-                # Publish prediction back to Kafka
-                inference_result = {
-                    "device_id": device_id,
-                    "predicted_value": predicted_value,
-                    "timestamp": timestamp,
-                    "model_version": Config.MODEL_VERSION
-                }
+                if msg is None:
+                    if batcher.is_due():
+                        flush()
+                    continue
+                    
+                if msg.error():
+                    if msg.error().code() == KafkaError._PARTITION_EOF:
+                        logger.debug(f'Reached end of partition {msg.partition()}')
+                    else:
+                        logger.error(f'Consumer error: {msg.error()}')
+                    if batcher.is_due():
+                        flush()
+                    continue
                 
-                producer.produce(
-                    Config.KAFKA_PREDICTIONS_TOPIC,
-                    key=device_id.encode('utf-8'),
-                    value=json.dumps(inference_result).encode('utf-8'),
-                    callback=delivery_report
-                )
-                producer.poll(0)
+                # Parse incoming feature payload
+                # The content-type header selects the binary or JSON decoder
+                try:
+                    payload = decode_features(msg.value(), msg.headers())
+                    device_id = payload['device_id']
+                    feature_vector = payload['feature_vector']
+                    timestamp = payload['latest_timestamp']
+                    window_size = payload['window_size']
+                except FeatureDecodeError as e:
+                    self.error_count += 1
+                    logger.warning(f'Invalid payload format: {e}')
+                    continue
                 
-                prediction_count += 1
+                # Validate the feature vector against the declared window size
+                try:
+                    feature_array = feature_vector.reshape(window_size)
+                except ValueError as e:
+                    self.error_count += 1
+                    logger.warning(f'Invalid feature vector shape for device {device_id}: {e}')
+                    continue
                 
-                if prediction_count % 10 == 0:
-                    logger.info(f'Generated {prediction_count} predictions (errors: {error_count})')
-                else:
-                    logger.debug(f'Prediction for device {device_id}: {predicted_value:.4f}')
+                if batcher.add((device_id, timestamp, feature_array)):
+                    flush()
                 
-            except Exception as e:
-                error_count += 1
-                logger.error(f'Inference error for device {device_id}: {e}')
-            
-    except KeyboardInterrupt:
-        logger.info('Inference service interrupted by user')
-    finally:
-        logger.info(f'Final stats - Predictions: {prediction_count}, Errors: {error_count}')
-        producer.flush()
-        consumer.close()
-        logger.info('Inference service shut down gracefully')
+        except KeyboardInterrupt:
+            logger.info('Inference service interrupted by user')
+        finally:
+            if len(batcher):
+                flush()
+            logger.info(f'Final stats - Predictions: {self.prediction_count}, Errors: {self.error_count}')
+            self.model_loader.stop_watching()
+            self.producer.flush()
+            self.consumer.close()
+            logger.info('Inference service shut down gracefully')
+
+
+def create_worker(transport: Optional[Transport] = None) -> InferenceWorker:
+    """Load the configured model and create an inference worker, on Kafka unless another transport is given."""
+    return InferenceWorker(transport or KafkaTransport(), load_serving_model())
 
 
 if __name__ == "__main__":
-    run_inference()
+    create_worker().run()
@@ -0,0 +1,94 @@
+"""Deadline-bounded micro-batching for model inference."""
+
+import time
+import numpy as np
+from collections import defaultdict
+from typing import Any, Callable, List, Optional, Sequence
+
+
+class MicroBatcher:
+    """
+    Collect items until the batch is full or a latency deadline passes.
+
+    The deadline starts when the first item of a batch arrives, so no item
+    waits longer than ``max_latency_ms`` for its batch to be flushed.
+    """
+
+    def __init__(
+        self,
+        max_batch_size: int,
+        max_latency_ms: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Initialize the micro-batcher.
+
+        Args:
+            max_batch_size: Number of items that triggers an immediate flush
+            max_latency_ms: Longest time the oldest item may wait for a flush
+            clock: Monotonic time source in seconds
+        """
+        self.max_batch_size = max_batch_size
+        self.max_latency_s = max_latency_ms / 1000.0
+        self.clock = clock
+        self.items: List[Any] = []
+        self.deadline: Optional[float] = None
+
+    def add(self, item: Any) -> bool:
+        """
+        Queue an item.
+
+        Returns:
+            True if the batch is due for a flush
+        """
+        if not self.items:
+            self.deadline = self.clock() + self.max_latency_s
+        self.items.append(item)
+        return self.is_due()
+
+    def is_due(self) -> bool:
+        """Check whether the batch is full or its deadline has passed."""
+        if not self.items:
+            return False
+        return len(self.items) >= self.max_batch_size or self.clock() >= self.deadline
+
+    def time_remaining(self, default: float) -> float:
+        """Seconds until the deadline, or ``default`` when the batch is empty."""
+        if not self.items:
+            return default
+        return max(0.0, min(default, self.deadline - self.clock()))
+
+    def drain(self) -> List[Any]:
+        """Take all queued items and reset the deadline."""
+        items, self.items = self.items, []
+        self.deadline = None
+        return items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+
+def predict_batch(backend, feature_vectors: Sequence[np.ndarray]) -> np.ndarray:
+    """
+    Run one forward pass per distinct window size and return predictions in input order.
+
+    Args:
+        backend: Inference backend taking inputs of shape (batch_size, window_size, 1)
+        feature_vectors: 1-D feature windows
+
+    Returns:
+        Array of shape (num_vectors,) with the first model output per window
+    """
+    predictions = np.empty(len(feature_vectors), dtype=np.float32)
+
+    # Windows of the same length share one stacked input tensor
+    groups = defaultdict(list)
+    for idx, vector in enumerate(feature_vectors):
+        groups[len(vector)].append(idx)
+
+    for window_size, indices in groups.items():
+        batch = np.stack([feature_vectors[idx] for idx in indices]).astype(np.float32)
+        output = backend.predict(batch.reshape(len(indices), window_size, 1))
+        predictions[indices] = np.asarray(output).reshape(len(indices), -1)[:, 0]
+
+    return predictions
@@ -1,22 +1,103 @@
 """Model loading and management utilities."""
 
 import tensorflow as tf
-from typing import Optional
+from typing import List, Optional, Tuple
+import glob
 import os
+import re
+import threading
+import time
+
+from src.inference_service.runtime import (
+    BACKENDS,
+    QUANTIZATION_MODES,
+    InferenceBackend,
+    KerasBackend,
+    ONNXBackend,
+    TFFunctionBackend,
+    TFLiteBackend,
+    check_parity,
+    convert_to_onnx,
+    convert_to_tflite,
+    warm_up
+)
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+MODEL_EXTENSION = '.keras'
+
+
+def tflite_extension(quantization: Optional[str] = None) -> str:
+    """Extension of the TFLite artifact for a quantization mode, e.g. '.int8.tflite'."""
+    return f'.{quantization}.tflite' if quantization else '.tflite'
+
+
+def version_key(version: str) -> tuple:
+    """Sort key ordering versions like 1.9 < 1.10 < 2.0."""
+    return tuple(
+        (0, int(part), '') if part.isdigit() else (1, 0, part)
+        for part in re.split(r'[._-]', version)
+    )
+
+
+def list_model_versions(model_dir: str, settle_s: float = 0.0) -> List[Tuple[str, str]]:
+    """
+    List the models in a versioned model directory, oldest version first.
+    
+    Each version is a file named ``<version>.keras``. Files modified within
+    the last ``settle_s`` seconds are skipped because they may still be
+    being written.
+    
+    Args:
+        model_dir: Directory holding versioned model files
+        settle_s: Minimum file age in seconds
+    
+    Returns:
+        List of (version, path) tuples
+    """
+    now = time.time()
+    versions = []
+    for path in glob.glob(os.path.join(model_dir, f'*{MODEL_EXTENSION}')):
+        if now - os.path.getmtime(path) < settle_s:
+            continue
+        versions.append((os.path.basename(path)[:-len(MODEL_EXTENSION)], path))
+    return sorted(versions, key=lambda item: version_key(item[0]))
 
 
 class ModelLoader:
     """Handles loading and caching of TensorFlow/Keras models."""
     
-    def __init__(self, model_path: str):
+    def __init__(self, model_path: str, model_version: Optional[str] = None):
         """
         Initialize model loader.
         
         Args:
             model_path: Path to the saved model file
+            model_version: Version reported with predictions
         """
         self.model_path = model_path
+        self.model_version = model_version
         self.model: Optional[tf.keras.Model] = None
+        self.backend: Optional[InferenceBackend] = None
+        self._pending: Optional[Tuple[str, str, tf.keras.Model, InferenceBackend]] = None
+        self._pending_lock = threading.Lock()
+        self._stop_watching = threading.Event()
+        self._watch_thread: Optional[threading.Thread] = None
+    
+    @classmethod
+    def from_directory(cls, model_dir: str) -> 'ModelLoader':
+        """
+        Create a loader for the newest version in a versioned model directory.
+        
+        Raises:
+            FileNotFoundError: If the directory holds no model versions
+        """
+        versions = list_model_versions(model_dir)
+        if not versions:
+            raise FileNotFoundError(f"No *{MODEL_EXTENSION} model versions found in {model_dir}")
+        version, path = versions[-1]
+        return cls(path, model_version=version)
     
     def load_model(self) -> tf.keras.Model:
         """
@@ -49,6 +130,190 @@ class ModelLoader:
             self.load_model()
         return self.model
     
+    def artifact_path(self, extension: str) -> str:
+        """Path of a converted artifact stored next to the Keras model file."""
+        return os.path.splitext(self.model_path)[0] + extension
+    
+    def _is_stale(self, artifact_path: str) -> bool:
+        """Check whether a converted artifact is missing or older than the Keras model."""
+        return (
+            not os.path.exists(artifact_path)
+            or os.path.getmtime(artifact_path) < os.path.getmtime(self.model_path)
+        )
+    
+    def load_backend(
+        self,
+        backend: str = 'keras',
+        num_threads: Optional[int] = None,
+        quantization: Optional[str] = None
+    ) -> InferenceBackend:
+        """
+        Create an execution backend for the model.
+        
+        TFLite and ONNX artifacts are converted on first use and cached next
+        to the Keras file; they are regenerated when the Keras file is newer.
+        Full-integer TFLite models need calibration data, so they must be
+        created beforehand with src/models/quantize.py.
+        
+        Args:
+            backend: One of 'keras', 'tf_function', 'tflite' or 'onnx'
+            num_threads: Intra-op thread count for the TFLite and ONNX runtimes
+            quantization: TFLite quantization mode ('dynamic' or 'int8'), None for float32
+        
+        Returns:
+            Backend exposing predict(batch)
+        
+        Raises:
+            ValueError: If the backend name or quantization mode is unknown
+            FileNotFoundError: If an up-to-date int8 TFLite model does not exist
+        """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown inference backend '{backend}', expected one of {BACKENDS}")
+        if quantization is not None and (backend != 'tflite' or quantization not in QUANTIZATION_MODES):
+            raise ValueError(f"Quantization '{quantization}' is not available for backend '{backend}', "
+                             f"expected one of {QUANTIZATION_MODES} with 'tflite'")
+        
+        self.backend = self._create_backend(backend, num_threads, quantization)
+        return self.backend
+    
+    def _create_backend(self, backend: str, num_threads: Optional[int],
+                        quantization: Optional[str] = None) -> InferenceBackend:
+        model = self.get_model()
+        
+        if backend == 'keras':
+            return KerasBackend(model)
+        
+        if backend == 'tf_function':
+            return TFFunctionBackend(model)
+        
+        if backend == 'tflite':
+            tflite_path = self.artifact_path(tflite_extension(quantization))
+            if self._is_stale(tflite_path):
+                if quantization == 'int8':
+                    raise FileNotFoundError(
+                        f"{tflite_path} is missing or older than {self.model_path}; "
+                        f"create it with: python src/models/quantize.py --model {self.model_path}"
+                    )
+                with open(tflite_path, 'wb') as f:
+                    f.write(convert_to_tflite(model, quantization))
+            with open(tflite_path, 'rb') as f:
+                return TFLiteBackend(f.read(), num_threads=num_threads)
+        
+        onnx_path = self.artifact_path('.onnx')
+        if self._is_stale(onnx_path):
+            convert_to_onnx(model, onnx_path)
+        return ONNXBackend(onnx_path, num_threads=num_threads)
+    
+    def start_watching(
+        self,
+        model_dir: str,
+        backend: str = 'keras',
+        num_threads: Optional[int] = None,
+        poll_interval_s: float = 10.0,
+        settle_s: float = 5.0,
+        warmup_batch_sizes: Tuple[int, ...] = (1,),
+        parity_tolerance: float = 1e-4,
+        quantization: Optional[str] = None
+    ):
+        """
+        Watch a versioned model directory and prepare newer versions in the background.
+        
+        A newer version is loaded, converted for the backend, parity-checked
+        and warmed up on a daemon thread. It only becomes active when the
+        serving loop calls swap_if_ready(), so a batch never sees two models.
+        A version that fails is retried when its Keras file or one of its
+        converted artifacts is modified, e.g. once its int8 model is written.
+        
+        Args:
+            model_dir: Directory holding ``<version>.keras`` files
+            backend: Execution backend for new versions
+            num_threads: Intra-op thread count for the TFLite and ONNX runtimes
+            poll_interval_s: Seconds between directory scans
+            settle_s: Minimum file age before a version is considered complete
+            warmup_batch_sizes: Batch sizes run through a new model before the swap
+            parity_tolerance: Largest allowed backend deviation from Keras
+            quantization: TFLite quantization mode for new versions
+        """
+        if self._watch_thread is not None:
+            return
+        
+        def artifact_mtimes(path: str) -> tuple:
+            base = os.path.splitext(path)[0]
+            artifacts = (path, base + tflite_extension(quantization), base + '.onnx')
+            return tuple(os.path.getmtime(p) if os.path.exists(p) else None for p in artifacts)
+        
+        def watch():
+            # Failed versions are retried once the model or one of its artifacts changes
+            failed_versions = {}
+            while not self._stop_watching.wait(poll_interval_s):
+                versions = list_model_versions(model_dir, settle_s=settle_s)
+                if not versions:
+                    continue
+                version, path = versions[-1]
+                current = self._pending[0] if self._pending is not None else self.model_version
+                if current is not None and version_key(version) <= version_key(current):
+                    continue
+                mtimes = artifact_mtimes(path)
+                if failed_versions.get(version) == mtimes:
+                    continue
+                
+                try:
+                    self._prepare(version, path, backend, num_threads, warmup_batch_sizes, parity_tolerance,
+                                  quantization)
+                except Exception as e:
+                    failed_versions[version] = mtimes
+                    logger.error(f'Failed to prepare model version {version}, retrying once its files change: {e}')
+                else:
+                    failed_versions.pop(version, None)
+        
+        self._stop_watching.clear()
+        self._watch_thread = threading.Thread(target=watch, name='model-watcher', daemon=True)
+        self._watch_thread.start()
+        logger.info(f'Watching {model_dir} for new model versions')
+    
+    def _prepare(self, version: str, path: str, backend: str, num_threads: Optional[int],
+                 warmup_batch_sizes: Tuple[int, ...], parity_tolerance: float,
+                 quantization: Optional[str] = None):
+        """Load, check and warm up a model version, then stage it for swapping."""
+        started = time.perf_counter()
+        candidate = ModelLoader(path, model_version=version)
+        model = candidate.load_model()
+        new_backend = candidate.load_backend(backend, num_threads=num_threads, quantization=quantization)
+        if new_backend.name != 'keras':
+            check_parity(new_backend, model, atol=parity_tolerance)
+        warm_up(new_backend, model, warmup_batch_sizes)
+        
+        with self._pending_lock:
+            self._pending = (version, path, model, new_backend)
+        logger.info(f'Model version {version} ready in {time.perf_counter() - started:.1f}s')
+    
+    def swap_if_ready(self) -> bool:
+        """
+        Activate a staged model version; call between batches.
+        
+        Returns:
+            True if a new version became active
+        """
+        if self._pending is None:
+            return False
+        
+        with self._pending_lock:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            return False
+        
+        previous_version = self.model_version
+        self.model_version, self.model_path, self.model, self.backend = pending
+        logger.info(f'Swapped model version {previous_version} -> {self.model_version}')
+        return True
+    
+    def stop_watching(self):
+        """Stop the directory watcher thread."""
+        self._stop_watching.set()
+        if self._watch_thread is not None:
+            self._watch_thread.join()
+            self._watch_thread = None
+    
     @staticmethod
     def configure_gpu_memory(memory_growth: bool = True, memory_limit_mb: Optional[int] = None):
         """
@@ -76,3 +341,55 @@ class ModelLoader:
         except RuntimeError as e:
             # GPU configuration must be set before initializing TensorFlow
             print(f"GPU configuration error: {e}")
+
+
+def load_serving_model() -> ModelLoader:
+    """
+    Load the configured model and backend for serving, ready for the first batch.
+    
+    The backend is parity-checked against Keras and warmed up; with
+    Config.MODEL_DIR set, the directory is watched for newer versions.
+    Quantized TFLite models are checked against Config.QUANTIZED_PARITY_TOLERANCE
+    instead of Config.PARITY_TOLERANCE.
+    
+    Returns:
+        Loader whose ``backend`` and ``model_version`` serve predictions
+    """
+    from src.utils.config import Config
+    
+    # Configure TensorFlow GPU settings
+    ModelLoader.configure_gpu_memory(memory_growth=True)
+    
+    parity_tolerance = Config.QUANTIZED_PARITY_TOLERANCE if Config.TFLITE_QUANTIZATION else Config.PARITY_TOLERANCE
+    
+    if Config.MODEL_DIR:
+        model_loader = ModelLoader.from_directory(Config.MODEL_DIR)
+    else:
+        model_loader = ModelLoader(Config.MODEL_PATH, model_version=Config.MODEL_VERSION)
+    try:
+        model = model_loader.load_model()
+        logger.info(f'Model {model_loader.model_version} loaded successfully from {model_loader.model_path}')
+        logger.info(f'Model input shape: {model.input_shape}')
+        logger.info(f'Model output shape: {model.output_shape}')
+        
+        backend = model_loader.load_backend(Config.INFERENCE_BACKEND, num_threads=Config.INFERENCE_THREADS,
+                                            quantization=Config.TFLITE_QUANTIZATION)
+        if backend.name != 'keras':
+            max_diff = check_parity(backend, model, atol=parity_tolerance)
+            logger.info(f"Backend '{backend.name}' matches Keras within {max_diff:.2e}")
+        warm_up(backend, model, (1, Config.BATCH_SIZE))
+    except Exception as e:
+        logger.error(f'Failed to load model: {e}')
+        raise
+    
+    if Config.MODEL_DIR:
+        model_loader.start_watching(
+            Config.MODEL_DIR,
+            backend=Config.INFERENCE_BACKEND,
+            num_threads=Config.INFERENCE_THREADS,
+            poll_interval_s=Config.MODEL_POLL_INTERVAL_S,
+            warmup_batch_sizes=(1, Config.BATCH_SIZE),
+            parity_tolerance=parity_tolerance,
+            quantization=Config.TFLITE_QUANTIZATION
+        )
+    return model_loader
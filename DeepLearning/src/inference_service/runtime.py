@@ -0,0 +1,276 @@
+"""Low-overhead execution backends for running the LSTM model on CPU."""
+
+import numpy as np
+import tensorflow as tf
+from typing import Optional
+
+
+BACKENDS = ('keras', 'tf_function', 'tflite', 'onnx')
+
+# Post-training TFLite quantization: int8 weights only, or int8 weights and activations
+QUANTIZATION_MODES = ('dynamic', 'int8')
+
+
+class InferenceBackend:
+    """Common interface: map a (batch_size, window_size, features) array to predictions."""
+
+    name = 'base'
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        """
+        Run a forward pass.
+
+        Args:
+            batch: float32 array of shape (batch_size, window_size, features)
+
+        Returns:
+            Model outputs of shape (batch_size, outputs)
+        """
+        raise NotImplementedError
+
+
+class KerasBackend(InferenceBackend):
+    """Plain Keras execution via predict_on_batch (no progress bar or dataset setup)."""
+
+    name = 'keras'
+
+    def __init__(self, model: tf.keras.Model):
+        self.model = model
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class TFFunctionBackend(InferenceBackend):
+    """Concrete tf.function traced once with a fixed (None, window_size, features) signature."""
+
+    name = 'tf_function'
+
+    def __init__(self, model: tf.keras.Model):
+        self.model = model
+        _, window_size, features = model.input_shape
+        signature = tf.TensorSpec([None, window_size, features], tf.float32)
+        forward = tf.function(lambda x: model(x, training=False), input_signature=[signature])
+        # Calling the concrete function skips argument matching and retracing checks
+        self._concrete = forward.get_concrete_function()
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self._concrete(tf.constant(batch, dtype=tf.float32)).numpy()
+
+
+class TFLiteBackend(InferenceBackend):
+    """
+    TFLite interpreter over a model converted with a fixed batch size of one.
+
+    LSTM graphs converted by TFLite bake the batch dimension into their reshape
+    ops, so larger batches are run row by row on the same interpreter; each
+    invoke costs tens of microseconds.
+    """
+
+    name = 'tflite'
+
+    def __init__(self, model_content: bytes, num_threads: Optional[int] = None):
+        self.interpreter = tf.lite.Interpreter(model_content=model_content, num_threads=num_threads)
+        self.interpreter.allocate_tensors()
+        input_details = self.interpreter.get_input_details()[0]
+        output_details = self.interpreter.get_output_details()[0]
+        self._input_index = input_details['index']
+        self._output_index = output_details['index']
+        self.input_shape = tuple(input_details['shape'])
+        self.input_dtype = input_details['dtype']
+        self.input_quantization = input_details['quantization']
+        self.output_quantization = output_details['quantization']
+        # Full-integer models take and return quantized tensors
+        self._quantized_input = np.issubdtype(self.input_dtype, np.integer)
+        self._quantized_output = np.issubdtype(output_details['dtype'], np.integer)
+
+    def _quantize(self, row: np.ndarray) -> np.ndarray:
+        scale, zero_point = self.input_quantization
+        limits = np.iinfo(self.input_dtype)
+        return np.clip(np.round(row / scale + zero_point), limits.min, limits.max).astype(self.input_dtype)
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        outputs = []
+        for row in batch:
+            row = row[np.newaxis]
+            if self._quantized_input:
+                row = self._quantize(row)
+            self.interpreter.set_tensor(self._input_index, row.astype(self.input_dtype))
+            self.interpreter.invoke()
+            outputs.append(self.interpreter.get_tensor(self._output_index)[0])
+        outputs = np.stack(outputs).astype(np.float32)
+        if self._quantized_output:
+            scale, zero_point = self.output_quantization
+            outputs = (outputs - zero_point) * scale
+        return outputs
+
+
+class ONNXBackend(InferenceBackend):
+    """ONNX Runtime session (requires the optional onnxruntime package)."""
+
+    name = 'onnx'
+
+    def __init__(self, onnx_path: str, num_threads: Optional[int] = None):
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The 'onnx' backend requires onnxruntime: pip install onnxruntime") from e
+
+        options = ort.SessionOptions()
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.session = ort.InferenceSession(
+            onnx_path, sess_options=options, providers=['CPUExecutionProvider']
+        )
+        self._input_name = self.session.get_inputs()[0].name
+
+    def predict(self, batch: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self._input_name: batch.astype(np.float32)})[0]
+
+
+def unrolled_copy(model: tf.keras.Model) -> tf.keras.Model:
+    """
+    Clone a model with its recurrent layers unrolled over the fixed window.
+
+    The weights are shared by value, so outputs match the original model;
+    the graph has one cell per time step instead of a while loop.
+    """
+    def clone_layer(layer):
+        config = layer.get_config()
+        if isinstance(layer, tf.keras.layers.Bidirectional):
+            for key in ('layer', 'backward_layer'):
+                if config.get(key):
+                    config[key]['config']['unroll'] = True
+        elif isinstance(layer, tf.keras.layers.RNN):
+            config['unroll'] = True
+        return layer.__class__.from_config(config)
+
+    clone = tf.keras.models.clone_model(model, clone_function=clone_layer)
+    clone.set_weights(model.get_weights())
+    return clone
+
+
+def convert_to_tflite(
+    model: tf.keras.Model,
+    quantization: Optional[str] = None,
+    representative_data: Optional[np.ndarray] = None
+) -> bytes:
+    """
+    Convert a Keras model to a TFLite flatbuffer with a batch size of one.
+
+    Variables are frozen into constants first; this also works for Keras 3
+    recurrent layers, whose variable reads inside the loop body otherwise fail
+    at invoke time. Quantized models are converted from an unrolled copy,
+    because calibrating the recurrent while loop is not supported.
+
+    Args:
+        model: Keras model with input shape (None, window_size, features)
+        quantization: None for float32, 'dynamic' for int8 weights, or 'int8'
+            for int8 weights and activations with int8 input and output
+        representative_data: Input windows of shape (samples, window_size, features)
+            used to calibrate activation ranges; required for 'int8'
+
+    Returns:
+        Serialized TFLite model
+
+    Raises:
+        ValueError: If the quantization mode is unknown or 'int8' has no representative data
+    """
+    from tensorflow.python.framework.convert_to_constants import convert_variables_to_constants_v2
+
+    if quantization is not None and quantization not in QUANTIZATION_MODES:
+        raise ValueError(f"Unknown quantization '{quantization}', expected one of {QUANTIZATION_MODES}")
+    if quantization == 'int8' and representative_data is None:
+        raise ValueError("Full-integer quantization needs representative_data for calibration")
+
+    if quantization is not None:
+        model = unrolled_copy(model)
+
+    _, window_size, features = model.input_shape
+    signature = tf.TensorSpec([1, window_size, features], tf.float32)
+    forward = tf.function(lambda x: model(x, training=False), input_signature=[signature])
+    frozen = convert_variables_to_constants_v2(forward.get_concrete_function())
+
+    converter = tf.lite.TFLiteConverter.from_concrete_functions([frozen])
+    if quantization is not None:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if quantization == 'int8':
+        def representative_dataset():
+            for window in representative_data:
+                yield [np.asarray(window, dtype=np.float32)[np.newaxis]]
+
+        converter.representative_dataset = representative_dataset
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+        converter.inference_input_type = tf.int8
+        converter.inference_output_type = tf.int8
+    return converter.convert()
+
+
+def convert_to_onnx(model: tf.keras.Model, output_path: str):
+    """
+    Export a Keras model to ONNX (requires the optional tf2onnx package).
+
+    Args:
+        model: Keras model with input shape (None, window_size, features)
+        output_path: Destination .onnx file
+    """
+    try:
+        import tf2onnx
+    except ImportError as e:
+        raise ImportError("ONNX export requires tf2onnx: pip install tf2onnx") from e
+
+    _, window_size, features = model.input_shape
+    signature = (tf.TensorSpec([None, window_size, features], tf.float32, name='input'),)
+    tf2onnx.convert.from_keras(model, input_signature=signature, output_path=output_path)
+
+
+def warm_up(backend: InferenceBackend, model: tf.keras.Model, batch_sizes=(1,)):
+    """
+    Run throwaway forward passes so tracing and allocation happen before serving.
+
+    Args:
+        backend: Backend to warm up
+        model: Keras model providing the input shape
+        batch_sizes: Batch sizes to exercise
+    """
+    _, window_size, features = model.input_shape
+    for batch_size in batch_sizes:
+        backend.predict(np.zeros((batch_size, window_size, features), dtype=np.float32))
+
+
+def check_parity(
+    backend: InferenceBackend,
+    model: tf.keras.Model,
+    num_samples: int = 16,
+    atol: float = 1e-4,
+    seed: int = 0
+) -> float:
+    """
+    Compare a backend against the Keras model on random inputs.
+
+    Args:
+        backend: Backend under test
+        model: Reference Keras model
+        num_samples: Number of random windows
+        atol: Largest allowed absolute difference
+        seed: Random seed for the inputs
+
+    Returns:
+        Largest absolute difference between backend and Keras outputs
+
+    Raises:
+        ValueError: If the difference exceeds atol
+    """
+    _, window_size, features = model.input_shape
+    rng = np.random.default_rng(seed)
+    batch = rng.standard_normal((num_samples, window_size, features)).astype(np.float32)
+
+    expected = model.predict(batch, verbose=0)
+    actual = backend.predict(batch)
+    max_diff = float(np.max(np.abs(actual - expected)))
+
+    if max_diff > atol:
+        raise ValueError(
+            f"Backend '{backend.name}' deviates from Keras by {max_diff:.2e} (tolerance {atol:.0e})"
+        )
+    return max_diff
@@ -0,0 +1,162 @@
+"""
+Post-training int8 quantization of the time-series models.
+
+This script:
+1. Converts a trained Keras model to float32, dynamic-range and full-integer TFLite
+2. Calibrates the full-integer model on windows drawn from the training data
+3. Measures validation MAE drift and single-sample latency against float32
+4. Saves each quantized model next to the .keras file (<name>.<mode>.tflite)
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+def representative_windows(X: np.ndarray, num_samples: int = 200, seed: int = 0) -> np.ndarray:
+    """Draw a random subset of training windows for activation calibration."""
+    rng = np.random.default_rng(seed)
+    indices = rng.choice(len(X), size=min(num_samples, len(X)), replace=False)
+    return X[np.sort(indices)].astype(np.float32)
+
+
+def single_sample_latency_ms(backend, X: np.ndarray, runs: int = 200) -> float:
+    """Median latency of one-window predictions, as served per message."""
+    timings = []
+    for i in range(runs):
+        sample = X[i % len(X)][np.newaxis]
+        started = time.perf_counter()
+        backend.predict(sample)
+        timings.append((time.perf_counter() - started) * 1000)
+    return float(np.median(timings))
+
+
+def quantize_model(
+    model,
+    model_path: str,
+    X_calibration: np.ndarray,
+    X_val: np.ndarray,
+    y_val: np.ndarray,
+    modes: Sequence[str] = ('dynamic', 'int8'),
+    num_calibration_samples: int = 200,
+    latency_runs: int = 200,
+    num_threads: Optional[int] = 1
+) -> List[dict]:
+    """
+    Quantize a model, save the TFLite artifacts and compare them with float32.
+
+    Args:
+        model: Trained Keras model
+        model_path: Path of the saved .keras file; artifacts are written next to it
+        X_calibration: Training windows to draw the representative dataset from
+        X_val: Validation windows
+        y_val: Validation targets
+        modes: Quantization modes to produce ('dynamic' and/or 'int8')
+        num_calibration_samples: Windows used to calibrate the int8 activation ranges
+        latency_runs: Single-window predictions timed per variant
+        num_threads: TFLite interpreter threads
+
+    Returns:
+        One report per variant (float32 Keras, float32 TFLite, then each mode) with
+        MAE, drift from the Keras MAE, largest output difference, latency and speedup
+    """
+    from src.inference_service.model_loader import tflite_extension
+    from src.inference_service.runtime import TFFunctionBackend, TFLiteBackend, convert_to_tflite
+
+    X_val = X_val.astype(np.float32)
+    keras_predictions = model.predict(X_val, batch_size=1024, verbose=0)
+    keras_mae = float(np.mean(np.abs(keras_predictions - y_val)))
+    calibration = representative_windows(X_calibration, num_calibration_samples)
+
+    variants = [('float32', None)] + [(mode, mode) for mode in modes]
+    reports = [{
+        'variant': 'keras',
+        'mae': keras_mae,
+        'mae_drift': 0.0,
+        'max_abs_diff': 0.0,
+        'latency_ms': single_sample_latency_ms(TFFunctionBackend(model), X_val, latency_runs),
+        'size_kb': os.path.getsize(model_path) / 1024,
+        'path': model_path
+    }]
+
+    for name, quantization in variants:
+        started = time.perf_counter()
+        content = convert_to_tflite(model, quantization, representative_data=calibration)
+        path = os.path.splitext(model_path)[0] + tflite_extension(quantization)
+        with open(path, 'wb') as f:
+            f.write(content)
+
+        backend = TFLiteBackend(content, num_threads=num_threads)
+        predictions = backend.predict(X_val)
+        mae = float(np.mean(np.abs(predictions - y_val)))
+        reports.append({
+            'variant': f'tflite_{name}',
+            'mae': mae,
+            'mae_drift': mae - keras_mae,
+            'max_abs_diff': float(np.max(np.abs(predictions - keras_predictions))),
+            'latency_ms': single_sample_latency_ms(backend, X_val, latency_runs),
+            'size_kb': len(content) / 1024,
+            'path': path
+        })
+        logger.info(f'Converted {name} model in {time.perf_counter() - started:.1f}s: {path}')
+
+    # Latency gain relative to the float32 TFLite model served the same way
+    baseline = reports[1]['latency_ms']
+    for report in reports:
+        report['speedup'] = baseline / report['latency_ms'] if report['latency_ms'] > 0 else None
+    return reports
+
+
+def log_report(reports: List[dict]):
+    """Log the quantization report as a table."""
+    logger.info(f"{'variant':<15} {'MAE':>9} {'drift':>9} {'max diff':>9} {'latency ms':>11} "
+                f"{'speedup':>8} {'size KB':>8}")
+    for r in reports:
+        logger.info(f"{r['variant']:<15} {r['mae']:>9.4f} {r['mae_drift']:>+9.4f} {r['max_abs_diff']:>9.4f} "
+                    f"{r['latency_ms']:>11.4f} {r['speedup']:>7.2f}x {r['size_kb']:>8.1f}")
+
+
+def main():
+    """Quantize a saved model from the command line."""
+    parser = argparse.ArgumentParser(description='Post-training int8 quantization of a trained model')
+    parser.add_argument('--model', default='models/time_series_lstm.keras')
+    parser.add_argument('--modes', nargs='+', default=['dynamic', 'int8'], choices=['dynamic', 'int8'])
+    parser.add_argument('--num-samples', type=int, default=10000, help='Synthetic samples, as in training')
+    parser.add_argument('--validation-split', type=float, default=0.2)
+    parser.add_argument('--calibration-samples', type=int, default=200)
+    parser.add_argument('--latency-runs', type=int, default=200)
+    args = parser.parse_args()
+
+    from src.inference_service.model_loader import ModelLoader
+    from src.models.train_model import generate_synthetic_data
+
+    model = ModelLoader(args.model).load_model()
+
+    # Regenerate the training data with the training seed
+    np.random.seed(42)
+    X, y = generate_synthetic_data(num_samples=args.num_samples, window_size=model.input_shape[1])
+    val_samples = int(len(X) * args.validation_split)
+
+    reports = quantize_model(
+        model, args.model,
+        X[:-val_samples], X[-val_samples:], y[-val_samples:],
+        modes=args.modes,
+        num_calibration_samples=args.calibration_samples,
+        latency_runs=args.latency_runs
+    )
+    log_report(reports)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+"""
+Parallel architecture sweep for the LSTM model builders.
+
+This script:
+1. Expands a grid of architectures and builder hyperparameters
+2. Trains every candidate with early stopping in a process pool
+3. Measures single-sample inference latency of each trained model
+4. Writes a leaderboard of validation MAE against latency
+"""
+
+import argparse
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+import numpy as np
+
+# Add parent directory to path
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from src.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+ARCHITECTURES = ('lstm', 'bidirectional', 'cnn_lstm')
+
+# Builder keyword arguments to try per architecture
+DEFAULT_GRID: Dict[str, Dict[str, list]] = {
+    'lstm': {
+        'lstm_units': [(32,), (64,), (64, 32)],
+        'dropout_rate': [0.1, 0.2]
+    },
+    'bidirectional': {
+        'lstm_units': [32, 64],
+        'dropout_rate': [0.2]
+    },
+    'cnn_lstm': {
+        'conv_filters': [32, 64],
+        'lstm_units': [32, 50]
+    }
+}
+
+# Training data, set once per worker process by _init_worker
+_worker_data: Optional[tuple] = None
+
+
+def expand_grid(grid: Dict[str, Dict[str, list]]) -> List[dict]:
+    """
+    Expand a per-architecture grid into one candidate per combination.
+
+    Args:
+        grid: Mapping of architecture name to {builder argument: list of values}
+
+    Returns:
+        List of candidates with 'name', 'architecture' and 'params'
+    """
+    candidates = []
+    for architecture, choices in grid.items():
+        if architecture not in ARCHITECTURES:
+            raise ValueError(f"Unknown architecture '{architecture}', expected one of {ARCHITECTURES}")
+
+        keys = sorted(choices)
+        for values in itertools.product(*(choices[key] for key in keys)):
+            # JSON grids give lists; builders expect tuples for layer sizes
+            params = {key: tuple(value) if isinstance(value, list) else value
+                      for key, value in zip(keys, values)}
+            suffix = '_'.join(
+                f"{key}={'-'.join(map(str, value)) if isinstance(value, tuple) else value}"
+                for key, value in params.items()
+            )
+            candidates.append({
+                'name': f'{architecture}_{suffix}' if suffix else architecture,
+                'architecture': architecture,
+                'params': params
+            })
+    return candidates
+
+
+def mark_pareto_front(results: List[dict]) -> List[dict]:
+    """Flag results not beaten on both validation MAE and latency by another result."""
+    scored = [r for r in results if r.get('error') is None]
+    for result in scored:
+        result['pareto'] = not any(
+            other['val_mae'] <= result['val_mae']
+            and other['latency_p50_ms'] <= result['latency_p50_ms']
+            and (other['val_mae'] < result['val_mae'] or other['latency_p50_ms'] < result['latency_p50_ms'])
+            for other in scored
+        )
+    return results
+
+
+def _init_worker(threads_per_worker: int, X: np.ndarray, y: np.ndarray):
+    """Limit TensorFlow threads before the runtime starts and keep the training data."""
+    global _worker_data
+
+    os.environ['OMP_NUM_THREADS'] = str(threads_per_worker)
+    import tensorflow as tf
+    tf.config.threading.set_intra_op_parallelism_threads(threads_per_worker)
+    tf.config.threading.set_inter_op_parallelism_threads(1)
+
+    _worker_data = (X, y)
+
+
+def _build(candidate: dict, window_size: int, features: int):
+    from src.models.lstm_model import build_bidirectional_lstm, build_cnn_lstm_hybrid, build_lstm_model
+
+    builders = {
+        'lstm': build_lstm_model,
+        'bidirectional': build_bidirectional_lstm,
+        'cnn_lstm': build_cnn_lstm_hybrid
+    }
+    return builders[candidate['architecture']](window_size, features, **candidate['params'])
+
+
+def validation_samples(num_samples: int, validation_split: float) -> int:
+    """
+    Number of samples (from the end) held out for validation.
+
+    Raises:
+        ValueError: If the split leaves no validation or no training samples
+    """
+    val_samples = int(num_samples * validation_split)
+    if val_samples < 1 or val_samples >= num_samples:
+        raise ValueError(f"validation_split {validation_split} of {num_samples} samples leaves "
+                         f"{val_samples} validation and {num_samples - val_samples} training samples; "
+                         f"both need at least one")
+    return val_samples
+
+
+def train_candidate(
+    candidate: dict,
+    epochs: int,
+    batch_size: int,
+    patience: int,
+    validation_split: float,
+    latency_runs: int,
+    output_dir: Optional[str],
+    seed: int
+) -> dict:
+    """
+    Train one candidate with early stopping and measure its inference latency.
+
+    Runs inside a pool worker; the training data comes from _init_worker.
+
+    Returns:
+        Leaderboard row for the candidate
+    """
+    import tensorflow as tf
+    from tensorflow.keras.callbacks import EarlyStopping
+    from src.inference_service.runtime import TFFunctionBackend, warm_up
+
+    X, y = _worker_data
+    np.random.seed(seed)
+    tf.random.set_seed(seed)
+
+    result = {'name': candidate['name'], 'architecture': candidate['architecture'],
+              'params': json.dumps(candidate['params']), 'error': None}
+    try:
+        model = _build(candidate, X.shape[1], X.shape[2])
+
+        val_samples = validation_samples(len(X), validation_split)
+        X_train, y_train = X[:-val_samples], y[:-val_samples]
+        X_val, y_val = X[-val_samples:], y[-val_samples:]
+
+        started = time.perf_counter()
+        history = model.fit(
+            X_train, y_train,
+            validation_data=(X_val, y_val),
+            epochs=epochs,
+            batch_size=batch_size,
+            callbacks=[EarlyStopping(monitor='val_loss', patience=patience, restore_best_weights=True)],
+            verbose=0
+        )
+        train_time = time.perf_counter() - started
+
+        predictions = model.predict(X_val, batch_size=1024, verbose=0)
+        val_mae = float(np.mean(np.abs(predictions - y_val)))
+
+        # Single-sample latency through the low-overhead tf.function backend
+        backend = TFFunctionBackend(model)
+        warm_up(backend, model, (1,))
+        sample = X_val[:1].astype(np.float32)
+        timings = []
+        for _ in range(latency_runs):
+            call_started = time.perf_counter()
+            backend.predict(sample)
+            timings.append((time.perf_counter() - call_started) * 1000)
+
+        if output_dir:
+            model.save(os.path.join(output_dir, f"{candidate['name']}.keras"))
+
+        result.update({
+            'val_mae': val_mae,
+            'latency_p50_ms': float(np.percentile(timings, 50)),
+            'latency_p99_ms': float(np.percentile(timings, 99)),
+            'parameters': int(model.count_params()),
+            'epochs_trained': len(history.history['loss']),
+            'train_time_s': train_time
+        })
+    except Exception as e:
+        result['error'] = str(e)
+    return result
+
+
+def run_sweep(
+    candidates: List[dict],
+    X: np.ndarray,
+    y: np.ndarray,
+    workers: int = 2,
+    threads_per_worker: int = 1,
+    epochs: int = 30,
+    batch_size: int = 32,
+    patience: int = 5,
+    validation_split: float = 0.2,
+    latency_runs: int = 200,
+    output_dir: Optional[str] = None,
+    seed: int = 42
+) -> List[dict]:
+    """
+    Train all candidates in a spawn-based process pool.
+
+    Args:
+        candidates: Candidates from expand_grid
+        X: Input windows of shape (samples, window_size, features)
+        y: Targets of shape (samples, 1)
+        workers: Number of worker processes
+        threads_per_worker: TensorFlow intra-op threads per worker
+        epochs: Maximum epochs per candidate
+        batch_size: Training batch size
+        patience: Early stopping patience in epochs
+        validation_split: Fraction of samples (from the end) used for validation
+        latency_runs: Single-sample predictions timed per candidate
+        output_dir: Directory for trained models (not saved if None)
+        seed: Random seed for every candidate
+
+    Returns:
+        Leaderboard rows sorted by validation MAE, failed candidates last
+
+    Raises:
+        ValueError: If validation_split leaves no validation or training samples
+    """
+    validation_samples(len(X), validation_split)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    results = []
+    context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                             initializer=_init_worker, initargs=(threads_per_worker, X, y)) as pool:
+        futures = {
+            pool.submit(train_candidate, candidate, epochs, batch_size, patience,
+                        validation_split, latency_runs, output_dir, seed): candidate
+            for candidate in candidates
+        }
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['error']:
+                logger.error(f"[{len(results)}/{len(candidates)}] {result['name']} failed: {result['error']}")
+            else:
+                logger.info(f"[{len(results)}/{len(candidates)}] {result['name']}: "
+                            f"val MAE {result['val_mae']:.4f}, latency {result['latency_p50_ms']:.3f} ms, "
+                            f"{result['epochs_trained']} epochs")
+
+    mark_pareto_front(results)
+    return sorted(results, key=lambda r: (r['error'] is not None, r.get('val_mae', float('inf'))))
+
+
+LEADERBOARD_FIELDS = ['rank', 'name', 'architecture', 'params', 'val_mae', 'latency_p50_ms',
+                      'latency_p99_ms', 'pareto', 'parameters', 'epochs_trained', 'train_time_s', 'error']
+
+
+def write_leaderboard(results: List[dict], path: str):
+    """Write the leaderboard as CSV."""
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=LEADERBOARD_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        for rank, result in enumerate(results, start=1):
+            writer.writerow({'rank': rank, **result})
+
+
+def main():
+    """Run the architecture sweep from the command line."""
+    parser = argparse.ArgumentParser(description='Parallel architecture sweep for the LSTM model builders')
+    parser.add_argument('--grid', help='JSON file with {architecture: {builder argument: [values]}}')
+    parser.add_argument('--workers', type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument('--threads-per-worker', type=int, default=1)
+    parser.add_argument('--epochs', type=int, default=30)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--patience', type=int, default=5)
+    parser.add_argument('--num-samples', type=int, default=10000)
+    parser.add_argument('--window-size', type=int, default=24)
+    parser.add_argument('--latency-runs', type=int, default=200)
+    parser.add_argument('--output-dir', default='models/sweep')
+    parser.add_argument('--leaderboard', default='models/sweep_leaderboard.csv')
+    args = parser.parse_args()
+
+    from src.models.train_model import generate_synthetic_data
+
+    grid = DEFAULT_GRID
+    if args.grid:
+        with open(args.grid) as f:
+            grid = json.load(f)
+
+    candidates = expand_grid(grid)
+    np.random.seed(42)
+    X, y = generate_synthetic_data(num_samples=args.num_samples, window_size=args.window_size)
+
+    logger.info(f'Sweeping {len(candidates)} candidates on {args.workers} workers '
+                f'({args.threads_per_worker} threads each)')
+    started = time.perf_counter()
+    results = run_sweep(
+        candidates, X, y,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        patience=args.patience,
+        latency_runs=args.latency_runs,
+        output_dir=args.output_dir
+    )
+    write_leaderboard(results, args.leaderboard)
+
+    logger.info(f'Sweep finished in {time.perf_counter() - started:.0f}s; leaderboard: {args.leaderboard}')
+    for rank, result in enumerate(results[:10], start=1):
+        if result['error'] is None:
+            logger.info(f"{rank:2d}. {result['name']:<45} MAE {result['val_mae']:.4f}  "
+                        f"p50 {result['latency_p50_ms']:.3f} ms{'  (pareto)' if result['pareto'] else ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,7 @@ This script:
 2. Builds LSTM model architecture
 3. Trains the model with validation
 4. Saves the trained model
+5. Saves dynamic-range and full-integer quantized TFLite models next to it
 """
 
 import numpy as np
@@ -21,6 +22,7 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../.
 
 from src.utils.logger import setup_logger
 from src.models.lstm_model import build_lstm_model
+from src.models.quantize import log_report, quantize_model
 
 logger = setup_logger(__name__)
 
@@ -202,6 +204,11 @@ def main():
     logger.info(f'Sample prediction: {sample_prediction[0][0]:.4f}')
     logger.info(f'Actual value: {sample_actual[0]:.4f}')
     logger.info(f'Prediction error: {abs(sample_prediction[0][0] - sample_actual[0]):.4f}')
+    
+    # Post-training int8 quantization for cheaper CPU inference
+    logger.info('\nQuantizing model (dynamic-range and full-integer TFLite)...')
+    reports = quantize_model(model, model_path, X_train[:-val_samples], X_val, y_val)
+    log_report(reports)
 
 
 if __name__ == "__main__":
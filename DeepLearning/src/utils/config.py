@@ -17,6 +17,7 @@ class Config:
     KAFKA_FEATURES_TOPIC: str = os.getenv('KAFKA_FEATURES_TOPIC', 'prepared-ml-features')
     KAFKA_PREDICTIONS_TOPIC: str = os.getenv('KAFKA_PREDICTIONS_TOPIC', 'ml-predictions')
     KAFKA_DLQ_TOPIC: str = os.getenv('KAFKA_DLQ_TOPIC', 'raw-sensor-data-dlq')
+    FEATURE_FORMAT: str = os.getenv('FEATURE_FORMAT', 'json')  # json or binary (once every consumer reads binary)
     
     # Redis Configuration
     REDIS_HOST: str = os.getenv('REDIS_HOST', 'localhost')
@@ -24,15 +25,35 @@ class Config:
     REDIS_DB: int = int(os.getenv('REDIS_DB', '0'))
     REDIS_PASSWORD: Optional[str] = os.getenv('REDIS_PASSWORD', None)
     
+    # Window State Checkpointing (Redis)
+    CHECKPOINT_ENABLED: bool = os.getenv('CHECKPOINT_ENABLED', 'false').lower() == 'true'
+    CHECKPOINT_INTERVAL_S: float = float(os.getenv('CHECKPOINT_INTERVAL_S', '5.0'))
+    CHECKPOINT_BATCH_SIZE: int = int(os.getenv('CHECKPOINT_BATCH_SIZE', '500'))
+    CHECKPOINT_KEY_PREFIX: str = os.getenv('CHECKPOINT_KEY_PREFIX', 'etl:windows')
+    
     # Model Configuration
     MODEL_PATH: str = os.getenv('MODEL_PATH', 'models/time_series_lstm.keras')
     MODEL_VERSION: str = os.getenv('MODEL_VERSION', '1.0')
+    MODEL_DIR: Optional[str] = os.getenv('MODEL_DIR', None)  # Versioned <version>.keras files, hot reloaded
+    MODEL_POLL_INTERVAL_S: float = float(os.getenv('MODEL_POLL_INTERVAL_S', '10'))
     WINDOW_SIZE: int = int(os.getenv('WINDOW_SIZE', '24'))
+    INFERENCE_BACKEND: str = os.getenv('INFERENCE_BACKEND', 'keras')  # keras, tf_function, tflite, onnx
+    INFERENCE_THREADS: int = int(os.getenv('INFERENCE_THREADS', '1'))
+    TFLITE_QUANTIZATION: Optional[str] = os.getenv('TFLITE_QUANTIZATION') or None  # dynamic or int8 (tflite backend)
+    PARITY_TOLERANCE: float = float(os.getenv('PARITY_TOLERANCE', '1e-4'))
+    QUANTIZED_PARITY_TOLERANCE: float = float(os.getenv('QUANTIZED_PARITY_TOLERANCE', '0.05'))  # With TFLITE_QUANTIZATION
     
     # Service Configuration
     LOG_LEVEL: str = os.getenv('LOG_LEVEL', 'INFO')
     BATCH_SIZE: int = int(os.getenv('BATCH_SIZE', '32'))
     PREDICTION_TIMEOUT: int = int(os.getenv('PREDICTION_TIMEOUT', '5'))
+    MAX_BATCH_LATENCY_MS: float = float(os.getenv('MAX_BATCH_LATENCY_MS', '20'))
+    FUSED_FEATURES_TAP: bool = os.getenv('FUSED_FEATURES_TAP', 'false').lower() == 'true'
+    
+    # ETL Batch Consumption
+    ETL_BATCH_MODE: bool = os.getenv('ETL_BATCH_MODE', 'false').lower() == 'true'
+    CONSUME_BATCH_SIZE: int = int(os.getenv('CONSUME_BATCH_SIZE', '500'))
+    CONSUME_TIMEOUT: float = float(os.getenv('CONSUME_TIMEOUT', '1.0'))
     
     # AWS Configuration
     AWS_REGION: str = os.getenv('AWS_REGION', 'us-east-1')
@@ -50,6 +71,16 @@ class Config:
             'enable.auto.commit': True
         }
     
+    @classmethod
+    def get_redis_config(cls) -> dict:
+        """Get Redis client configuration."""
+        return {
+            'host': cls.REDIS_HOST,
+            'port': cls.REDIS_PORT,
+            'db': cls.REDIS_DB,
+            'password': cls.REDIS_PASSWORD or None
+        }
+    
     @classmethod
     def get_kafka_producer_config(cls) -> dict:
         """Get Kafka producer configuration."""
@@ -0,0 +1,179 @@
+"""Wire formats for feature messages on the prepared-ml-features topic."""
+
+import json
+import struct
+import numpy as np
+from typing import List, Optional, Tuple
+
+
+CONTENT_TYPE_HEADER = 'content-type'
+JSON_CONTENT_TYPE = 'application/json'
+BINARY_CONTENT_TYPE = 'application/x-feature-vector'
+BINARY_FORMAT_VERSION = 1
+
+# Binary layout (little-endian):
+#   magic (2s) | version (B) | dtype code (B) | window_size (H) | device_id length (H) | timestamp length (H)
+#   device_id (utf-8) | latest_timestamp (utf-8) | zero padding to a 4-byte boundary | float32 values
+_HEADER = struct.Struct('<2sBBHHH')
+_MAGIC = b'FV'
+_DTYPE_FLOAT32 = 1
+_ALIGNMENT = 4
+
+
+class FeatureDecodeError(ValueError):
+    """Raised when a feature message cannot be decoded."""
+
+
+def encode_binary(device_id: str, feature_vector: np.ndarray, latest_timestamp: str) -> bytes:
+    """
+    Encode a feature window as header plus raw little-endian float32 bytes.
+
+    Args:
+        device_id: Device identifier
+        feature_vector: 1-D normalized window
+        latest_timestamp: Timestamp of the newest value in the window
+
+    Returns:
+        Serialized message value
+    """
+    device_bytes = device_id.encode('utf-8')
+    timestamp_bytes = latest_timestamp.encode('utf-8')
+    values = np.ascontiguousarray(feature_vector, dtype='<f4')
+
+    header = _HEADER.pack(
+        _MAGIC, BINARY_FORMAT_VERSION, _DTYPE_FLOAT32,
+        len(values), len(device_bytes), len(timestamp_bytes)
+    )
+    prefix_len = len(header) + len(device_bytes) + len(timestamp_bytes)
+    padding = b'\x00' * (-prefix_len % _ALIGNMENT)
+    return b''.join((header, device_bytes, timestamp_bytes, padding, values.tobytes()))
+
+
+def decode_binary(value: bytes) -> dict:
+    """
+    Decode a binary feature message.
+
+    The returned feature vector is a read-only view over ``value`` (no copy).
+
+    Args:
+        value: Serialized message value
+
+    Returns:
+        Feature payload with device_id, feature_vector, latest_timestamp and window_size
+
+    Raises:
+        FeatureDecodeError: If the message is truncated or has an unknown version
+    """
+    if len(value) < _HEADER.size:
+        raise FeatureDecodeError(f'Feature message too short: {len(value)} bytes')
+
+    magic, version, dtype_code, window_size, device_len, timestamp_len = _HEADER.unpack_from(value)
+    if magic != _MAGIC:
+        raise FeatureDecodeError(f'Bad feature message magic: {magic!r}')
+    if version != BINARY_FORMAT_VERSION or dtype_code != _DTYPE_FLOAT32:
+        raise FeatureDecodeError(f'Unsupported feature format version {version} (dtype {dtype_code})')
+
+    device_start = _HEADER.size
+    timestamp_start = device_start + device_len
+    values_start = timestamp_start + timestamp_len
+    values_start += -values_start % _ALIGNMENT
+
+    if len(value) != values_start + 4 * window_size:
+        raise FeatureDecodeError(
+            f'Feature message length {len(value)} does not match window size {window_size}'
+        )
+
+    try:
+        device_id = bytes(value[device_start:timestamp_start]).decode('utf-8')
+        latest_timestamp = bytes(value[timestamp_start:timestamp_start + timestamp_len]).decode('utf-8')
+    except UnicodeDecodeError as e:
+        raise FeatureDecodeError(f'Invalid text field in feature message: {e}')
+
+    return {
+        'device_id': device_id,
+        'feature_vector': np.frombuffer(value, dtype='<f4', count=window_size, offset=values_start),
+        'latest_timestamp': latest_timestamp,
+        'window_size': window_size
+    }
+
+
+def encode_features(
+    device_id: str,
+    feature_vector: np.ndarray,
+    latest_timestamp: str,
+    feature_format: str = 'binary'
+) -> Tuple[bytes, List[Tuple[str, bytes]]]:
+    """
+    Serialize a feature payload and the headers announcing its format.
+
+    Args:
+        device_id: Device identifier
+        feature_vector: 1-D normalized window
+        latest_timestamp: Timestamp of the newest value in the window
+        feature_format: 'binary' or 'json'
+
+    Returns:
+        Tuple of (message value, Kafka message headers)
+    """
+    if feature_format == 'binary':
+        content_type = f'{BINARY_CONTENT_TYPE};v={BINARY_FORMAT_VERSION}'
+        value = encode_binary(device_id, feature_vector, latest_timestamp)
+    elif feature_format == 'json':
+        content_type = JSON_CONTENT_TYPE
+        value = json.dumps({
+            "device_id": device_id,
+            "feature_vector": np.asarray(feature_vector).tolist(),
+            "latest_timestamp": latest_timestamp,
+            "window_size": len(feature_vector)
+        }).encode('utf-8')
+    else:
+        raise ValueError(f"Unknown feature format '{feature_format}', expected 'binary' or 'json'")
+
+    return value, [(CONTENT_TYPE_HEADER, content_type.encode('utf-8'))]
+
+
+def content_type(headers: Optional[List[Tuple[str, bytes]]]) -> str:
+    """Return the content-type header of a message, defaulting to JSON for untagged messages."""
+    for key, header_value in headers or ():
+        if key == CONTENT_TYPE_HEADER and header_value is not None:
+            return header_value.decode('utf-8')
+    return JSON_CONTENT_TYPE
+
+
+def decode_features(value: bytes, headers: Optional[List[Tuple[str, bytes]]] = None) -> dict:
+    """
+    Decode a feature message in whichever format its headers announce.
+
+    Messages without a content-type header are treated as JSON, so producers
+    that predate the binary format keep working.
+
+    Args:
+        value: Serialized message value
+        headers: Kafka message headers
+
+    Returns:
+        Feature payload with device_id, feature_vector, latest_timestamp and window_size
+
+    Raises:
+        FeatureDecodeError: If the format is unknown or the message is malformed
+    """
+    media_type, _, parameters = content_type(headers).partition(';')
+
+    if media_type == BINARY_CONTENT_TYPE:
+        if parameters and parameters.strip() != f'v={BINARY_FORMAT_VERSION}':
+            raise FeatureDecodeError(f'Unsupported feature format: {parameters.strip()}')
+        return decode_binary(value)
+
+    if media_type == JSON_CONTENT_TYPE:
+        try:
+            payload = json.loads(value.decode('utf-8'))
+            return {
+                'device_id': payload['device_id'],
+                'feature_vector': np.asarray(payload['feature_vector'], dtype=np.float32),
+                'latest_timestamp': payload['latest_timestamp'],
+                'window_size': payload['window_size']
+            }
+        except (UnicodeDecodeError, json.JSONDecodeError, KeyError, TypeError, ValueError) as e:
+            raise FeatureDecodeError(f'Invalid JSON feature message: {e}')
+
+    raise FeatureDecodeError(f'Unknown feature content type: {media_type}')
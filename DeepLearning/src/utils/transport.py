@@ -0,0 +1,290 @@
+"""
+Message transports for the pipeline services.
+
+Services obtain their consumers and producers from a transport instead of
+creating Kafka clients directly. KafkaTransport builds confluent_kafka
+clients from Config; InMemoryBroker is a single-process stand-in exposing the
+same subset of the client API, for tests and benchmarks without a cluster.
+"""
+
+import threading
+import time
+import zlib
+from collections import namedtuple
+from typing import Callable, Dict, List, Optional, Tuple
+
+from src.utils.config import Config
+
+# Mirrors the attributes of confluent_kafka.TopicPartition used by rebalance callbacks
+TopicPartition = namedtuple('TopicPartition', ['topic', 'partition'])
+
+# Message timestamp type reported by the in-memory broker (TIMESTAMP_CREATE_TIME)
+TIMESTAMP_CREATE_TIME = 1
+
+
+class Transport:
+    """Factory for the consumers and producers a service uses."""
+
+    name = 'base'
+
+    def consumer(self, group_id: str):
+        """Create a consumer in the given consumer group."""
+        raise NotImplementedError
+
+    def producer(self):
+        """Create a producer."""
+        raise NotImplementedError
+
+
+class KafkaTransport(Transport):
+    """Kafka clients configured from Config."""
+
+    name = 'kafka'
+
+    def consumer(self, group_id: str):
+        from confluent_kafka import Consumer
+        return Consumer(Config.get_kafka_consumer_config(group_id))
+
+    def producer(self):
+        from confluent_kafka import Producer
+        return Producer(Config.get_kafka_producer_config())
+
+
+class InMemoryMessage:
+    """Stored message with the accessor methods of confluent_kafka.Message."""
+
+    __slots__ = ('_topic', '_partition', '_offset', '_key', '_value', '_headers',
+                 '_timestamp_ms', 'produced_at')
+
+    def __init__(self, topic: str, partition: int, offset: int, key: Optional[bytes],
+                 value: Optional[bytes], headers: Optional[List[Tuple[str, bytes]]]):
+        self._topic = topic
+        self._partition = partition
+        self._offset = offset
+        self._key = key
+        self._value = value
+        self._headers = headers
+        self._timestamp_ms = int(time.time() * 1000)
+        # Monotonic append time, for latency measurements
+        self.produced_at = time.perf_counter()
+
+    def topic(self) -> str:
+        return self._topic
+
+    def partition(self) -> int:
+        return self._partition
+
+    def offset(self) -> int:
+        return self._offset
+
+    def key(self) -> Optional[bytes]:
+        return self._key
+
+    def value(self) -> Optional[bytes]:
+        return self._value
+
+    def headers(self) -> Optional[List[Tuple[str, bytes]]]:
+        return self._headers
+
+    def timestamp(self) -> Tuple[int, int]:
+        return TIMESTAMP_CREATE_TIME, self._timestamp_ms
+
+    def error(self):
+        return None
+
+
+def _to_bytes(data) -> Optional[bytes]:
+    if data is None or isinstance(data, bytes):
+        return data
+    return data.encode('utf-8') if isinstance(data, str) else bytes(data)
+
+
+class InMemoryBroker(Transport):
+    """
+    Thread-safe in-process broker with partitioned topics and consumer group offsets.
+
+    Keys are hashed to partitions like Kafka keyed messages, so per-device
+    ordering holds. Consumers in a group share committed offsets and start
+    from the beginning of each partition; every consumer is assigned all
+    partitions of its subscribed topics.
+    """
+
+    name = 'memory'
+
+    def __init__(self, num_partitions: int = 4):
+        """
+        Initialize the broker.
+
+        Args:
+            num_partitions: Partitions created for each new topic
+        """
+        self.num_partitions = num_partitions
+        self._partitions: Dict[str, List[List[InMemoryMessage]]] = {}
+        self._offsets: Dict[Tuple[str, str, int], int] = {}
+        self._condition = threading.Condition()
+
+    def consumer(self, group_id: str) -> 'InMemoryConsumer':
+        return InMemoryConsumer(self, group_id)
+
+    def producer(self) -> 'InMemoryProducer':
+        return InMemoryProducer(self)
+
+    def _topic(self, topic: str) -> List[List[InMemoryMessage]]:
+        partitions = self._partitions.get(topic)
+        if partitions is None:
+            partitions = self._partitions[topic] = [[] for _ in range(self.num_partitions)]
+        return partitions
+
+    def append(self, topic: str, key=None, value=None, headers=None,
+               partition: Optional[int] = None) -> InMemoryMessage:
+        """
+        Append a message to a topic, waking up waiting consumers.
+
+        Returns:
+            The stored message
+        """
+        key = _to_bytes(key)
+        if isinstance(headers, dict):
+            headers = list(headers.items())
+        if headers is not None:
+            headers = [(name, _to_bytes(header_value)) for name, header_value in headers]
+
+        with self._condition:
+            partitions = self._topic(topic)
+            if partition is None:
+                partition = zlib.crc32(key) % len(partitions) if key is not None else 0
+            log = partitions[partition]
+            message = InMemoryMessage(topic, partition, len(log), key, _to_bytes(value), headers)
+            log.append(message)
+            self._condition.notify_all()
+        return message
+
+    def topic_partitions(self, topics: List[str]) -> List[TopicPartition]:
+        """List the partitions of the given topics, creating missing topics."""
+        with self._condition:
+            return [TopicPartition(topic, partition)
+                    for topic in topics for partition in range(len(self._topic(topic)))]
+
+    def fetch(self, group_id: str, assignment: List[TopicPartition], max_messages: int,
+              timeout: Optional[float]) -> List[InMemoryMessage]:
+        """
+        Take up to max_messages for a group, waiting until at least one is available.
+
+        Args:
+            group_id: Consumer group whose offsets advance
+            assignment: Partitions to read from
+            max_messages: Largest number of messages returned
+            timeout: Seconds to wait (None or negative waits indefinitely)
+
+        Returns:
+            Messages in per-partition order (empty on timeout)
+        """
+        deadline = None if timeout is None or timeout < 0 else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                messages = []
+                for tp in assignment:
+                    if len(messages) >= max_messages:
+                        break
+                    log = self._partitions[tp.topic][tp.partition]
+                    offset = self._offsets.get((group_id, tp.topic, tp.partition), 0)
+                    taken = log[offset:offset + max_messages - len(messages)]
+                    if taken:
+                        messages.extend(taken)
+                        self._offsets[(group_id, tp.topic, tp.partition)] = offset + len(taken)
+                if messages:
+                    return messages
+
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return []
+                self._condition.wait(remaining)
+
+    def lag(self, group_id: str, topic: str) -> int:
+        """Number of messages in a topic not yet fetched by a group."""
+        with self._condition:
+            return sum(
+                len(log) - self._offsets.get((group_id, topic, partition), 0)
+                for partition, log in enumerate(self._topic(topic))
+            )
+
+    def messages(self, topic: str) -> List[InMemoryMessage]:
+        """All messages of a topic, partition by partition."""
+        with self._condition:
+            return [message for log in self._topic(topic) for message in log]
+
+
+class InMemoryConsumer:
+    """Consumer of an InMemoryBroker with the poll/consume API of confluent_kafka.Consumer."""
+
+    def __init__(self, broker: InMemoryBroker, group_id: str):
+        self.broker = broker
+        self.group_id = group_id
+        self.assignment: List[TopicPartition] = []
+        self._on_revoke: Optional[Callable] = None
+        self._closed = False
+
+    def subscribe(self, topics: List[str], on_assign: Optional[Callable] = None,
+                  on_revoke: Optional[Callable] = None):
+        """Assign all partitions of the topics, calling on_assign like a completed rebalance."""
+        self.assignment = self.broker.topic_partitions(topics)
+        self._on_revoke = on_revoke
+        if on_assign is not None:
+            on_assign(self, self.assignment)
+
+    def poll(self, timeout: Optional[float] = None) -> Optional[InMemoryMessage]:
+        messages = self.consume(num_messages=1, timeout=timeout)
+        return messages[0] if messages else None
+
+    def consume(self, num_messages: int = 1, timeout: Optional[float] = None) -> List[InMemoryMessage]:
+        if self._closed:
+            raise RuntimeError('Consumer closed')
+        return self.broker.fetch(self.group_id, self.assignment, num_messages, timeout)
+
+    def close(self):
+        """Leave the group, calling on_revoke for the assigned partitions."""
+        if self._closed:
+            return
+        if self._on_revoke is not None and self.assignment:
+            self._on_revoke(self, self.assignment)
+        self.assignment = []
+        self._closed = True
+
+
+class InMemoryProducer:
+    """
+    Producer of an InMemoryBroker with the produce/poll/flush API of confluent_kafka.Producer.
+
+    Messages are stored immediately; delivery callbacks are queued and served
+    by poll() or flush(), as with the Kafka client.
+    """
+
+    def __init__(self, broker: InMemoryBroker):
+        self.broker = broker
+        self._callbacks: List[Tuple[Callable, InMemoryMessage]] = []
+        self._lock = threading.Lock()
+
+    def produce(self, topic: str, value=None, key=None, headers=None, partition: Optional[int] = None,
+                callback: Optional[Callable] = None, on_delivery: Optional[Callable] = None):
+        message = self.broker.append(topic, key=key, value=value, headers=headers, partition=partition)
+        callback = callback or on_delivery
+        if callback is not None:
+            with self._lock:
+                self._callbacks.append((callback, message))
+
+    def poll(self, timeout: Optional[float] = None) -> int:
+        """Serve queued delivery callbacks, returning how many ran."""
+        with self._lock:
+            callbacks, self._callbacks = self._callbacks, []
+        for callback, message in callbacks:
+            callback(None, message)
+        return len(callbacks)
+
+    def flush(self, timeout: Optional[float] = None) -> int:
+        """Serve all queued delivery callbacks; nothing remains undelivered."""
+        self.poll(0)
+        return 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._callbacks)
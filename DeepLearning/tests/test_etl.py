@@ -6,6 +6,8 @@ import pytest
 import numpy as np
 import json
 from datetime import datetime
+import threading
+import time
 import sys
 import os
 
@@ -15,10 +17,22 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 from src.etl_service.transform import (
     transform_timeseries_event,
     transform_window,
+    transform_windows,
     calculate_sma_incremental,
     calculate_ema,
     detect_outliers_zscore
 )
+from src.etl_service.window_store import RingBufferWindowStore
+from src.etl_service.checkpoint import RedisWindowCheckpointer
+from src.etl_service.kafka_etl_worker import ETLWorker
+from src.utils.config import Config
+from src.utils.feature_codec import (
+    FeatureDecodeError,
+    decode_features,
+    encode_features
+)
+from src.utils.sample_data import load_sample_csv, repeat_events
+from src.utils.transport import InMemoryBroker
 
 
 class TestETLTransformations:
@@ -105,5 +119,368 @@ class TestETLTransformations:
         assert sum(result) == 0  # No outliers
 
 
+class TestRingBufferWindowStore:
+    """Test suite for the ring-buffer window store."""
+    
+    def test_window_ready_after_window_size_values(self):
+        """Test that a window becomes ready once it is full."""
+        store = RingBufferWindowStore(window_size=4)
+        
+        ready = [store.append('sensor-001', v) for v in [1.0, 2.0, 3.0, 4.0, 5.0]]
+        
+        assert ready == [False, False, False, True, True]
+        np.testing.assert_array_equal(store.window('sensor-001'), [2.0, 3.0, 4.0, 5.0])
+    
+    def test_running_stats_match_transform_window(self):
+        """Test that sliding Welford statistics match a full recomputation."""
+        rng = np.random.default_rng(42)
+        values = rng.normal(50.0, 5.0, size=500)
+        store = RingBufferWindowStore(window_size=24)
+        
+        for i, value in enumerate(values):
+            if store.append('sensor-001', value):
+                expected = transform_window(values[i - 23:i + 1].tolist())
+                np.testing.assert_allclose(store.normalized_window('sensor-001'), expected, atol=1e-4)
+    
+    def test_constant_window(self):
+        """Test normalization of a constant window."""
+        store = RingBufferWindowStore(window_size=10)
+        
+        for _ in range(15):
+            store.append('sensor-001', 5.0)
+        
+        assert np.all(store.normalized_window('sensor-001') == 0.0)
+    
+    def test_capacity_grows_and_devices_are_independent(self):
+        """Test that many devices keep separate windows beyond the initial capacity."""
+        store = RingBufferWindowStore(window_size=3, initial_capacity=2)
+        
+        for step in range(3):
+            for device in range(5):
+                store.append(f'sensor-{device}', device * 10.0 + step)
+        
+        assert len(store) == 5
+        assert store.capacity >= 5
+        np.testing.assert_array_equal(store.window('sensor-4'), [40.0, 41.0, 42.0])
+        assert store.stats('sensor-2')[0] == pytest.approx(21.0)
+    
+    def test_remove_releases_slot(self):
+        """Test that removing a device frees its slot for reuse."""
+        store = RingBufferWindowStore(window_size=3, initial_capacity=1)
+        store.append('sensor-001', 1.0)
+        slot = store.slot('sensor-001')
+        
+        store.remove('sensor-001')
+        store.append('sensor-002', 2.0)
+        
+        assert 'sensor-001' not in store
+        assert store.slot('sensor-002') == slot
+        np.testing.assert_array_equal(store.window('sensor-002'), [2.0])
+    
+    def test_extend_returns_windows_ending_on_new_values(self):
+        """Test that extend yields one window per new value once the window is full."""
+        store = RingBufferWindowStore(window_size=3)
+        
+        assert store.extend('sensor-001', [1.0, 2.0]).shape == (0, 3)
+        windows = store.extend('sensor-001', [3.0, 4.0, 5.0])
+        
+        np.testing.assert_array_equal(windows, [[1.0, 2.0, 3.0], [2.0, 3.0, 4.0], [3.0, 4.0, 5.0]])
+        np.testing.assert_array_equal(store.extend('sensor-001', [6.0]), [[4.0, 5.0, 6.0]])
+        np.testing.assert_array_equal(store.window('sensor-001'), [4.0, 5.0, 6.0])
+    
+    def test_restore_replaces_window_and_stats(self):
+        """Test that a restored window behaves like one built from appends."""
+        store = RingBufferWindowStore(window_size=3)
+        store.extend('sensor-001', [9.0, 9.0])
+        
+        store.restore('sensor-001', [1.0, 2.0, 3.0, 4.0])
+        
+        assert store.is_ready('sensor-001')
+        np.testing.assert_array_equal(store.window('sensor-001'), [2.0, 3.0, 4.0])
+        assert store.stats('sensor-001')[0] == pytest.approx(3.0)
+
+
+class TestBatchTransformations:
+    """Test suite for vectorized window transformations."""
+    
+    def test_transform_windows_matches_transform_window(self):
+        """Test that batch normalization equals per-window normalization."""
+        windows = np.array([
+            [1.0, 2.0, 3.0, 4.0, 5.0],
+            [5.0, 5.0, 5.0, 5.0, 5.0],
+            [10.0, -2.0, 3.5, 0.0, 7.0]
+        ])
+        
+        result = transform_windows(windows)
+        
+        assert result.shape == windows.shape
+        for row, window in zip(result, windows):
+            np.testing.assert_allclose(row, transform_window(list(window)))
+
+
+
+@pytest.fixture
+def redis_client():
+    """Redis client for a local server, skipping when none is reachable."""
+    redis = pytest.importorskip('redis')
+    client = redis.Redis(host=os.getenv('REDIS_HOST', 'localhost'), port=int(os.getenv('REDIS_PORT', '6379')))
+    try:
+        client.ping()
+    except redis.exceptions.ConnectionError:
+        pytest.skip('Redis server not available')
+    yield client
+    for key in client.scan_iter('test:etl:windows:*'):
+        client.delete(key)
+
+
+class InMemoryRedis:
+    """Hashes with pipelines that apply on execute, optionally failing chosen executes."""
+    
+    def __init__(self, fail_executes=()):
+        self.hashes = {}
+        self.pipelines = []
+        self.executes = 0
+        self.fail_executes = set(fail_executes)
+    
+    def pipeline(self, transaction=True):
+        pipe = InMemoryPipeline(self, transaction)
+        self.pipelines.append(pipe)
+        return pipe
+
+
+class InMemoryPipeline:
+    def __init__(self, client, transaction):
+        self.client = client
+        self.transaction = transaction
+        self.commands = []
+    
+    def hset(self, key, mapping):
+        self.commands.append(('hset', key, dict(mapping)))
+    
+    def hgetall(self, key):
+        self.commands.append(('hgetall', key, None))
+    
+    def execute(self):
+        self.client.executes += 1
+        if self.client.executes - 1 in self.client.fail_executes:
+            raise ConnectionError('Redis connection lost')
+        results = []
+        for command, key, mapping in self.commands:
+            if command == 'hset':
+                self.client.hashes.setdefault(key, {}).update(
+                    {field.encode(): value.encode() if isinstance(value, str) else value
+                     for field, value in mapping.items()})
+            results.append(dict(self.client.hashes.get(key, {})))
+        return results
+
+
+class TestRedisWindowCheckpointer:
+    """Test suite for checkpointing window state to Redis."""
+    
+    def test_partition_windows_and_offset_are_written_atomically(self):
+        """Test that a failed write saves none of a partition's windows and is retried."""
+        client = InMemoryRedis(fail_executes={1})
+        store = RingBufferWindowStore(window_size=2)
+        checkpointer = RedisWindowCheckpointer(store, client, 'raw', batch_size=2)
+        for partition in (0, 1):
+            for device in range(5):
+                device_id = f'sensor-{partition}-{device}'
+                store.extend(device_id, [1.0, 2.0])
+                checkpointer.track(device_id, partition, 10 * partition + device)
+        
+        with pytest.raises(ConnectionError):
+            checkpointer.checkpoint()
+        
+        # Partition 0 is saved whole; partition 1 is untouched and still pending
+        assert all(pipe.transaction for pipe in client.pipelines)
+        assert len(client.hashes[checkpointer.partition_key(0)]) == 6
+        assert checkpointer.partition_key(1) not in client.hashes
+        assert list(checkpointer.dirty) == [1]
+        
+        assert checkpointer.checkpoint() == 5
+        saved = client.hashes[checkpointer.partition_key(1)]
+        assert len(saved) == 6 and saved[b'__offset__'] == b'14'
+    
+    @pytest.mark.parametrize('batched', [True, False])
+    def test_replayed_malformed_message_is_not_dead_lettered_again(self, batched):
+        """Test that restored offsets are skipped before parsing, valid or not."""
+        client = InMemoryRedis()
+        broker = InMemoryBroker(num_partitions=1)
+        producer = broker.producer()
+        producer.produce(Config.KAFKA_RAW_TOPIC, key=b'sensor-001', value=b'not json')
+        for hour in range(3):
+            event = {'device_id': 'sensor-001', 'value': float(hour), 'timestamp': f'2026-07-18T0{hour}:00:00'}
+            producer.produce(Config.KAFKA_RAW_TOPIC, key=b'sensor-001', value=json.dumps(event).encode())
+        store = RingBufferWindowStore(window_size=2)
+        checkpointer = RedisWindowCheckpointer(store, client, Config.KAFKA_RAW_TOPIC)
+        client.hashes[checkpointer.partition_key(0)] = {
+            b'sensor-001': np.array([0.0], dtype='<f4').tobytes(),
+            b'__offset__': b'1'
+        }
+        
+        worker = ETLWorker(broker, store, checkpointer)
+        thread = threading.Thread(target=worker.run, kwargs={'batched': batched})
+        thread.start()
+        deadline = time.monotonic() + 10
+        while len(broker.messages(Config.KAFKA_FEATURES_TOPIC)) < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        worker.stop()
+        thread.join()
+        
+        assert broker.messages(Config.KAFKA_DLQ_TOPIC) == []
+        features = [decode_features(msg.value(), msg.headers()) for msg in broker.messages(Config.KAFKA_FEATURES_TOPIC)]
+        # The restored window already holds offset 1, so offsets 2 and 3 complete windows
+        assert [f['latest_timestamp'] for f in features] == ['2026-07-18T01:00:00', '2026-07-18T02:00:00']
+        assert client.hashes[checkpointer.partition_key(0)][b'__offset__'] == b'3'
+    
+    def test_checkpoint_and_restore_on_assignment(self, redis_client):
+        """Test that another worker resumes from the checkpointed windows."""
+        store = RingBufferWindowStore(window_size=3)
+        checkpointer = RedisWindowCheckpointer(store, redis_client, 'raw', key_prefix='test:etl:windows',
+                                               batch_size=2)
+        for offset, value in enumerate([1.0, 2.0, 3.0]):
+            for device in range(3):
+                store.append(f'sensor-{device}', value + device)
+                checkpointer.track(f'sensor-{device}', 0, offset * 3 + device)
+        
+        checkpointer.release([0])
+        
+        assert len(store) == 0
+        new_store = RingBufferWindowStore(window_size=3)
+        new_checkpointer = RedisWindowCheckpointer(new_store, redis_client, 'raw', key_prefix='test:etl:windows')
+        assert new_checkpointer.restore([0]) == 3
+        np.testing.assert_array_equal(new_store.window('sensor-2'), [3.0, 4.0, 5.0])
+        assert new_checkpointer.already_applied(0, 8)
+        assert not new_checkpointer.already_applied(0, 9)
+
+
+class TestFeatureCodec:
+    """Test suite for the feature message wire formats."""
+    
+    @pytest.mark.parametrize('feature_format', ['binary', 'json'])
+    def test_round_trip(self, feature_format):
+        """Test that both formats decode to the encoded window."""
+        window = np.linspace(-1.5, 1.5, 24, dtype=np.float32)
+        
+        value, headers = encode_features('sensor-é1', window, '2024-01-01T00:00:00', feature_format)
+        payload = decode_features(value, headers)
+        
+        assert payload['device_id'] == 'sensor-é1'
+        assert payload['latest_timestamp'] == '2024-01-01T00:00:00'
+        assert payload['window_size'] == 24
+        np.testing.assert_array_equal(payload['feature_vector'], window)
+    
+    def test_binary_is_compact_and_zero_copy(self):
+        """Test that binary values are raw float32 bytes viewed without copying."""
+        window = np.arange(24, dtype=np.float32)
+        
+        value, headers = encode_features('sensor-001', window, '2024-01-01T00:00:00', 'binary')
+        json_value, _ = encode_features('sensor-001', window, '2024-01-01T00:00:00', 'json')
+        feature_vector = decode_features(value, headers)['feature_vector']
+        
+        assert len(value) == 40 + 24 * 4
+        assert len(value) < len(json_value)
+        assert feature_vector.dtype == np.float32
+        assert not feature_vector.flags.owndata
+    
+    def test_untagged_messages_are_json(self):
+        """Test that messages without a content-type header are decoded as JSON."""
+        value = json.dumps({
+            "device_id": "sensor-001",
+            "feature_vector": [0.5, -0.5],
+            "latest_timestamp": "2024-01-01T00:00:00",
+            "window_size": 2
+        }).encode('utf-8')
+        
+        payload = decode_features(value, None)
+        
+        np.testing.assert_array_equal(payload['feature_vector'], [0.5, -0.5])
+    
+    def test_rejects_unknown_version_and_truncation(self):
+        """Test that unsupported or truncated binary messages raise FeatureDecodeError."""
+        value, headers = encode_features('sensor-001', np.zeros(4), 'ts', 'binary')
+        
+        with pytest.raises(FeatureDecodeError):
+            decode_features(value[:-1], headers)
+        with pytest.raises(FeatureDecodeError):
+            decode_features(value, [('content-type', b'application/x-feature-vector;v=2')])
+
+    @pytest.mark.parametrize('value', [
+        b'{"device_id": "s", "feature_vector": ["x"], "latest_timestamp": "ts", "window_size": 1}',
+        b'{"device_id": "s", "feature_vector": [[1.0], [2.0, 3.0]], "latest_timestamp": "ts", "window_size": 2}',
+        b'[1.0, 2.0]',
+    ])
+    def test_rejects_malformed_json_payloads(self, value):
+        """Test that non-numeric, ragged or non-object JSON payloads raise FeatureDecodeError."""
+        with pytest.raises(FeatureDecodeError):
+            decode_features(value, None)
+
+
+class TestInMemoryTransport:
+    """Test suite for running the ETL worker on the in-memory broker."""
+    
+    def test_broker_partitions_by_key_and_tracks_group_offsets(self):
+        """Test per-key ordering and independent consumer group offsets."""
+        broker = InMemoryBroker(num_partitions=3)
+        producer = broker.producer()
+        delivered = []
+        for i in range(6):
+            producer.produce('raw', key=f'sensor-{i % 2}', value=str(i).encode(),
+                             callback=lambda err, msg: delivered.append(msg.offset()))
+        
+        assert delivered == []
+        assert producer.poll(0) == 6
+        
+        first = broker.consumer('group-a')
+        first.subscribe(['raw'])
+        messages = first.consume(num_messages=10, timeout=0)
+        
+        by_key = {}
+        for msg in messages:
+            by_key.setdefault(msg.key(), []).append(int(msg.value()))
+        assert by_key == {b'sensor-0': [0, 2, 4], b'sensor-1': [1, 3, 5]}
+        assert first.poll(timeout=0) is None
+        
+        second = broker.consumer('group-b')
+        second.subscribe(['raw'])
+        assert len(second.consume(num_messages=10, timeout=0)) == 6
+    
+    def test_etl_worker_end_to_end(self):
+        """Test that the batched worker publishes one feature per ready window and DLQs bad input."""
+        broker = InMemoryBroker()
+        worker = ETLWorker(broker, RingBufferWindowStore(window_size=3))
+        producer = broker.producer()
+        for hour in range(5):
+            event = {'device_id': 'sensor-001', 'value': float(hour), 'timestamp': f'2026-07-18T0{hour}:00:00'}
+            producer.produce(Config.KAFKA_RAW_TOPIC, key=b'sensor-001', value=json.dumps(event).encode())
+        producer.produce(Config.KAFKA_RAW_TOPIC, key=b'sensor-001', value=b'not json')
+        
+        thread = threading.Thread(target=worker.run, kwargs={'batched': True})
+        thread.start()
+        deadline = time.monotonic() + 10
+        while len(broker.messages(Config.KAFKA_FEATURES_TOPIC)) < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        worker.stop()
+        thread.join()
+        
+        features = [decode_features(msg.value(), msg.headers()) for msg in broker.messages(Config.KAFKA_FEATURES_TOPIC)]
+        assert [f['latest_timestamp'] for f in features] == [f'2026-07-18T0{h}:00:00' for h in (2, 3, 4)]
+        np.testing.assert_allclose(features[-1]['feature_vector'], transform_window([2.0, 3.0, 4.0]), atol=1e-6)
+        assert len(broker.messages(Config.KAFKA_DLQ_TOPIC)) == 1
+        assert worker.processed_count == 3
+        assert worker.error_count == 1
+    
+    def test_sample_csv_replay(self):
+        """Test that repeated CSV recordings keep timestamps unique per device."""
+        events = load_sample_csv(os.path.join(os.path.dirname(__file__), '..', 'data', 'sample_timeseries.csv'))
+        repeated = repeat_events(events, 3)
+        
+        assert len(events) == 24
+        assert events[0] == {'device_id': 'sensor-001', 'value': 45.2, 'timestamp': '2026-07-18T00:00:00',
+                             'metadata': {'sensor_type': 'temperature'}}
+        assert len({e['timestamp'] for e in repeated}) == 72
+        assert repeated[24]['timestamp'] == '2026-07-19T00:00:00'
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
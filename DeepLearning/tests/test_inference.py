@@ -3,8 +3,10 @@ Unit tests for model loading and inference.
 """
 
 import pytest
+import json
 import numpy as np
 import tempfile
+import time
 import os
 import sys
 
@@ -12,7 +14,16 @@ import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
 from src.models.lstm_model import build_lstm_model
-from src.inference_service.model_loader import ModelLoader
+from src.benchmark.pipeline_benchmark import load_events, run_benchmark
+from src.models.quantize import quantize_model
+from src.models.sweep import expand_grid, mark_pareto_front, run_sweep, write_leaderboard
+from src.inference_service.model_loader import ModelLoader, list_model_versions, load_serving_model, version_key
+from src.inference_service.micro_batcher import MicroBatcher, predict_batch
+from src.inference_service.runtime import KerasBackend, check_parity
+from src.etl_service.window_store import RingBufferWindowStore
+from src.fused_service import kafka_fused_worker
+from src.utils.config import Config
+from src.utils.transport import InMemoryBroker
 
 
 class TestModelInference:
@@ -65,5 +76,351 @@ class TestModelInference:
         assert isinstance(prediction[0][0], (float, np.floating))
 
 
+class TestMicroBatching:
+    """Test suite for deadline-bounded micro-batch inference."""
+    
+    def test_batcher_flushes_when_full(self):
+        """Test that a batch is due once it reaches the maximum size."""
+        batcher = MicroBatcher(max_batch_size=3, max_latency_ms=1000)
+        
+        assert not batcher.add('a')
+        assert not batcher.add('b')
+        assert batcher.add('c')
+        assert batcher.drain() == ['a', 'b', 'c']
+        assert len(batcher) == 0
+    
+    def test_batcher_flushes_at_deadline(self):
+        """Test that a partial batch is due once the first item waited max_latency_ms."""
+        now = [100.0]
+        batcher = MicroBatcher(max_batch_size=32, max_latency_ms=50, clock=lambda: now[0])
+        
+        assert batcher.time_remaining(default=1.0) == 1.0
+        batcher.add('a')
+        now[0] += 0.02
+        batcher.add('b')
+        
+        assert not batcher.is_due()
+        assert batcher.time_remaining(default=1.0) == pytest.approx(0.03)
+        now[0] += 0.03
+        assert batcher.is_due()
+    
+    def test_predict_batch_matches_single_predictions(self):
+        """Test that batched predictions fan out in input order."""
+        model = build_lstm_model(8)
+        rng = np.random.default_rng(0)
+        windows = [rng.normal(size=8).astype(np.float32) for _ in range(5)]
+        windows.append(rng.normal(size=6).astype(np.float32))
+        
+        predictions = predict_batch(KerasBackend(model), windows)
+        
+        assert predictions.shape == (6,)
+        for window, predicted in zip(windows, predictions):
+            expected = model.predict(window.reshape(1, -1, 1), verbose=0)[0][0]
+            assert predicted == pytest.approx(expected, abs=1e-5)
+    
+    def test_fused_worker_bounds_forward_pass_size(self, tmp_path, monkeypatch):
+        """Test that a large consume batch is split into forward passes of at most the batch size."""
+        model_path = str(tmp_path / 'model.keras')
+        build_lstm_model(8, lstm_units=(8,)).save(model_path)
+        loader = ModelLoader(model_path, model_version='test')
+        loader.load_backend('tf_function')
+        batch_sizes = []
+        
+        def recording_predict_batch(backend, feature_vectors):
+            batch_sizes.append(len(feature_vectors))
+            return predict_batch(backend, feature_vectors)
+        
+        monkeypatch.setattr(kafka_fused_worker, 'predict_batch', recording_predict_batch)
+        broker = InMemoryBroker(num_partitions=1)
+        producer = broker.producer()
+        for hour in range(12):
+            for device in ('sensor-001', 'sensor-002'):
+                event = {'device_id': device, 'value': float(hour), 'timestamp': f'2026-07-18T{hour:02d}:00:00'}
+                producer.produce(Config.KAFKA_RAW_TOPIC, key=device.encode(), value=json.dumps(event).encode())
+        worker = kafka_fused_worker.FusedWorker(broker, loader, RingBufferWindowStore(8), features_tap=False)
+        batcher = MicroBatcher(max_batch_size=3, max_latency_ms=60000)
+        
+        messages = worker.consumer.consume(num_messages=100, timeout=0)
+        worker.transform_messages(messages, batcher)
+        
+        # 2 devices x 5 ready windows: three full batches flushed, one window still queued
+        assert batch_sizes == [3, 3, 3]
+        assert len(batcher) == 1
+        assert worker.prediction_count == 9
+        assert len(broker.messages(Config.KAFKA_PREDICTIONS_TOPIC)) == 9
+    
+    def test_fused_worker_skips_malformed_messages(self, tmp_path):
+        """Test that a malformed message goes to the DLQ without shifting other windows' metadata."""
+        model_path = str(tmp_path / 'model.keras')
+        build_lstm_model(4, lstm_units=(8,)).save(model_path)
+        loader = ModelLoader(model_path, model_version='test')
+        loader.load_backend('tf_function')
+        broker = InMemoryBroker(num_partitions=1)
+        producer = broker.producer()
+        for hour in range(5):
+            for device in ('zone-A', 'zone-B'):
+                event = {'device_id': device, 'value': float(hour), 'timestamp': f'2026-07-18T{hour:02d}:00:00'}
+                if device == 'zone-A' and hour == 2:
+                    del event['timestamp']
+                producer.produce(Config.KAFKA_RAW_TOPIC, key=device.encode(), value=json.dumps(event).encode())
+        producer.produce(Config.KAFKA_RAW_TOPIC, key=b'unknown', value=b'[1, 2, 3]')
+        worker = kafka_fused_worker.FusedWorker(broker, loader, RingBufferWindowStore(4), features_tap=False)
+        batcher = MicroBatcher(max_batch_size=32, max_latency_ms=60000)
+        
+        messages = worker.consumer.consume(num_messages=100, timeout=0)
+        errors = worker.transform_messages(messages, batcher)
+        
+        assert errors == 2
+        assert len(broker.messages(Config.KAFKA_DLQ_TOPIC)) == 2
+        # zone-A keeps 4 valid readings (one window), zone-B all 5 (two windows)
+        queued = [(device_id, timestamp) for device_id, timestamp, _ in batcher.drain()]
+        assert queued == [
+            ('zone-A', '2026-07-18T04:00:00'),
+            ('zone-B', '2026-07-18T03:00:00'),
+            ('zone-B', '2026-07-18T04:00:00'),
+        ]
+
+
+class TestInferenceBackends:
+    """Test suite for the low-overhead execution backends."""
+    
+    @pytest.fixture
+    def model_loader(self, tmp_path):
+        model_path = str(tmp_path / 'test_model.keras')
+        build_lstm_model(12).save(model_path)
+        return ModelLoader(model_path)
+    
+    @pytest.mark.parametrize('backend_name', ['tf_function', 'tflite'])
+    def test_backend_parity(self, model_loader, backend_name):
+        """Test that each backend reproduces the Keras output."""
+        backend = model_loader.load_backend(backend_name)
+        
+        max_diff = check_parity(backend, model_loader.get_model(), atol=1e-4)
+        
+        assert backend.name == backend_name
+        assert max_diff < 1e-4
+    
+    def test_tflite_artifact_saved_next_to_model(self, model_loader):
+        """Test that the converted TFLite model is cached beside the Keras file."""
+        model_loader.load_backend('tflite')
+        
+        assert os.path.exists(model_loader.artifact_path('.tflite'))
+    
+    def test_onnx_backend_parity(self, model_loader):
+        """Test ONNX Runtime parity when the optional packages are installed."""
+        pytest.importorskip('onnxruntime')
+        pytest.importorskip('tf2onnx')
+        
+        backend = model_loader.load_backend('onnx')
+        
+        assert check_parity(backend, model_loader.get_model(), atol=1e-4) < 1e-4
+    
+    def test_unknown_backend(self, model_loader):
+        """Test that an unknown backend name is rejected."""
+        with pytest.raises(ValueError):
+            model_loader.load_backend('torchscript')
+    
+    def test_quantized_models_saved_and_served(self, model_loader):
+        """Test that quantization writes both artifacts and the loader serves them."""
+        model = model_loader.get_model()
+        rng = np.random.default_rng(0)
+        X = rng.standard_normal((120, 12, 1)).astype(np.float32)
+        y = model.predict(X, verbose=0) + 0.1
+        
+        with pytest.raises(FileNotFoundError):
+            model_loader.load_backend('tflite', quantization='int8')
+        
+        reports = quantize_model(model, model_loader.model_path, X[:80], X[80:], y[80:],
+                                 num_calibration_samples=50, latency_runs=5)
+        
+        assert [r['variant'] for r in reports] == ['keras', 'tflite_float32', 'tflite_dynamic', 'tflite_int8']
+        assert all(os.path.exists(r['path']) for r in reports)
+        assert reports[1]['speedup'] == 1.0
+        
+        backend = model_loader.load_backend('tflite', quantization='int8')
+        assert backend.input_dtype == np.int8
+        predictions = backend.predict(X[80:])
+        assert predictions.dtype == np.float32
+        np.testing.assert_allclose(predictions, model.predict(X[80:], verbose=0), atol=0.05)
+        assert abs(reports[-1]['mae_drift']) < 0.05
+    
+    def test_serving_quantized_model_uses_quantized_tolerance(self, model_loader, monkeypatch):
+        """Test that an int8 model passes the serving parity check that float backends must meet."""
+        model = model_loader.get_model()
+        rng = np.random.default_rng(0)
+        X = rng.standard_normal((120, 12, 1)).astype(np.float32)
+        quantize_model(model, model_loader.model_path, X[:80], X[80:], model.predict(X[80:], verbose=0),
+                       modes=('int8',), num_calibration_samples=50, latency_runs=1)
+        for name, value in [('MODEL_DIR', None), ('MODEL_PATH', model_loader.model_path),
+                            ('INFERENCE_BACKEND', 'tflite'), ('TFLITE_QUANTIZATION', 'int8'),
+                            ('PARITY_TOLERANCE', 1e-4), ('QUANTIZED_PARITY_TOLERANCE', 0.05)]:
+            monkeypatch.setattr(Config, name, value)
+        
+        # The float tolerance alone would reject the model
+        with pytest.raises(ValueError):
+            check_parity(model_loader.load_backend('tflite', quantization='int8'), model, atol=1e-4)
+        
+        loader = load_serving_model()
+        
+        assert loader.backend.input_dtype == np.int8
+        
+        monkeypatch.setattr(Config, 'QUANTIZED_PARITY_TOLERANCE', 1e-6)
+        with pytest.raises(ValueError):
+            load_serving_model()
+
+
+
+class TestModelHotReload:
+    """Test suite for watching a versioned model directory."""
+    
+    def test_version_ordering(self, tmp_path):
+        """Test that versions sort numerically and fresh files are skipped."""
+        for version in ['1.9', '1.10', '2.0']:
+            (tmp_path / f'{version}.keras').write_bytes(b'')
+        (tmp_path / 'notes.txt').write_bytes(b'')
+        old = time.time() - 60
+        os.utime(tmp_path / '1.9.keras', (old, old))
+        os.utime(tmp_path / '1.10.keras', (old, old))
+        
+        assert version_key('1.9') < version_key('1.10') < version_key('2.0')
+        assert [v for v, _ in list_model_versions(str(tmp_path))] == ['1.9', '1.10', '2.0']
+        assert [v for v, _ in list_model_versions(str(tmp_path), settle_s=30)] == ['1.9', '1.10']
+    
+    def test_new_version_swapped_between_batches(self, tmp_path):
+        """Test that a newer version is prepared in the background and swapped on request."""
+        build_lstm_model(8).save(str(tmp_path / '1.keras'))
+        loader = ModelLoader.from_directory(str(tmp_path))
+        loader.load_backend('tf_function')
+        
+        loader.start_watching(str(tmp_path), backend='tf_function', poll_interval_s=0.05, settle_s=0)
+        try:
+            assert not loader.swap_if_ready()
+            build_lstm_model(8).save(str(tmp_path / '2.keras'))
+            
+            deadline = time.monotonic() + 60
+            while not loader.swap_if_ready():
+                assert time.monotonic() < deadline, 'new model version was not prepared'
+                time.sleep(0.05)
+        finally:
+            loader.stop_watching()
+        
+        assert loader.model_version == '2'
+        assert loader.backend.name == 'tf_function'
+        assert loader.backend.predict(np.zeros((3, 8, 1), dtype=np.float32)).shape == (3, 1)
+    
+    def test_failed_version_retried_when_artifact_changes(self, tmp_path, monkeypatch):
+        """Test that a version that failed to load is retried once its int8 artifact appears."""
+        (tmp_path / '2.keras').write_bytes(b'')
+        loader = ModelLoader(str(tmp_path / '1.keras'), model_version='1')
+        attempts = []
+        
+        def prepare(version, path, *args):
+            attempts.append(version)
+            if not (tmp_path / '2.int8.tflite').exists():
+                raise FileNotFoundError('2.int8.tflite')
+            loader._pending = (version, path, None, None)
+        
+        monkeypatch.setattr(loader, '_prepare', prepare)
+        loader.start_watching(str(tmp_path), backend='tflite', poll_interval_s=0.02, settle_s=0,
+                              quantization='int8')
+        try:
+            time.sleep(0.3)
+            # Unchanged files are not retried on every poll
+            assert attempts == ['2']
+            (tmp_path / '2.int8.tflite').write_bytes(b'')
+            
+            deadline = time.monotonic() + 10
+            while not loader.swap_if_ready():
+                assert time.monotonic() < deadline, 'failed version was not retried'
+                time.sleep(0.02)
+        finally:
+            loader.stop_watching()
+        
+        assert attempts == ['2', '2']
+        assert loader.model_version == '2'
+
+
+
+class TestArchitectureSweep:
+    """Test suite for the parallel architecture sweep."""
+    
+    def test_expand_grid(self):
+        """Test that every combination becomes a named candidate."""
+        candidates = expand_grid({
+            'lstm': {'lstm_units': [[32], [64, 32]], 'dropout_rate': [0.1, 0.2]},
+            'cnn_lstm': {'conv_filters': [16]}
+        })
+        
+        assert len(candidates) == 5
+        assert candidates[0]['params'] == {'dropout_rate': 0.1, 'lstm_units': (32,)}
+        assert len({c['name'] for c in candidates}) == 5
+        with pytest.raises(ValueError):
+            expand_grid({'transformer': {}})
+    
+    def test_mark_pareto_front(self):
+        """Test that dominated results are not on the accuracy/latency front."""
+        results = mark_pareto_front([
+            {'name': 'accurate', 'val_mae': 0.1, 'latency_p50_ms': 2.0, 'error': None},
+            {'name': 'fast', 'val_mae': 0.3, 'latency_p50_ms': 0.5, 'error': None},
+            {'name': 'dominated', 'val_mae': 0.4, 'latency_p50_ms': 1.0, 'error': None}
+        ])
+        
+        assert [r['pareto'] for r in results] == [True, True, False]
+    
+    def test_run_sweep(self, tmp_path):
+        """Test a small sweep across all builders in a worker process."""
+        rng = np.random.default_rng(0)
+        X = rng.normal(size=(80, 8, 1)).astype(np.float32)
+        y = X[:, -1, :] * 0.5
+        candidates = expand_grid({
+            'lstm': {'lstm_units': [[8]]},
+            'bidirectional': {'lstm_units': [8]},
+            'cnn_lstm': {'conv_filters': [4], 'lstm_units': [8]}
+        })
+        
+        results = run_sweep(candidates, X, y, workers=1, epochs=2, batch_size=16,
+                            latency_runs=5, output_dir=str(tmp_path / 'models'))
+        write_leaderboard(results, str(tmp_path / 'leaderboard.csv'))
+        
+        assert [r['error'] for r in results] == [None, None, None]
+        assert results[0]['val_mae'] <= results[-1]['val_mae']
+        assert any(r['pareto'] for r in results)
+        assert len(os.listdir(tmp_path / 'models')) == 3
+        assert len((tmp_path / 'leaderboard.csv').read_text().splitlines()) == 4
+    
+    @pytest.mark.parametrize('num_samples, validation_split', [(4, 0.2), (80, 0.0), (80, 1.0)])
+    def test_run_sweep_rejects_empty_split(self, num_samples, validation_split):
+        """Test that a split leaving no validation or training samples fails before training."""
+        X = np.zeros((num_samples, 8, 1), dtype=np.float32)
+        y = np.zeros((num_samples, 1), dtype=np.float32)
+        candidates = expand_grid({'lstm': {'lstm_units': [[8]]}})
+        
+        with pytest.raises(ValueError, match='validation_split'):
+            run_sweep(candidates, X, y, workers=1, validation_split=validation_split)
+
+
+class TestPipelineBenchmark:
+    """Test suite for the in-process pipeline benchmark."""
+    
+    @pytest.mark.parametrize('pipeline', ['split', 'fused'])
+    def test_run_benchmark(self, tmp_path, pipeline):
+        """Test that every ready window yields a prediction and each stage is reported."""
+        model_path = str(tmp_path / 'model.keras')
+        build_lstm_model(24, lstm_units=(8,)).save(model_path)
+        loader = ModelLoader(model_path, model_version='test')
+        loader.load_backend('tf_function')
+        events = load_events('synthetic', devices=2, samples_per_device=40)
+        
+        reports = run_benchmark(events, loader, rate=2000, pipeline=pipeline, timeout_s=60)
+        
+        stages = ['replay', 'etl', 'inference'] if pipeline == 'split' else ['replay', 'fused']
+        assert [r['stage'] for r in reports] == stages + ['end_to_end']
+        end_to_end = reports[-1]
+        assert end_to_end['messages_in'] == 80
+        assert end_to_end['messages_out'] == 2 * (40 - 24 + 1)
+        assert 0 < end_to_end['latency_p50_ms'] <= end_to_end['latency_p99_ms']
+        assert all(r['throughput_msgs_s'] > 0 and r['cpu_s'] >= 0 for r in reports)
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
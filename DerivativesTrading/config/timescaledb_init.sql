@@ -47,8 +47,14 @@ CREATE TABLE IF NOT EXISTS trading_signals (
 -- Convert trading signals to hypertable
 SELECT create_hypertable('trading_signals', 'signal_timestamp', if_not_exists => TRUE);
 
--- Create materialized view for hourly aggregations
-CREATE MATERIALIZED VIEW IF NOT EXISTS hourly_grid_stats AS
+-- Index forecasts by target time for joining them with the actuals that arrive later
+CREATE INDEX IF NOT EXISTS idx_demand_forecasts_region_target
+ON demand_forecasts (region_id, target_timestamp);
+
+-- Create continuous aggregate for hourly aggregations
+-- Only buckets invalidated by new or changed rows are re-materialized on refresh
+CREATE MATERIALIZED VIEW IF NOT EXISTS hourly_grid_stats
+WITH (timescaledb.continuous) AS
 SELECT 
     time_bucket('1 hour', timestamp) AS hour,
     region_id,
@@ -59,18 +65,25 @@ SELECT
     AVG(wind_speed_ms) AS avg_wind_speed,
     AVG(solar_irradiance) AS avg_solar_irradiance
 FROM grid_consumption
-GROUP BY hour, region_id;
+GROUP BY hour, region_id
+WITH NO DATA;
 
--- Create index on materialized view
+-- Create index on continuous aggregate
 CREATE INDEX IF NOT EXISTS idx_hourly_stats_hour_region 
 ON hourly_grid_stats (hour DESC, region_id);
 
--- Create function to refresh materialized view
-CREATE OR REPLACE FUNCTION refresh_hourly_stats()
-RETURNS void AS $$
-BEGIN
-    REFRESH MATERIALIZED VIEW CONCURRENTLY hourly_grid_stats;
-END;
-$$ LANGUAGE plpgsql;
+-- Refresh recent hours every 15 minutes; the forecast backfill job refreshes older late-arriving data
+SELECT add_continuous_aggregate_policy('hourly_grid_stats',
+    start_offset => INTERVAL '3 hours',
+    end_offset => INTERVAL '1 hour',
+    schedule_interval => INTERVAL '15 minutes',
+    if_not_exists => TRUE);
+
+-- Progress of incremental jobs: each run only processes data after its watermark
+CREATE TABLE IF NOT EXISTS job_watermarks (
+    job_name TEXT PRIMARY KEY,
+    watermark TIMESTAMPTZ NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT now()
+);
 
 COMMIT;
@@ -1,34 +1,152 @@
 import os
 import json
-import requests
-from confluent_kafka import Producer
-from datetime import datetime
+import asyncio
+import itertools
+import math
 import time
+import httpx
+import aiomqtt
+from confluent_kafka import Producer
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 
 KAFKA_BROKERS = os.getenv("KAFKA_BROKERS", "localhost:9092")
-NORD_POOL_API = "https://data.nordpoolgroup.com/auction/day-ahead/prices"
+NORD_POOL_API = os.getenv("NORD_POOL_API", "https://data.nordpoolgroup.com/auction/day-ahead/prices")
 POLL_INTERVAL = 900  # 15 minutes
+MARKET_POLL_INTERVAL = int(os.getenv("MARKET_POLL_INTERVAL", "900"))  # Seconds between market data checks
+DELIVERY_AREAS = [area.strip() for area in os.getenv("DELIVERY_AREAS", "FI,SE3,EE").split(",") if area.strip()]
+DELIVERY_TIMEZONE = ZoneInfo("Europe/Oslo")  # Nord Pool delivery days are CET/CEST
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "10"))  # Pooled connections to the market API
+MQTT_BROKER = os.getenv("MQTT_BROKER", "")  # SCADA broker host; empty runs the telemetry simulator
+MQTT_PORT = int(os.getenv("MQTT_PORT", "1883"))
+SCADA_TOPIC = os.getenv("SCADA_TOPIC", "scada/+/telemetry")  # The + level is the region_id
+BAR_INTERVAL_S = 900  # 15-minute bars, the LSTM tick
+BAR_GRACE_S = float(os.getenv("BAR_GRACE_S", "5"))  # Wait for delayed readings before closing a bar
+SCADA_METRICS = ('actual_mw', 'wind_speed_ms', 'solar_irradiance')
+KAFKA_LINGER_MS = int(os.getenv("KAFKA_LINGER_MS", "20"))  # Wait to fill a batch before sending
+KAFKA_BATCH_MESSAGES = int(os.getenv("KAFKA_BATCH_MESSAGES", "10000"))  # Messages per broker request
+SHUTDOWN_FLUSH_TIMEOUT = 30  # Seconds to wait for queued messages on shutdown
+
+PRODUCER_CONFIG = {
+    'bootstrap.servers': KAFKA_BROKERS,
+    'linger.ms': KAFKA_LINGER_MS,
+    'batch.num.messages': KAFKA_BATCH_MESSAGES
+}
+
+# Delivery outcomes reported by the producer callbacks
+delivery_stats = {'delivered': 0, 'failed': 0}
+
+def delivery_report(err, msg):
+    """Count the broker acknowledgement of a produced message"""
+    if err is not None:
+        delivery_stats['failed'] += 1
+        print(f"Delivery failed for {msg.topic()} key={msg.key()}: {err}")
+    else:
+        delivery_stats['delivered'] += 1
+
+class DayAheadPriceCache:
+    """
+    Day-ahead prices per (delivery area, delivery date) with their HTTP validators.
+
+    Day-ahead prices are published once per delivery date, so a date whose
+    prices are in the cache is never requested again; dates not yet published
+    are polled with conditional requests.
+    """
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, area, delivery_date):
+        return self.entries.get((area, delivery_date))
 
-producer = Producer({'bootstrap.servers': KAFKA_BROKERS})
+    def put(self, area, delivery_date, data, etag=None, last_modified=None):
+        self.entries[(area, delivery_date)] = {'data': data, 'etag': etag, 'last_modified': last_modified}
+
+    def evict_before(self, delivery_date):
+        """Drop delivery dates that have passed"""
+        for key in [key for key in self.entries if key[1] < delivery_date]:
+            del self.entries[key]
+
+def is_published(data):
+    """Return True when a price response holds the delivery periods of its date"""
+    return bool(data and data.get('multiAreaEntries'))
+
+async def fetch_market_data(client, cache, region, delivery_date):
+    """
+    Fetch the Nord Pool day-ahead prices of one delivery area and date.
+
+    Returns:
+        (data, fresh): data is None until the prices are published or when the
+        response cannot be read; fresh is True only when newly published
+        prices were received
+    """
+    entry = cache.get(region, delivery_date)
+    if entry is not None and is_published(entry['data']):
+        return entry['data'], False
 
-def fetch_market_data(region="FI"):
-    """Fetch latest Nord Pool pricing data"""
     params = {
-        'deliveryDate': 'latest',
+        'deliveryDate': delivery_date.isoformat(),
         'currency': 'EUR',
         'aggregation': 'DeliveryPeriod',
         'deliveryAreas': region
     }
+    headers = {}
+    if entry is not None and entry['etag']:
+        headers['If-None-Match'] = entry['etag']
+    if entry is not None and entry['last_modified']:
+        headers['If-Modified-Since'] = entry['last_modified']
+
     try:
-        response = requests.get(NORD_POOL_API, params=params, timeout=10)
-        return response.json()
-    except Exception as e:
-        print(f"Error fetching market data: {e}")
-        return None
+        response = await client.get(NORD_POOL_API, params=params, headers=headers)
+    except httpx.HTTPError as e:
+        print(f"Error fetching market data for {region} {delivery_date}: {e}")
+        return None, False
+
+    if response.status_code == 304 and entry is not None:
+        return entry['data'], False
+    if response.status_code == 204:
+        # Auction results for this date are not out yet
+        return None, False
+    if response.status_code != 200:
+        print(f"Error fetching market data for {region} {delivery_date}: HTTP {response.status_code}")
+        return None, False
+
+    try:
+        data = response.json()
+        # Check the schema price_events relies on before the response is cached
+        published = is_published(data)
+        list(price_events(region, data))
+    except (ValueError, KeyError, TypeError, AttributeError) as e:
+        print(f"Unexpected market data for {region} {delivery_date}: {e!r}")
+        return None, False
+
+    cache.put(region, delivery_date, data, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+    return data, published
+
+async def fetch_all_markets(client, cache, areas, delivery_dates):
+    """
+    Fetch every delivery area and date concurrently.
+
+    Returns:
+        Dict of (area, delivery_date) -> (data, fresh)
+    """
+    keys = list(itertools.product(areas, delivery_dates))
+    results = await asyncio.gather(*(fetch_market_data(client, cache, area, day) for area, day in keys))
+    return dict(zip(keys, results))
+
+def price_events(area, data):
+    """Turn a day-ahead price response into one market tick per delivery period"""
+    for entry in data.get('multiAreaEntries', []):
+        yield {
+            "timestamp": entry['deliveryStart'],
+            "delivery_end": entry['deliveryEnd'],
+            "delivery_area": area,
+            "clearing_price_eur": entry['entryPerArea'].get(area)
+        }
 
 def fetch_scada_telemetry():
     """Simulate SCADA system telemetry"""
-    # In production, connect to actual MQTT broker
+    # In production, set MQTT_BROKER to aggregate the SCADA feed (scada_loop)
     import random
     return {
         'actual_mw': round(random.uniform(35.0, 50.0), 2),
@@ -36,43 +154,289 @@ def fetch_scada_telemetry():
         'solar_irradiance': round(random.uniform(0.0, 800.0), 2)
     }
 
-def publish_to_kafka(topic, key, payload):
-    """Publish message to Kafka topic"""
+class BarAggregator:
+    """
+    Aggregates raw SCADA readings into per-region 15-minute bars.
+
+    Each region has one open bar holding, per metric, the running sum, min,
+    max and latest value, so a reading is an O(1) update and no raw readings
+    are kept. A bar closes when a reading of the region falls into a later
+    interval or when the clock passes the interval end plus the grace period;
+    closed intervals are remembered per region, so every bar is emitted once
+    and later readings for it are counted as late and dropped. Readings that
+    are not JSON objects with numeric metrics are counted as invalid.
+    """
+
+    def __init__(self, interval_s=BAR_INTERVAL_S, grace_s=BAR_GRACE_S, metrics=SCADA_METRICS):
+        self.interval_s = interval_s
+        self.grace_s = grace_s
+        self.metrics = metrics
+        self.bars = {}
+        self.closed_until = {}
+        self.late_readings = 0
+        self.invalid_readings = 0
+
+    def parse_metrics(self, reading):
+        """
+        Metric values of a reading as floats, leaving out missing metrics.
+
+        Raises:
+            TypeError, ValueError: If the reading is not an object or a metric is not a finite number
+        """
+        if not isinstance(reading, dict):
+            raise TypeError(f"reading must be a JSON object, got {type(reading).__name__}")
+        values = {}
+        for metric in self.metrics:
+            value = reading.get(metric)
+            if value is None:
+                continue
+            value = float(value)
+            if not math.isfinite(value):
+                raise ValueError(f"{metric} is not a finite number: {value}")
+            values[metric] = value
+        return values
+
+    def add(self, region, timestamp, reading):
+        """
+        Add one reading taken at timestamp (epoch seconds).
+
+        The reading is validated before any bar changes, so an invalid
+        reading raises without being counted.
+
+        Returns:
+            Bars closed by this reading
+
+        Raises:
+            TypeError, ValueError: If the reading is invalid (see parse_metrics)
+        """
+        values = self.parse_metrics(reading)
+        start = timestamp - timestamp % self.interval_s
+        bar = self.bars.get(region)
+        if start < self.closed_until.get(region, float('-inf')) or (bar is not None and start < bar['start']):
+            self.late_readings += 1
+            return []
+
+        closed = []
+        if bar is not None and bar['start'] != start:
+            closed.append(self._close(region))
+            bar = None
+        if bar is None:
+            bar = self.bars[region] = {'start': start, 'count': 0, 'last_timestamp': timestamp,
+                                       'stats': {metric: None for metric in self.metrics}}
+
+        bar['count'] += 1
+        is_latest = timestamp >= bar['last_timestamp']
+        if is_latest:
+            bar['last_timestamp'] = timestamp
+        for metric, value in values.items():
+            stats = bar['stats'][metric]
+            if stats is None:
+                bar['stats'][metric] = [value, value, value, value, 1]
+                continue
+            stats[0] += value
+            stats[1] = min(stats[1], value)
+            stats[2] = max(stats[2], value)
+            if is_latest:
+                stats[3] = value
+            stats[4] += 1
+        return closed
+
+    def close_due(self, now):
+        """Close every open bar whose interval ended more than grace_s before now"""
+        due = [region for region, bar in self.bars.items() if bar['start'] + self.interval_s + self.grace_s <= now]
+        return [self._close(region) for region in due]
+
+    def _close(self, region):
+        bar = self.bars.pop(region)
+        self.closed_until[region] = bar['start'] + self.interval_s
+
+        payload = {
+            "timestamp": datetime.fromtimestamp(bar['start'], timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+            "region_id": region,
+            "sample_count": bar['count']
+        }
+        for metric, stats in bar['stats'].items():
+            total, low, high, last, count = stats if stats is not None else (None, None, None, None, 0)
+            # The plain metric name carries the mean, as the LSTM consumes it
+            payload[metric] = round(total / count, 4) if count else None
+            payload[f"{metric}_min"] = low
+            payload[f"{metric}_max"] = high
+            payload[f"{metric}_last"] = last
+        return payload
+
+def reading_timestamp(reading, received_at, max_ahead_s=BAR_INTERVAL_S):
+    """
+    Epoch seconds of a reading: its own ISO or epoch timestamp, else the receive time.
+
+    A device clock more than max_ahead_s ahead of the receive time is not
+    trusted, since a bar opened in the future would make every later real
+    reading of the region late.
+    """
+    value = reading.get('timestamp')
     try:
-        producer.produce(
-            topic,
-            key=key.encode('utf-8'),
-            value=json.dumps(payload).encode('utf-8')
-        )
-        producer.flush()
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            # Bars are labelled with datetimes, so the value has to convert to one
+            timestamp = datetime.fromtimestamp(value, timezone.utc).timestamp()
+        elif isinstance(value, str):
+            timestamp = datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+        else:
+            return received_at
+    except (ValueError, OverflowError, OSError):
+        return received_at
+    return timestamp if timestamp <= received_at + max_ahead_s else received_at
+
+def add_scada_message(aggregator, topic, payload, received_at):
+    """
+    Add one MQTT message from scada/<region_id>/telemetry to the aggregator.
+
+    Invalid messages are logged, counted in aggregator.invalid_readings and
+    skipped, so one bad publisher cannot stop the SCADA feed.
+
+    Returns:
+        Bars closed by the reading
+    """
+    try:
+        region = topic.split('/')[1]
+        if not region:
+            raise ValueError("empty region_id")
+        reading = json.loads(payload)
+        if not isinstance(reading, dict):
+            raise TypeError(f"reading must be a JSON object, got {type(reading).__name__}")
+        return aggregator.add(region, reading_timestamp(reading, received_at, aggregator.interval_s), reading)
+    except (IndexError, TypeError, ValueError) as e:
+        aggregator.invalid_readings += 1
+        print(f"Skipping invalid SCADA reading on {topic}: {e}")
+        return []
+
+def publish_to_kafka(producer, topic, key, payload):
+    """Queue a message for asynchronous delivery to a Kafka topic"""
+    value = json.dumps(payload).encode('utf-8')
+    try:
+        try:
+            producer.produce(topic, key=key.encode('utf-8'), value=value, callback=delivery_report)
+        except BufferError:
+            # Local queue is full: serve delivery reports to make room, then retry once
+            producer.poll(1.0)
+            producer.produce(topic, key=key.encode('utf-8'), value=value, callback=delivery_report)
+        producer.poll(0)
     except Exception as e:
+        delivery_stats['failed'] += 1
         print(f"Error publishing to Kafka: {e}")
 
-print("Data Ingestion Service Started")
+async def serve_deliveries(producer, interval=0.5):
+    """Serve delivery callbacks while the ingestion loops run"""
+    while True:
+        producer.poll(0)
+        await asyncio.sleep(interval)
+
+async def telemetry_loop(producer):
+    while True:
+        try:
+            # Collect telemetry
+            telemetry = fetch_scada_telemetry()
+
+            # Construct payload
+            payload = {
+                "timestamp": datetime.utcnow().isoformat() + "Z",
+                "region_id": "wind_farm_zone_1",
+                "actual_mw": telemetry['actual_mw'],
+                "wind_speed_ms": telemetry['wind_speed_ms'],
+                "solar_irradiance": telemetry['solar_irradiance']
+            }
+
+            # Publish to Kafka
+            publish_to_kafka(producer, 'grid-consumption-raw', payload['region_id'], payload)
+            print(f"Published: {payload}")
+
+            await asyncio.sleep(POLL_INTERVAL)
+
+        except Exception as e:
+            print(f"Error in ingestion loop: {e}")
+            await asyncio.sleep(60)
+
+def publish_bars(producer, bars):
+    for bar in bars:
+        publish_to_kafka(producer, 'grid-consumption-raw', bar['region_id'], bar)
+        print(f"Published bar: {bar['region_id']} {bar['timestamp']} ({bar['sample_count']} readings)")
+
+async def scada_loop(producer, aggregator, broker=MQTT_BROKER, port=MQTT_PORT, topic=SCADA_TOPIC):
+    """
+    Subscribe to SCADA telemetry over MQTT and publish 15-minute bars.
+
+    Readings arrive as JSON on scada/<region_id>/telemetry with region-level
+    actual_mw, wind_speed_ms and solar_irradiance and an optional timestamp.
+    Reconnects after broker failures; open bars survive reconnects.
+    """
+    while True:
+        try:
+            async with aiomqtt.Client(broker, port) as client:
+                await client.subscribe(topic)
+                print(f"Subscribed to {topic} on {broker}:{port}")
+                async for message in client.messages:
+                    publish_bars(producer, add_scada_message(aggregator, message.topic.value, message.payload,
+                                                             time.time()))
+        except aiomqtt.MqttError as e:
+            print(f"MQTT connection lost: {e}. Reconnecting in 5s...")
+            await asyncio.sleep(5)
+
+async def close_bars(producer, aggregator, interval=1.0):
+    """Close bars of regions that stopped reporting once their interval has passed"""
+    while True:
+        publish_bars(producer, aggregator.close_due(time.time()))
+        await asyncio.sleep(interval)
+
+async def market_loop(producer, client, cache, areas=DELIVERY_AREAS):
+    """Publish the day-ahead prices of today and tomorrow once each is published"""
+    while True:
+        try:
+            today = datetime.now(DELIVERY_TIMEZONE).date()
+            delivery_dates = [today, today + timedelta(days=1)]
+            cache.evict_before(today)
+
+            results = await fetch_all_markets(client, cache, areas, delivery_dates)
+            for (area, delivery_date), (data, fresh) in results.items():
+                if not fresh:
+                    continue
+                events = list(price_events(area, data))
+                for event in events:
+                    publish_to_kafka(producer, 'market-ticks-raw', area, event)
+                print(f"Published {len(events)} day-ahead prices for {area} {delivery_date}")
+
+            await asyncio.sleep(MARKET_POLL_INTERVAL)
+
+        except Exception as e:
+            print(f"Error in market loop: {e}")
+            await asyncio.sleep(60)
+
+async def run():
+    producer = Producer(PRODUCER_CONFIG)
+    limits = httpx.Limits(max_connections=HTTP_MAX_CONNECTIONS, max_keepalive_connections=HTTP_MAX_CONNECTIONS)
+
+    print(f"Data Ingestion Service Started. Delivery areas: {', '.join(DELIVERY_AREAS)}")
 
-while True:
     try:
-        # Collect telemetry
-        telemetry = fetch_scada_telemetry()
-        
-        # Construct payload
-        payload = {
-            "timestamp": datetime.utcnow().isoformat() + "Z",
-            "region_id": "wind_farm_zone_1",
-            "actual_mw": telemetry['actual_mw'],
-            "wind_speed_ms": telemetry['wind_speed_ms'],
-            "solar_irradiance": telemetry['solar_irradiance']
-        }
-        
-        # Publish to Kafka
-        publish_to_kafka('grid-consumption-raw', payload['region_id'], payload)
-        print(f"Published: {payload}")
-        
-        time.sleep(POLL_INTERVAL)
-        
+        async with httpx.AsyncClient(timeout=10, limits=limits) as client:
+            if MQTT_BROKER:
+                aggregator = BarAggregator()
+                telemetry = [scada_loop(producer, aggregator), close_bars(producer, aggregator)]
+            else:
+                telemetry = [telemetry_loop(producer)]
+            await asyncio.gather(
+                *telemetry,
+                market_loop(producer, client, DayAheadPriceCache()),
+                serve_deliveries(producer)
+            )
+    finally:
+        # Deliver everything still queued before exiting
+        remaining = producer.flush(SHUTDOWN_FLUSH_TIMEOUT)
+        print(f"Deliveries: {delivery_stats['delivered']} delivered, "
+              f"{delivery_stats['failed'] + remaining} failed or undelivered")
+
+def main():
+    try:
+        asyncio.run(run())
     except KeyboardInterrupt:
         print("\nShutting down ingestion service...")
-        break
-    except Exception as e:
-        print(f"Error in ingestion loop: {e}")
-        time.sleep(60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Online feature engine: the features of training/feature_engineering.py,
+updated in O(1) per tick.
+
+create_temporal_features, create_lagged_features and create_rolling_features
+recompute every feature over the full history with pandas. OnlineFeatureEngine
+produces the same values one tick at a time from constant-size state:
+
+- lags are read from a ring buffer of the last ticks
+- rolling means and standard deviations are running statistics (Welford's
+  algorithm), adding the new value and removing the one leaving the window
+- cyclical time features come from precomputed sin/cos lookup tables
+"""
+
+from datetime import datetime
+
+import numpy as np
+
+# Cyclical encodings, computed as create_temporal_features computes them
+HOUR_SIN = np.sin(2 * np.pi * np.arange(24) / 24)
+HOUR_COS = np.cos(2 * np.pi * np.arange(24) / 24)
+DAY_SIN = np.sin(2 * np.pi * np.arange(7) / 7)
+DAY_COS = np.cos(2 * np.pi * np.arange(7) / 7)
+
+TEMPORAL_FEATURES = ['hour', 'day_of_week', 'month', 'hour_sin', 'hour_cos', 'day_sin', 'day_cos']
+
+
+def _to_datetime(timestamp):
+    if isinstance(timestamp, str):
+        return datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
+    if isinstance(timestamp, np.datetime64):
+        return timestamp.astype('datetime64[us]').astype(datetime)
+    return timestamp
+
+
+class OnlineFeatureEngine:
+    """
+    Streaming version of the batch feature pipeline for one series.
+
+    Feature names and values match applying create_temporal_features,
+    create_lagged_features(columns, lags) and create_rolling_features(columns,
+    windows) to the same ticks, including NaN until enough ticks were seen;
+    like pandas rolling windows, NaN inputs are skipped by the statistics.
+    """
+
+    def __init__(self, columns=('actual_mw',), lags=(4, 96), windows=(12, 96)):
+        self.columns = list(columns)
+        self.lags = list(lags)
+        self.windows = list(windows)
+        self.feature_names = (
+            TEMPORAL_FEATURES
+            + [f'{col}_lag_{lag}' for col in self.columns for lag in self.lags]
+            + [f'{col}_rolling_{stat}_{window}' for col in self.columns
+               for window in self.windows for stat in ('mean', 'std')]
+        )
+
+        # Last ticks per column, long enough for the largest lag and the value leaving the largest window
+        self.capacity = max(self.lags + self.windows) + 1
+        self.history = np.full((self.capacity, len(self.columns)), np.nan)
+        self.count = 0
+
+        # Running statistics per (window, column) over the non-NaN values in the window
+        shape = (len(self.windows), len(self.columns))
+        self.nobs = np.zeros(shape, dtype=np.int64)
+        self.mean = np.zeros(shape)
+        self.m2 = np.zeros(shape)
+
+    def update(self, timestamp, values):
+        """
+        Add one tick and return its features.
+
+        Args:
+            timestamp: datetime, numpy datetime64 or ISO string
+            values: Values of the engine columns, in order
+
+        Returns:
+            Feature vector in feature_names order
+        """
+        ts = _to_datetime(timestamp)
+        hour, day = ts.hour, ts.weekday()
+        temporal = [hour, day, ts.month, HOUR_SIN[hour], HOUR_COS[hour], DAY_SIN[day], DAY_COS[day]]
+
+        x = np.asarray(values, dtype=np.float64)
+        pos = self.count % self.capacity
+        self.history[pos] = x
+
+        lags = [self.history[(pos - lag) % self.capacity] if self.count >= lag else np.full(len(self.columns), np.nan)
+                for lag in self.lags]
+
+        rolling = []
+        for j, window in enumerate(self.windows):
+            if self.count >= window:
+                self._remove(j, self.history[(pos - window) % self.capacity])
+            self._add(j, x)
+            full = self.nobs[j] >= window
+            mean = np.where(full, self.mean[j], np.nan)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                std = np.where(full & (self.nobs[j] > 1), np.sqrt(np.maximum(self.m2[j], 0.0) / (self.nobs[j] - 1)), np.nan)
+            rolling.append((mean, std))
+        self.count += 1
+
+        # Order features per column, as the pandas functions add them
+        features = temporal
+        features += [lags[i][c] for c in range(len(self.columns)) for i in range(len(self.lags))]
+        features += [stat[c] for c in range(len(self.columns)) for pair in rolling for stat in pair]
+        return np.array(features, dtype=np.float64)
+
+    def update_many(self, timestamps, values):
+        """Add consecutive ticks, e.g. the last capacity ticks to warm up a restarted service."""
+        return np.array([self.update(ts, row) for ts, row in zip(timestamps, values)])
+
+    def _add(self, j, x):
+        present = ~np.isnan(x)
+        self.nobs[j] += present
+        n = np.maximum(self.nobs[j], 1)
+        delta = np.where(present, x - self.mean[j], 0.0)
+        self.mean[j] += delta / n
+        self.m2[j] += np.where(present, delta * (x - self.mean[j]), 0.0)
+
+    def _remove(self, j, y):
+        present = ~np.isnan(y)
+        self.nobs[j] -= present
+        n = self.nobs[j]
+        empty = present & (n == 0)
+        delta = np.where(present & (n > 0), y - self.mean[j], 0.0)
+        self.mean[j] -= delta / np.maximum(n, 1)
+        self.m2[j] -= np.where(present & (n > 0), delta * (y - self.mean[j]), 0.0)
+        self.mean[j][empty] = 0.0
+        self.m2[j][empty] = 0.0
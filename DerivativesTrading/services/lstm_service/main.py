@@ -9,10 +9,16 @@ KAFKA_BROKERS = os.getenv("KAFKA_BROKERS", "localhost:9092")
 MODEL_PATH = os.getenv("MODEL_PATH", "/models/lstm_demand_model.h5")
 WINDOW_SIZE = 96  # 24 hours * 4 intervals per hour
 NUM_FEATURES = 3  # [actual_mw, wind_speed_ms, solar_irradiance]
+MAX_POLL_MESSAGES = int(os.getenv("MAX_POLL_MESSAGES", "500"))  # Ticks consumed per poll cycle
+REGION_CAPACITY = int(os.getenv("REGION_CAPACITY", "64"))  # Preallocated regions, doubled when full
+KAFKA_LINGER_MS = int(os.getenv("KAFKA_LINGER_MS", "20"))  # Wait to fill a batch before sending
+KAFKA_BATCH_MESSAGES = int(os.getenv("KAFKA_BATCH_MESSAGES", "10000"))  # Messages per broker request
+SHUTDOWN_FLUSH_TIMEOUT = 30  # Seconds to wait for queued forecasts on shutdown
 
 # Min-Max Normalization Constants (Example Values)
 SCALER_MIN = np.array([0.0, 0.0, 0.0])
 SCALER_MAX = np.array([200.0, 30.0, 1000.0])
+SCALER_RANGE = (SCALER_MAX - SCALER_MIN + 1e-8).astype(np.float32)
 
 def scale_features(raw_features):
     return (np.array(raw_features) - SCALER_MIN) / (SCALER_MAX - SCALER_MIN + 1e-8)
@@ -20,90 +26,243 @@ def scale_features(raw_features):
 def descale_target(scaled_val):
     return scaled_val * (SCALER_MAX[0] - SCALER_MIN[0]) + SCALER_MIN[0]
 
-# Load Trained Keras Model (if exists)
-if os.path.exists(MODEL_PATH):
-    model = tf.keras.models.load_model(MODEL_PATH)
-    print(f"Model loaded from {MODEL_PATH}")
-else:
-    print(f"Warning: Model not found at {MODEL_PATH}, creating mock model")
-    # Create a simple mock model for testing
-    model = tf.keras.Sequential([
-        tf.keras.layers.LSTM(64, input_shape=(WINDOW_SIZE, NUM_FEATURES)),
-        tf.keras.layers.Dense(1)
-    ])
-    model.compile(optimizer='adam', loss='mse')
-
-# In-memory sliding window buffer per production region
-region_buffers = {}
-
-# Kafka Setup
-consumer = Consumer({
-    'bootstrap.servers': KAFKA_BROKERS,
-    'group.id': 'lstm-inference-group',
-    'auto.offset.reset': 'latest'
-})
-consumer.subscribe(['grid-consumption-raw'])
-
-producer = Producer({'bootstrap.servers': KAFKA_BROKERS})
-
-print("LSTM Inference Service Started. Listening for 15-minute ticks...")
-
-try:
-    while True:
-        msg = consumer.poll(1.0)
-        if msg is None:
-            continue
+# Delivery outcomes reported by the producer callbacks
+delivery_stats = {'delivered': 0, 'failed': 0}
+
+def delivery_report(err, msg):
+    """Count the broker acknowledgement of a produced forecast"""
+    if err is not None:
+        delivery_stats['failed'] += 1
+        print(f"Forecast delivery failed for {msg.topic()} key={msg.key()}: {err}")
+    else:
+        delivery_stats['delivered'] += 1
+
+
+class RegionWindows:
+    """
+    Sliding 24-hour windows for all production regions in one preallocated
+    (regions, WINDOW_SIZE, NUM_FEATURES) float32 ring buffer.
+
+    Each region owns one slot; a tick overwrites the oldest row in place, so
+    appending is O(1) and the windows of many regions can be gathered into a
+    single model batch.
+    """
+
+    def __init__(self, capacity=REGION_CAPACITY, window_size=WINDOW_SIZE, num_features=NUM_FEATURES):
+        self.window_size = window_size
+        self.num_features = num_features
+        self.slots = {}
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        old = getattr(self, 'buffer', None)
+        self.capacity = capacity
+        self.buffer = np.zeros((capacity, self.window_size, self.num_features), dtype=np.float32)
+        heads = np.zeros(capacity, dtype=np.int64)  # Next write position per region
+        counts = np.zeros(capacity, dtype=np.int64)  # Ticks held, up to window_size
+        if old is not None:
+            self.buffer[:len(old)] = old
+            heads[:len(old)] = self.heads
+            counts[:len(old)] = self.counts
+        self.heads = heads
+        self.counts = counts
+
+    def slot(self, region):
+        """Return the slot of a region, assigning the next free one on first use."""
+        slot = self.slots.get(region)
+        if slot is None:
+            slot = len(self.slots)
+            if slot == self.capacity:
+                self._allocate(self.capacity * 2)
+            self.slots[region] = slot
+        return slot
+
+    def append(self, region, scaled_features):
+        """Add a scaled tick to a region window; returns True when the window is full."""
+        slot = self.slot(region)
+        head = self.heads[slot]
+        self.buffer[slot, head] = scaled_features
+        self.heads[slot] = (head + 1) % self.window_size
+        self.counts[slot] = min(self.counts[slot] + 1, self.window_size)
+        return self.counts[slot] == self.window_size
+
+    def windows(self, slots):
+        """Gather the windows of several slots, oldest tick first: [len(slots), WINDOW_SIZE, NUM_FEATURES]."""
+        slots = np.asarray(slots, dtype=np.int64)
+        steps = (self.heads[slots, None] + np.arange(self.window_size)) % self.window_size
+        return self.buffer[slots[:, None], steps]
+
+
+def forecast_target_time(timestamp):
+    if not isinstance(timestamp, str):
+        raise TypeError(f"timestamp must be a string, got {timestamp!r}")
+    tick_time = np.datetime64(timestamp.rstrip('Z'))
+    if np.isnat(tick_time):
+        raise ValueError(f"timestamp is not a time: {timestamp!r}")
+    return (tick_time + np.timedelta64(15, 'm')).astype(str) + "Z"
+
+
+def forecast(model, region_windows, pending):
+    """
+    Forecast every region in one batched forward pass.
+
+    Args:
+        model: Keras model taking [batch, WINDOW_SIZE, NUM_FEATURES]
+        region_windows: RegionWindows holding the ready windows
+        pending: List of (region, timestamp, target_time) whose windows are ready
+
+    Returns:
+        Forecast event payloads, one per pending region
+    """
+    if not pending:
+        return []
+
+    batch = region_windows.windows([region_windows.slots[region] for region, _, _ in pending])
+    scaled_predictions = np.asarray(model.predict_on_batch(batch)).reshape(len(pending), -1)[:, 0]
+    predicted_mw = descale_target(scaled_predictions)
+
+    return [
+        {
+            "timestamp": timestamp,
+            "forecast_target_time": target_time,
+            "region_id": region,
+            "predicted_mw": round(float(mw), 2)
+        }
+        for (region, timestamp, target_time), mw in zip(pending, predicted_mw)
+    ]
+
+
+def process_messages(messages, region_windows, model):
+    """
+    Update region windows from one poll cycle of ticks and forecast the ready regions.
+
+    Ready regions are forecast together; a region ticking twice in one cycle
+    first forecasts the regions collected so far, so no window is skipped.
+    Malformed ticks are logged and skipped without affecting the rest of the cycle.
+
+    Returns:
+        Forecast event payloads
+    """
+    forecasts = []
+    pending = []
+    pending_regions = set()
+
+    for msg in messages:
         if msg.error():
-            if msg.error().code() == KafkaError._PARTITION_EOF:
+            continue
+
+        # Parse Incoming Stream Metric
+        try:
+            data = json.loads(msg.value().decode('utf-8'))
+            region = data['region_id']
+            timestamp = data['timestamp']
+            if not isinstance(region, str):
+                raise TypeError(f"region_id must be a string, got {region!r}")
+            target_time = forecast_target_time(timestamp)
+            # Extract features before touching the region's window
+            features = np.array([data['actual_mw'], data['wind_speed_ms'], data['solar_irradiance']], dtype=np.float32)
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"Skipping invalid tick: {e}")
+            continue
+
+        if region in pending_regions:
+            forecasts.extend(forecast(model, region_windows, pending))
+            pending, pending_regions = [], set()
+
+        # Scale features into the region's ring buffer row
+        if region_windows.append(region, (features - SCALER_MIN) / SCALER_RANGE):
+            pending.append((region, timestamp, target_time))
+            pending_regions.add(region)
+
+    forecasts.extend(forecast(model, region_windows, pending))
+    return forecasts
+
+
+def publish_forecasts(producer, forecasts):
+    """
+    Queue forecast events for asynchronous delivery.
+
+    Delivery reports arrive through delivery_report when the producer is
+    polled; nothing here waits for the broker.
+    """
+    for outbound_payload in forecasts:
+        key = outbound_payload['region_id'].encode('utf-8')
+        value = json.dumps(outbound_payload).encode('utf-8')
+        try:
+            producer.produce('demand-forecasts-15m', key=key, value=value, callback=delivery_report)
+        except BufferError:
+            # Local queue is full: serve delivery reports to make room, then retry once
+            producer.poll(1.0)
+            producer.produce('demand-forecasts-15m', key=key, value=value, callback=delivery_report)
+        print(f"Forecast published: {outbound_payload}")
+
+    # Serve delivery callbacks once per poll cycle
+    producer.poll(0)
+
+
+def load_model():
+    # Load Trained Keras Model (if exists)
+    if os.path.exists(MODEL_PATH):
+        model = tf.keras.models.load_model(MODEL_PATH)
+        print(f"Model loaded from {MODEL_PATH}")
+    else:
+        print(f"Warning: Model not found at {MODEL_PATH}, creating mock model")
+        # Create a simple mock model for testing
+        model = tf.keras.Sequential([
+            tf.keras.layers.LSTM(64, input_shape=(WINDOW_SIZE, NUM_FEATURES)),
+            tf.keras.layers.Dense(1)
+        ])
+        model.compile(optimizer='adam', loss='mse')
+    return model
+
+
+def main():
+    model = load_model()
+
+    # Sliding window state for every production region
+    region_windows = RegionWindows()
+
+    # Kafka Setup
+    consumer = Consumer({
+        'bootstrap.servers': KAFKA_BROKERS,
+        'group.id': 'lstm-inference-group',
+        'auto.offset.reset': 'latest'
+    })
+    consumer.subscribe(['grid-consumption-raw'])
+
+    producer = Producer({
+        'bootstrap.servers': KAFKA_BROKERS,
+        'linger.ms': KAFKA_LINGER_MS,
+        'batch.num.messages': KAFKA_BATCH_MESSAGES
+    })
+
+    print("LSTM Inference Service Started. Listening for 15-minute ticks...")
+
+    try:
+        while True:
+            messages = consumer.consume(num_messages=MAX_POLL_MESSAGES, timeout=1.0)
+            if not messages:
+                producer.poll(0)
                 continue
-            else:
-                print(f"Kafka Error: {msg.error()}")
+
+            # Publish Forecast Event payloads
+            publish_forecasts(producer, process_messages(messages, region_windows, model))
+
+            errors = [msg.error() for msg in messages
+                      if msg.error() and msg.error().code() != KafkaError._PARTITION_EOF]
+            if errors:
+                print(f"Kafka Error: {errors[0]}")
                 break
 
-        # Parse Incoming Stream Metric
-        data = json.loads(msg.value().decode('utf-8'))
-        region = data['region_id']
-        
-        # Extract features
-        features = [data['actual_mw'], data['wind_speed_ms'], data['solar_irradiance']]
-        scaled = scale_features(features)
-
-        # Update sliding window state
-        if region not in region_buffers:
-            region_buffers[region] = []
-        
-        region_buffers[region].append(scaled)
-        
-        # Enforce rolling 24-hour limit
-        if len(region_buffers[region]) > WINDOW_SIZE:
-            region_buffers[region].pop(0)
-
-        # Run prediction if window state is fully ready
-        if len(region_buffers[region]) == WINDOW_SIZE:
-            # Prepare tensor array input shape: [Batch=1, TimeSteps=96, Features=3]
-            input_tensor = np.array([region_buffers[region]], dtype=np.float32)
-            
-            # Executing forward inference pass
-            scaled_prediction = model.predict(input_tensor, verbose=0)[0][0]
-            predicted_mw = float(descale_target(scaled_prediction))
-
-            # Publish Forecast Event payload
-            outbound_payload = {
-                "timestamp": data['timestamp'],
-                "forecast_target_time": (np.datetime64(data['timestamp']) + np.timedelta64(15, 'm')).astype(str) + "Z",
-                "region_id": region,
-                "predicted_mw": round(predicted_mw, 2)
-            }
-            
-            producer.produce(
-                'demand-forecasts-15m',
-                key=region.encode('utf-8'),
-                value=json.dumps(outbound_payload).encode('utf-8')
-            )
-            producer.flush()
-            print(f"Forecast published: {outbound_payload}")
-
-except KeyboardInterrupt:
-    print("\nShutting down LSTM service...")
-finally:
-    consumer.close()
+    except KeyboardInterrupt:
+        print("\nShutting down LSTM service...")
+    finally:
+        consumer.close()
+        # Deliver everything still queued before exiting
+        remaining = producer.flush(SHUTDOWN_FLUSH_TIMEOUT)
+        print(f"Forecast deliveries: {delivery_stats['delivered']} delivered, "
+              f"{delivery_stats['failed'] + remaining} failed or undelivered")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""
+Vectorized backtester for the trading engine strategy.
+
+Replays historical forecasts, actuals and prices through the signal rule of
+main.evaluate_position and reports PnL for every combination of imbalance
+threshold, commitment setting and region.
+
+Settlement per 15-minute interval (energy = MW x interval_h):
+- a signal hedges the forecast imbalance (predicted - committed) in the
+  intraday market: SELL_SHORT sells the surplus, BUY_LONG buys the deficit
+- the remaining imbalance (actual - committed - hedge) is settled at the
+  imbalance price; without imbalance prices, surplus is sold at
+  price x (1 - penalty) and deficit bought at price x (1 + penalty)
+
+Whether a tick is hedged is the only part that depends on the threshold, so
+each series is sorted once by absolute forecast imbalance and the PnL of every
+threshold is read from cumulative sums of the per-tick hedging gain.
+"""
+
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+INTERVAL_H = 0.25  # 15-minute delivery periods
+SELL_SHORT, HOLD, BUY_LONG = 1, 0, -1
+
+
+def load_history_csv(path):
+    """Read a history CSV with timestamp, region_id, predicted_mw, actual_mw, price_eur and optional imbalance_price_eur."""
+    return pivot_history(pd.read_csv(path, parse_dates=['timestamp']))
+
+
+def pivot_history(df):
+    """
+    Arrange long-format history as (regions, time steps) arrays.
+
+    Missing intervals are NaN and are left out of the backtest.
+
+    Returns:
+        Dict with regions, timestamps and the predicted, actual, price and
+        imbalance_price arrays (imbalance_price is None when not given)
+    """
+    df = df.drop_duplicates(['region_id', 'timestamp'], keep='last')
+    columns = ['predicted_mw', 'actual_mw', 'price_eur']
+    if 'imbalance_price_eur' in df:
+        columns.append('imbalance_price_eur')
+    wide = df.pivot(index='region_id', columns='timestamp', values=columns)
+
+    arrays = {column: wide[column].to_numpy(dtype=np.float64) for column in columns}
+    return {
+        'regions': list(wide.index),
+        'timestamps': wide['predicted_mw'].columns.to_numpy(),
+        'predicted': arrays['predicted_mw'],
+        'actual': arrays['actual_mw'],
+        'price': arrays['price_eur'],
+        'imbalance_price': arrays.get('imbalance_price_eur')
+    }
+
+
+def signals(predicted, committed, threshold):
+    """Vectorized main.evaluate_position signal: SELL_SHORT (1), BUY_LONG (-1) or HOLD (0)."""
+    imbalance = np.asarray(predicted) - np.asarray(committed)
+    return np.where(imbalance > threshold, SELL_SHORT, np.where(imbalance < -threshold, BUY_LONG, HOLD))
+
+
+def settle(actual, committed, hedge, price, imbalance_price=None, imbalance_penalty=0.2,
+           fee_eur_mwh=0.0, interval_h=INTERVAL_H):
+    """Revenue in EUR of delivering actual against a commitment with an intraday hedge (positive = sold)."""
+    residual = actual - committed - hedge
+    if imbalance_price is not None:
+        long_price = short_price = imbalance_price
+    else:
+        long_price = price * (1 - imbalance_penalty)
+        short_price = price * (1 + imbalance_penalty)
+    return interval_h * (hedge * price - np.abs(hedge) * fee_eur_mwh
+                         + np.maximum(residual, 0.0) * long_price + np.minimum(residual, 0.0) * short_price)
+
+
+def backtest(history, thresholds, commitments, imbalance_penalty=0.2, fee_eur_mwh=0.0, interval_h=INTERVAL_H):
+    """
+    Evaluate the strategy for every threshold, commitment setting and region.
+
+    Args:
+        history: Arrays from pivot_history
+        thresholds: Imbalance thresholds in MW, shape (K,)
+        commitments: Committed MW per region, shape (R,) or one row per setting (C, R)
+        imbalance_penalty: Imbalance price spread around price when no imbalance prices are given
+        fee_eur_mwh: Intraday trading fee per hedged MWh
+        interval_h: Length of one delivery period in hours
+
+    Returns:
+        Dict of (K, C, R) arrays: pnl_eur, unhedged_pnl_eur, hedge_gain_eur,
+        trades, hedged_mwh and hit_rate (share of trades that beat not hedging)
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    commitments = np.atleast_2d(np.asarray(commitments, dtype=np.float64))
+    predicted, actual, price = history['predicted'], history['actual'], history['price']
+    imbalance_price = history.get('imbalance_price')
+
+    valid = ~(np.isnan(predicted) | np.isnan(actual) | np.isnan(price))
+    if imbalance_price is not None:
+        valid &= ~np.isnan(imbalance_price)
+    # Invalid ticks are zeroed: they settle nothing and their gain is 0
+    predicted, actual, price = (np.where(valid, a, 0.0) for a in (predicted, actual, price))
+    if imbalance_price is not None:
+        imbalance_price = np.where(valid, imbalance_price, 0.0)
+
+    committed = commitments[:, :, None]  # (C, R, 1)
+    forecast_imbalance = np.where(valid, predicted - committed, 0.0)  # (C, R, T)
+    settle_args = dict(imbalance_penalty=imbalance_penalty, fee_eur_mwh=fee_eur_mwh, interval_h=interval_h)
+
+    unhedged = np.where(valid, settle(actual, committed, 0.0, price, imbalance_price, **settle_args), 0.0)
+    hedged = np.where(valid, settle(actual, committed, forecast_imbalance, price, imbalance_price, **settle_args), 0.0)
+    gain = hedged - unhedged
+
+    # Ticks by descending |forecast imbalance|: the ticks a threshold hedges are a prefix
+    size = np.where(valid, np.abs(forecast_imbalance), -np.inf)
+    order = np.argsort(-size, axis=-1, kind='stable')
+    sorted_size = np.take_along_axis(size, order, axis=-1)
+    zero = np.zeros(sorted_size.shape[:-1] + (1,))
+    cum_gain = np.concatenate([zero, np.cumsum(np.take_along_axis(gain, order, axis=-1), axis=-1)], axis=-1)
+    cum_mwh = np.concatenate([zero, np.cumsum(np.take_along_axis(size.clip(min=0), order, axis=-1), axis=-1)], axis=-1)
+    cum_hits = np.concatenate([zero, np.cumsum(np.take_along_axis(gain > 0, order, axis=-1), axis=-1)], axis=-1)
+
+    # Trades per threshold: ticks with |imbalance| > threshold, i.e. the prefix before the first <= threshold
+    num_c, num_r, num_t = sorted_size.shape
+    flat = -sorted_size.reshape(-1, num_t)
+    trades = np.stack([np.searchsorted(row, -thresholds, side='left') for row in flat], axis=-1)
+    trades = trades.reshape(len(thresholds), num_c, num_r)
+
+    def at_trades(cumulative):
+        return np.take_along_axis(cumulative[None], trades[..., None], axis=-1)[..., 0]
+
+    unhedged_pnl = np.broadcast_to(unhedged.sum(axis=-1), trades.shape)
+    hedge_gain = at_trades(cum_gain)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hit_rate = np.where(trades > 0, at_trades(cum_hits) / trades, np.nan)
+    return {
+        'pnl_eur': unhedged_pnl + hedge_gain,
+        'unhedged_pnl_eur': unhedged_pnl,
+        'hedge_gain_eur': hedge_gain,
+        'trades': trades,
+        'hedged_mwh': at_trades(cum_mwh) * interval_h,
+        'hit_rate': hit_rate
+    }
+
+
+def best_settings(results, thresholds, commitments, regions):
+    """Best threshold and commitment setting per region by PnL."""
+    commitments = np.atleast_2d(commitments)
+    pnl = results['pnl_eur']
+    best = []
+    for r, region in enumerate(regions):
+        k, c = np.unravel_index(np.argmax(pnl[:, :, r]), pnl.shape[:2])
+        best.append({
+            'region_id': region,
+            'threshold_mw': float(thresholds[k]),
+            'committed_mw': float(commitments[c, r]),
+            'pnl_eur': float(pnl[k, c, r]),
+            'hedge_gain_eur': float(results['hedge_gain_eur'][k, c, r]),
+            'trades': int(results['trades'][k, c, r]),
+            'hit_rate': float(results['hit_rate'][k, c, r])
+        })
+    return best
+
+
+def main():
+    from main import DAY_AHEAD_COMMITMENTS, IMBALANCE_THRESHOLD_MW
+
+    parser = argparse.ArgumentParser(description='Backtest imbalance thresholds and commitments on history')
+    parser.add_argument('--data', required=True, help='History CSV (timestamp, region_id, predicted_mw, actual_mw, price_eur)')
+    parser.add_argument('--thresholds', type=float, nargs=3, default=[0.0, 10.0, 0.1],
+                        metavar=('START', 'STOP', 'STEP'), help='Threshold grid in MW')
+    parser.add_argument('--commitment-offsets', type=float, nargs='+', default=[0.0],
+                        help='MW added to each region commitment, one setting per offset')
+    parser.add_argument('--commitments', type=json.loads, default=DAY_AHEAD_COMMITMENTS,
+                        help='JSON object of committed MW per region')
+    parser.add_argument('--imbalance-penalty', type=float, default=0.2)
+    parser.add_argument('--fee', type=float, default=0.0, help='Intraday fee in EUR/MWh')
+    args = parser.parse_args()
+
+    history = load_history_csv(args.data)
+    thresholds = np.arange(*args.thresholds)
+    base = np.array([args.commitments.get(region, 0.0) for region in history['regions']])
+    commitments = base[None] + np.array(args.commitment_offsets)[:, None]
+
+    started = time.perf_counter()
+    results = backtest(history, thresholds, commitments, args.imbalance_penalty, args.fee)
+    elapsed = time.perf_counter() - started
+    print(f"Backtested {len(thresholds) * len(commitments)} settings x {len(history['regions'])} regions "
+          f"over {len(history['timestamps'])} intervals in {elapsed:.2f}s")
+
+    # Current settings: the configured threshold with unchanged commitments
+    current = int(np.argmin(np.abs(thresholds - IMBALANCE_THRESHOLD_MW)))
+    unchanged = int(np.argmin(np.abs(args.commitment_offsets)))
+    for best in best_settings(results, thresholds, commitments, history['regions']):
+        r = history['regions'].index(best['region_id'])
+        print(f"Region: {best['region_id']} | Best threshold: {best['threshold_mw']:.2f}MW | "
+              f"Committed: {best['committed_mw']}MW | PnL: {best['pnl_eur']:.2f}EUR | "
+              f"Hedge gain: {best['hedge_gain_eur']:.2f}EUR | Trades: {best['trades']} | "
+              f"Hit rate: {best['hit_rate']:.1%} | PnL at {thresholds[current]:.2f}MW: "
+              f"{results['pnl_eur'][current, unchanged, r]:.2f}EUR")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,115 @@
 import os
 import json
-from confluent_kafka import Consumer
+from confluent_kafka import Consumer, Producer
 
 KAFKA_BROKERS = os.getenv("KAFKA_BROKERS", "localhost:9092")
 IMBALANCE_THRESHOLD_MW = float(os.getenv("TRADING_THRESHOLD_MW", "2.5"))
+KAFKA_LINGER_MS = int(os.getenv("KAFKA_LINGER_MS", "20"))  # Wait to fill a batch before sending
+SIGNALS_TOPIC = os.getenv("SIGNALS_TOPIC", "trading-signals")
+SHUTDOWN_FLUSH_TIMEOUT = 30  # Seconds to wait for queued signals on shutdown
 
 # Dummy registry representing your fixed Day-Ahead forward sale delivery commitments
 DAY_AHEAD_COMMITMENTS = {
     "wind_farm_zone_1": 40.0  # Enterprise committed to deliver 40 MW this hour
 }
 
-consumer = Consumer({
-    'bootstrap.servers': KAFKA_BROKERS,
-    'group.id': 'trading-strategy-group',
-    'auto.offset.reset': 'latest'
-})
-consumer.subscribe(['demand-forecasts-15m'])
-
-print("Trading Engine Online. Evaluating positions against Keras model updates...")
-
-try:
-    while True:
-        msg = consumer.poll(1.0)
-        if msg is None:
-            continue
-        if msg.error():
-            continue
-
-        forecast = json.loads(msg.value().decode('utf-8'))
-        region = forecast['region_id']
-        predicted_generation = forecast['predicted_mw']
-        
-        committed_mw = DAY_AHEAD_COMMITMENTS.get(region, 0.0)
-        imbalance = predicted_generation - committed_mw
-
-        print(f"Region: {region} | Forecast: {predicted_generation}MW | Committed: {committed_mw}MW | Delta: {imbalance:.2f}MW")
-
-        # Trading Financial Decisions Execution Logic
-        if imbalance > IMBALANCE_THRESHOLD_MW:
-            # Overproduction Risk: Extra power will drop Intraday Market clearing price.
-            # Strategy: Short futures or buy puts immediately to protect asset revenue.
-            print(f"[TRADE SIGNAL] ORDER -> SELL SHORT Intraday Derivative for {abs(imbalance):.2f} MW to hedge OVERPRODUCTION risk.")
-            
-        elif imbalance < -IMBALANCE_THRESHOLD_MW:
-            # Underproduction Deficit Penalty Risk: Forced to purchase balancing grid penalties.
-            # Strategy: Go Long on Intraday Hourly Options to secure replacement supply cheaply.
-            print(f"[TRADE SIGNAL] ORDER -> BUY LONG Intraday Derivative for {abs(imbalance):.2f} MW to hedge UNDERPRODUCTION penalty.")
-
-except KeyboardInterrupt:
-    print("\nShutting down trading engine...")
-finally:
-    consumer.close()
+# Delivery outcomes reported by the producer callbacks
+delivery_stats = {'delivered': 0, 'failed': 0}
+
+def delivery_report(err, msg):
+    """Count the broker acknowledgement of a produced signal"""
+    if err is not None:
+        delivery_stats['failed'] += 1
+        print(f"Signal delivery failed for {msg.topic()} key={msg.key()}: {err}")
+    else:
+        delivery_stats['delivered'] += 1
+
+def evaluate_position(forecast, threshold=IMBALANCE_THRESHOLD_MW, commitments=DAY_AHEAD_COMMITMENTS):
+    """
+    Compare a generation forecast with the day-ahead commitment of its region.
+
+    Returns:
+        Trading signal payload with signal_type SELL_SHORT, BUY_LONG or HOLD
+    """
+    region = forecast['region_id']
+    predicted_generation = forecast['predicted_mw']
+
+    committed_mw = commitments.get(region, 0.0)
+    imbalance = predicted_generation - committed_mw
+
+    # Trading Financial Decisions Execution Logic
+    if imbalance > threshold:
+        # Overproduction Risk: Extra power will drop Intraday Market clearing price.
+        # Strategy: Short futures or buy puts immediately to protect asset revenue.
+        signal_type = "SELL_SHORT"
+    elif imbalance < -threshold:
+        # Underproduction Deficit Penalty Risk: Forced to purchase balancing grid penalties.
+        # Strategy: Go Long on Intraday Hourly Options to secure replacement supply cheaply.
+        signal_type = "BUY_LONG"
+    else:
+        signal_type = "HOLD"
+
+    return {
+        "signal_timestamp": forecast['timestamp'],
+        "region_id": region,
+        "signal_type": signal_type,
+        "imbalance_mw": round(imbalance, 4),
+        "predicted_generation_mw": predicted_generation,
+        "committed_mw": committed_mw
+    }
+
+def main():
+    consumer = Consumer({
+        'bootstrap.servers': KAFKA_BROKERS,
+        'group.id': 'trading-strategy-group',
+        'auto.offset.reset': 'latest'
+    })
+    consumer.subscribe(['demand-forecasts-15m'])
+
+    producer = Producer({'bootstrap.servers': KAFKA_BROKERS, 'linger.ms': KAFKA_LINGER_MS})
+
+    print("Trading Engine Online. Evaluating positions against Keras model updates...")
+
+    try:
+        while True:
+            msg = consumer.poll(1.0)
+            producer.poll(0)
+            if msg is None:
+                continue
+            if msg.error():
+                continue
+
+            forecast = json.loads(msg.value().decode('utf-8'))
+            signal = evaluate_position(forecast)
+            imbalance = signal['imbalance_mw']
+
+            print(f"Region: {signal['region_id']} | Forecast: {signal['predicted_generation_mw']}MW | "
+                  f"Committed: {signal['committed_mw']}MW | Delta: {imbalance:.2f}MW")
+
+            if signal['signal_type'] == "SELL_SHORT":
+                print(f"[TRADE SIGNAL] ORDER -> SELL SHORT Intraday Derivative for {abs(imbalance):.2f} MW to hedge OVERPRODUCTION risk.")
+            elif signal['signal_type'] == "BUY_LONG":
+                print(f"[TRADE SIGNAL] ORDER -> BUY LONG Intraday Derivative for {abs(imbalance):.2f} MW to hedge UNDERPRODUCTION penalty.")
+
+            # Publish every evaluated position for the signal history
+            try:
+                producer.produce(
+                    SIGNALS_TOPIC,
+                    key=signal['region_id'].encode('utf-8'),
+                    value=json.dumps(signal).encode('utf-8'),
+                    callback=delivery_report
+                )
+            except BufferError as e:
+                delivery_stats['failed'] += 1
+                print(f"Error publishing trading signal: {e}")
+
+    except KeyboardInterrupt:
+        print("\nShutting down trading engine...")
+    finally:
+        consumer.close()
+        remaining = producer.flush(SHUTDOWN_FLUSH_TIMEOUT)
+        print(f"Signal deliveries: {delivery_stats['delivered']} delivered, "
+              f"{delivery_stats['failed'] + remaining} failed or undelivered")
+
+if __name__ == "__main__":
+    main()
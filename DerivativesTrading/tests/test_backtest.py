@@ -0,0 +1,117 @@
+import pytest
+import importlib.util
+import os
+import time
+import numpy as np
+import pandas as pd
+
+# Load by path: every service entry point is named main.py
+def load_service_module(name, filename):
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(os.path.dirname(__file__), '../services/trading_engine', filename))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+backtest = load_service_module('trading_backtest', 'backtest.py')
+trading_engine = load_service_module('trading_engine_main', 'main.py')
+
+def make_history(num_regions=3, num_ticks=2000, seed=0, nan_share=0.01):
+    rng = np.random.default_rng(seed)
+    actual = 40 + 10 * rng.standard_normal((num_regions, num_ticks))
+    history = {
+        'regions': [f"zone_{r}" for r in range(num_regions)],
+        'timestamps': np.arange(num_ticks),
+        'predicted': actual + 3 * rng.standard_normal((num_regions, num_ticks)),
+        'actual': actual,
+        'price': rng.uniform(-10, 150, (num_regions, num_ticks)),
+        'imbalance_price': None
+    }
+    history['predicted'][rng.random((num_regions, num_ticks)) < nan_share] = np.nan
+    return history
+
+def brute_force(history, thresholds, commitments, **settle_args):
+    """Tick-by-tick reference of the strategy settlement"""
+    shape = (len(thresholds), len(commitments), len(history['regions']))
+    pnl, trades = np.zeros(shape), np.zeros(shape, dtype=int)
+    for k, threshold in enumerate(thresholds):
+        for c, committed_row in enumerate(commitments):
+            for r, committed in enumerate(committed_row):
+                for t in range(len(history['timestamps'])):
+                    predicted, actual, price = (history[a][r, t] for a in ('predicted', 'actual', 'price'))
+                    if np.isnan(predicted) or np.isnan(actual) or np.isnan(price):
+                        continue
+                    imbalance_price = None if history['imbalance_price'] is None else history['imbalance_price'][r, t]
+                    signal = backtest.signals(predicted, committed, threshold)
+                    hedge = predicted - committed if signal != backtest.HOLD else 0.0
+                    pnl[k, c, r] += backtest.settle(actual, committed, hedge, price, imbalance_price, **settle_args)
+                    trades[k, c, r] += signal != backtest.HOLD
+    return pnl, trades
+
+def test_signals_match_trading_engine():
+    """Test the vectorized signal rule agrees with evaluate_position"""
+    rng = np.random.default_rng(1)
+    predicted = rng.uniform(30, 50, 500).round(1)
+    names = {backtest.SELL_SHORT: "SELL_SHORT", backtest.BUY_LONG: "BUY_LONG", backtest.HOLD: "HOLD"}
+    
+    vectorized = backtest.signals(predicted, 40.0, 2.5)
+    expected = [trading_engine.evaluate_position(
+        {"timestamp": "2026-07-19T07:00:00Z", "region_id": "zone", "predicted_mw": float(mw)},
+        threshold=2.5, commitments={"zone": 40.0})["signal_type"] for mw in predicted]
+    
+    assert [names[s] for s in vectorized] == expected
+
+@pytest.mark.parametrize('imbalance_prices', [False, True])
+def test_backtest_matches_tick_by_tick_settlement(imbalance_prices):
+    """Test the sorted cumulative evaluation equals settling every tick for every setting"""
+    history = make_history(num_regions=2, num_ticks=300)
+    if imbalance_prices:
+        history['imbalance_price'] = history['price'] * np.random.default_rng(2).uniform(0.5, 1.5, history['price'].shape)
+    thresholds = np.array([0.0, 1.0, 2.5, 5.0, 100.0])
+    commitments = np.array([[40.0, 38.0], [42.0, 45.0]])
+    
+    results = backtest.backtest(history, thresholds, commitments, imbalance_penalty=0.3, fee_eur_mwh=0.5)
+    pnl, trades = brute_force(history, thresholds, commitments, imbalance_penalty=0.3, fee_eur_mwh=0.5)
+    
+    np.testing.assert_allclose(results['pnl_eur'], pnl, rtol=1e-9)
+    np.testing.assert_array_equal(results['trades'], trades)
+    assert np.all(results['trades'][-1] == 0)
+    np.testing.assert_allclose(results['hedge_gain_eur'][-1], 0.0)
+
+def test_multi_year_grid_runs_in_seconds():
+    """Test three years of 15-minute data over 1000 settings per region finishes quickly"""
+    history = make_history(num_regions=4, num_ticks=3 * 365 * 96, nan_share=0.0)
+    thresholds = np.arange(0.0, 20.0, 0.1)
+    commitments = 40.0 + np.arange(-2.0, 3.0)[:, None] * np.ones(4)
+    
+    started = time.perf_counter()
+    results = backtest.backtest(history, thresholds, commitments)
+    elapsed = time.perf_counter() - started
+    
+    assert results['pnl_eur'].shape == (200, 5, 4)
+    assert elapsed < 10
+    assert np.all(np.diff(results['trades'], axis=0) <= 0)
+
+def test_load_history_csv(tmp_path):
+    """Test long-format history is pivoted to region x time arrays with gaps as NaN"""
+    path = tmp_path / "history.csv"
+    pd.DataFrame({
+        "timestamp": ["2026-07-19T07:00:00Z", "2026-07-19T07:15:00Z", "2026-07-19T07:00:00Z"],
+        "region_id": ["zone_a", "zone_a", "zone_b"],
+        "predicted_mw": [44.1, 39.0, 20.0],
+        "actual_mw": [43.0, 41.0, 21.0],
+        "price_eur": [80.0, 75.0, 80.0]
+    }).to_csv(path, index=False)
+    
+    history = backtest.load_history_csv(path)
+    
+    assert history['regions'] == ["zone_a", "zone_b"]
+    assert history['predicted'].shape == (2, 2)
+    assert history['imbalance_price'] is None
+    assert np.isnan(history['actual'][1, 1])
+    best = backtest.best_settings(backtest.backtest(history, [0.0, 2.5], [40.0, 20.0]), np.array([0.0, 2.5]),
+                                  np.array([40.0, 20.0]), history['regions'])
+    assert best[0]['region_id'] == "zone_a" and best[1]['trades'] == 0
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
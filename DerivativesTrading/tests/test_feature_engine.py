@@ -0,0 +1,74 @@
+import pytest
+import sys
+import os
+import numpy as np
+import pandas as pd
+
+# Add the online engine and the batch feature functions to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../services/lstm_service'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../training'))
+
+from feature_engine import OnlineFeatureEngine
+from feature_engineering import create_temporal_features, create_lagged_features, create_rolling_features
+
+def grid_history(num_ticks=3000, seed=0):
+    """15-minute history with daily seasonality, noise and a few sensor dropouts"""
+    rng = np.random.default_rng(seed)
+    steps = np.arange(num_ticks)
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2026-03-27 18:00', periods=num_ticks, freq='15min'),
+        'actual_mw': 120 + 40 * np.sin(2 * np.pi * steps / 96) + rng.normal(0, 5, num_ticks),
+        'wind_speed_ms': rng.uniform(0, 25, num_ticks)
+    })
+    df.loc[rng.choice(num_ticks, 10, replace=False), 'actual_mw'] = np.nan
+    return df
+
+def batch_features(df, columns, lags, windows):
+    df = create_temporal_features(df.copy())
+    df = create_lagged_features(df, columns, lags)
+    df = create_rolling_features(df, columns, windows)
+    return df
+
+@pytest.mark.parametrize('columns,lags,windows', [
+    (['actual_mw'], [4, 96], [12, 96]),
+    (['actual_mw', 'wind_speed_ms'], [1, 4, 672], [4, 96, 672])
+])
+def test_online_features_match_pandas(columns, lags, windows):
+    """Test streaming features equal the pandas batch features tick by tick"""
+    df = grid_history()
+    engine = OnlineFeatureEngine(columns, lags, windows)
+    
+    online = engine.update_many(df['timestamp'], df[columns].to_numpy())
+    expected = batch_features(df, columns, lags, windows)[engine.feature_names].to_numpy(dtype=np.float64)
+    
+    assert online.shape == expected.shape
+    np.testing.assert_array_equal(np.isnan(online), np.isnan(expected))
+    np.testing.assert_allclose(online, expected, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+def test_cyclical_lookup_tables_are_exact():
+    """Test table lookups give the values create_temporal_features computes"""
+    df = grid_history(num_ticks=7 * 96)
+    engine = OnlineFeatureEngine()
+    
+    online = engine.update_many(df['timestamp'], df[['actual_mw']].to_numpy())
+    expected = create_temporal_features(df.copy())
+    
+    for i, name in enumerate(['hour', 'day_of_week', 'month', 'hour_sin', 'hour_cos', 'day_sin', 'day_cos']):
+        np.testing.assert_array_equal(online[:, i], expected[name].to_numpy(dtype=np.float64))
+
+def test_engine_state_is_constant_size():
+    """Test state stays bounded by the largest lag or window however many ticks arrive"""
+    engine = OnlineFeatureEngine(['actual_mw'], [4, 96], [12, 96])
+    
+    for step in range(1000):
+        engine.update("2026-07-19T07:00:00Z", [float(step)])
+    features = dict(zip(engine.feature_names, engine.update("2026-07-19T07:15:00Z", [1000.0])))
+    
+    assert engine.history.shape == (97, 1)
+    assert features['actual_mw_lag_4'] == 996.0
+    assert features['actual_mw_rolling_mean_12'] == pytest.approx(994.5)
+    assert features['actual_mw_rolling_std_12'] == pytest.approx(np.std(np.arange(989, 1001), ddof=1))
+    assert features['hour'] == 7.0
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
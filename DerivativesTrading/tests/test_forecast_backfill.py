@@ -0,0 +1,78 @@
+import pytest
+import importlib.util
+import os
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+
+# Load by path: every service entry point is named main.py
+spec = importlib.util.spec_from_file_location(
+    'forecast_backfill_main', os.path.join(os.path.dirname(__file__), '../services/forecast_backfill/main.py'))
+backfill = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(backfill)
+
+T0 = datetime(2026, 7, 19, tzinfo=timezone.utc)
+
+def make_connection(fetches, rowcount=4):
+    """Connection whose cursor answers fetchone() from a script and records every statement"""
+    connection = MagicMock()
+    connection.autocommit = False
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.fetchone.side_effect = fetches
+    cursor.rowcount = rowcount
+    cursor.statements = []
+    cursor.execute.side_effect = lambda sql, params=None: cursor.statements.append(
+        (" ".join(sql.split()), params, connection.autocommit))
+    return connection, cursor
+
+def test_chunk_ranges():
+    """Test a window is split into contiguous chunks ending at the window end"""
+    ranges = backfill.chunk_ranges(T0, T0 + timedelta(hours=30), timedelta(hours=12))
+    
+    assert ranges == [
+        (T0, T0 + timedelta(hours=12)),
+        (T0 + timedelta(hours=12), T0 + timedelta(hours=24)),
+        (T0 + timedelta(hours=24), T0 + timedelta(hours=30))
+    ]
+    assert backfill.chunk_ranges(T0, T0) == []
+
+def test_first_run_starts_at_oldest_actual():
+    """Test the first run covers all actuals, one UPDATE and watermark per chunk"""
+    latest = T0 + timedelta(hours=36)
+    connection, cursor = make_connection([None, (T0,), (latest,)])
+    
+    results = backfill.run_backfill(connection, chunk=timedelta(hours=24))
+    
+    end = latest + timedelta(microseconds=1)
+    assert [(start, stop) for start, stop, _ in results] == [(T0, T0 + timedelta(hours=24)), (T0 + timedelta(hours=24), end)]
+    assert results[0][2] == 4
+    
+    updates = [params for sql, params, _ in cursor.statements if sql.startswith("UPDATE demand_forecasts")]
+    watermarks = [params['watermark'] for sql, params, _ in cursor.statements if sql.startswith("INSERT INTO job_watermarks")]
+    assert [(p['start'], p['end']) for p in updates] == [(start, stop) for start, stop, _ in results]
+    assert watermarks == [T0 + timedelta(hours=24), end]
+    # Chunk updates and their watermark are committed together
+    assert connection.commit.call_count == 3
+
+def test_run_resumes_from_watermark_with_lookback():
+    """Test later runs only join actuals after the watermark, minus the late-arrival allowance"""
+    watermark = T0 + timedelta(hours=5)
+    connection, cursor = make_connection([(watermark,), (watermark + timedelta(minutes=15),)])
+    
+    results = backfill.run_backfill(connection, lookback=timedelta(minutes=60))
+    
+    assert len(results) == 1
+    assert results[0][0] == watermark - timedelta(minutes=60)
+    refresh = [(params, autocommit) for sql, params, autocommit in cursor.statements
+               if sql.startswith("CALL refresh_continuous_aggregate('hourly_grid_stats'")]
+    assert refresh == [({'start': results[0][0], 'end': results[0][1]}, True)]
+    assert connection.autocommit is False
+
+def test_run_without_actuals_does_nothing():
+    """Test an empty grid_consumption table leaves the watermark and aggregate untouched"""
+    connection, cursor = make_connection([None, (None,)])
+    
+    assert backfill.run_backfill(connection) == []
+    assert not any(sql.startswith(("UPDATE", "INSERT", "CALL")) for sql, _, _ in cursor.statements)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,381 @@
+import pytest
+import asyncio
+import importlib.util
+import json
+import os
+import shutil
+import socket
+import subprocess
+import threading
+import time
+from datetime import date, datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import Mock, patch
+from urllib.parse import parse_qs, urlparse
+
+import aiomqtt
+import httpx
+
+# Load by path: every service entry point is named main.py
+spec = importlib.util.spec_from_file_location(
+    'ingestion_main', os.path.join(os.path.dirname(__file__), '../services/ingestion_service/main.py'))
+ingestion = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(ingestion)
+
+def test_producer_batches_deliveries():
+    """Test producer is configured to batch instead of sending each message alone"""
+    assert ingestion.PRODUCER_CONFIG['linger.ms'] > 0
+    assert ingestion.PRODUCER_CONFIG['batch.num.messages'] > 1
+
+def test_publish_to_kafka_is_asynchronous():
+    """Test publishing queues the message with a callback and does not flush"""
+    producer = Mock()
+    payload = {"region_id": "wind_farm_zone_1", "actual_mw": 42.5}
+    
+    ingestion.publish_to_kafka(producer, 'grid-consumption-raw', payload['region_id'], payload)
+    
+    producer.produce.assert_called_once()
+    assert producer.produce.call_args.kwargs['callback'] is ingestion.delivery_report
+    producer.poll.assert_called_once_with(0)
+    producer.flush.assert_not_called()
+
+def test_publish_to_kafka_counts_produce_errors():
+    """Test a message that cannot be queued is counted as failed"""
+    producer = Mock()
+    producer.produce.side_effect = [BufferError(), BufferError()]
+    
+    with patch.dict(ingestion.delivery_stats, {'delivered': 0, 'failed': 0}):
+        ingestion.publish_to_kafka(producer, 'grid-consumption-raw', 'zone', {})
+        assert ingestion.delivery_stats['failed'] == 1
+
+def test_delivery_report_counts_outcomes():
+    """Test delivery callbacks update the error counters"""
+    with patch.dict(ingestion.delivery_stats, {'delivered': 0, 'failed': 0}):
+        ingestion.delivery_report(None, Mock())
+        ingestion.delivery_report("Broker: Message timed out", Mock())
+        assert ingestion.delivery_stats == {'delivered': 1, 'failed': 1}
+
+DELIVERY_DATE = date(2026, 7, 19)
+
+def day_ahead_prices(area, price):
+    return {
+        "deliveryDateCET": DELIVERY_DATE.isoformat(),
+        "deliveryAreas": [area],
+        "multiAreaEntries": [
+            {"deliveryStart": "2026-07-18T22:00:00Z", "deliveryEnd": "2026-07-18T22:15:00Z", "entryPerArea": {area: price}},
+            {"deliveryStart": "2026-07-18T22:15:00Z", "deliveryEnd": "2026-07-18T22:30:00Z", "entryPerArea": {area: price + 1}}
+        ]
+    }
+
+class StubMarketHandler(BaseHTTPRequestHandler):
+    """Day-ahead price endpoint answering from server.prices[(area, date)] = (etag, body)"""
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        key = (query['deliveryAreas'][0], query['deliveryDate'][0])
+        self.server.requests.append((key, self.headers.get('If-None-Match')))
+        time.sleep(self.server.delay)
+
+        if key not in self.server.prices:
+            self.send_response(204)
+            self.end_headers()
+            return
+        etag, body = self.server.prices[key]
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        payload = body if isinstance(body, bytes) else json.dumps(body).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.send_header('ETag', etag)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+@pytest.fixture
+def market_api():
+    """Local stub of the Nord Pool day-ahead price API"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubMarketHandler)
+    server.prices = {}
+    server.requests = []
+    server.delay = 0.0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    with patch.object(ingestion, 'NORD_POOL_API', f'http://127.0.0.1:{server.server_port}/prices'):
+        yield server
+    server.shutdown()
+    server.server_close()
+
+def fetch_rounds(cache, areas, rounds):
+    """Run several market polls over one pooled client"""
+    async def run():
+        async with httpx.AsyncClient(timeout=5) as client:
+            return [await ingestion.fetch_all_markets(client, cache, areas, [DELIVERY_DATE]) for _ in range(rounds)]
+    return asyncio.run(run())
+
+def test_delivery_areas_fetched_concurrently(market_api):
+    """Test all delivery areas are requested at once rather than one after another"""
+    areas = ["FI", "SE3", "EE", "NO1"]
+    for i, area in enumerate(areas):
+        market_api.prices[(area, DELIVERY_DATE.isoformat())] = ('"v1"', day_ahead_prices(area, 40.0 + i))
+    market_api.delay = 0.3
+    
+    started = time.perf_counter()
+    [results] = fetch_rounds(ingestion.DayAheadPriceCache(), areas, 1)
+    elapsed = time.perf_counter() - started
+    
+    assert len(market_api.requests) == 4
+    assert elapsed < 0.3 * 4 / 2
+    data, fresh = results[("SE3", DELIVERY_DATE)]
+    assert fresh
+    assert data["multiAreaEntries"][0]["entryPerArea"]["SE3"] == 41.0
+
+def test_published_prices_are_not_requested_again(market_api):
+    """Test a delivery date with published prices is served from the cache"""
+    market_api.prices[("FI", DELIVERY_DATE.isoformat())] = ('"v1"', day_ahead_prices("FI", 40.0))
+    
+    first, second = fetch_rounds(ingestion.DayAheadPriceCache(), ["FI"], 2)
+    
+    assert len(market_api.requests) == 1
+    assert first[("FI", DELIVERY_DATE)][1] is True
+    assert second[("FI", DELIVERY_DATE)] == (first[("FI", DELIVERY_DATE)][0], False)
+
+def test_unpublished_prices_are_revalidated_conditionally(market_api):
+    """Test dates awaiting the auction are polled with If-None-Match until prices appear"""
+    key = ("FI", DELIVERY_DATE.isoformat())
+    market_api.prices[key] = ('"v0"', {"deliveryDateCET": key[1], "multiAreaEntries": []})
+    cache = ingestion.DayAheadPriceCache()
+    
+    [first], [second] = fetch_rounds(cache, ["FI"], 1), fetch_rounds(cache, ["FI"], 1)
+    market_api.prices[key] = ('"v1"', day_ahead_prices("FI", 40.0))
+    [third] = fetch_rounds(cache, ["FI"], 1)
+    
+    assert [etag for _, etag in market_api.requests] == [None, '"v0"', '"v0"']
+    assert first[("FI", DELIVERY_DATE)][1] is False
+    assert second[("FI", DELIVERY_DATE)][1] is False
+    assert third[("FI", DELIVERY_DATE)][1] is True
+    assert cache.get("FI", DELIVERY_DATE)['etag'] == '"v1"'
+
+def test_unreadable_price_responses_are_skipped_and_not_cached(market_api):
+    """Test a non-JSON body or an unexpected schema only fails its own area and is fetched again"""
+    date_key = DELIVERY_DATE.isoformat()
+    market_api.prices[("FI", date_key)] = ('"v1"', b"<html>maintenance</html>")
+    market_api.prices[("SE3", date_key)] = ('"v1"', {"multiAreaEntries": [{"deliveryStart": "2026-07-18T22:00:00Z"}]})
+    market_api.prices[("EE", date_key)] = ('"v1"', day_ahead_prices("EE", 40.0))
+    cache = ingestion.DayAheadPriceCache()
+    
+    [first] = fetch_rounds(cache, ["FI", "SE3", "EE"], 1)
+    market_api.prices[("FI", date_key)] = ('"v1"', day_ahead_prices("FI", 42.0))
+    [second] = fetch_rounds(cache, ["FI"], 1)
+    
+    assert first[("FI", DELIVERY_DATE)] == (None, False)
+    assert first[("SE3", DELIVERY_DATE)] == (None, False)
+    assert first[("EE", DELIVERY_DATE)][1] is True
+    assert cache.get("SE3", DELIVERY_DATE) is None
+    # Nothing was cached for FI, so the retry is unconditional
+    assert market_api.requests[-1] == (("FI", date_key), None)
+    assert second[("FI", DELIVERY_DATE)][1] is True
+
+class StopLoop(BaseException):
+    pass
+
+def test_market_loop_survives_errors():
+    """Test a failing market poll is retried instead of ending the loop"""
+    producer = Mock()
+    sleeps = []
+    
+    async def fake_sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 2:
+            raise StopLoop()
+    
+    fetches = [RuntimeError("unexpected response"), {("FI", DELIVERY_DATE): (day_ahead_prices("FI", 40.0), True)}]
+    
+    async def fake_fetch_all_markets(client, cache, areas, delivery_dates):
+        result = fetches.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    with patch.object(ingestion, 'fetch_all_markets', fake_fetch_all_markets), \
+            patch.object(ingestion.asyncio, 'sleep', fake_sleep):
+        with pytest.raises(StopLoop):
+            asyncio.run(ingestion.market_loop(producer, None, ingestion.DayAheadPriceCache(), ["FI"]))
+    
+    assert sleeps == [60, ingestion.MARKET_POLL_INTERVAL]
+    assert producer.produce.call_count == 2
+
+def test_price_events():
+    """Test each delivery period becomes one market tick"""
+    events = list(ingestion.price_events("FI", day_ahead_prices("FI", 40.0)))
+    
+    assert events[1] == {
+        "timestamp": "2026-07-18T22:15:00Z",
+        "delivery_end": "2026-07-18T22:30:00Z",
+        "delivery_area": "FI",
+        "clearing_price_eur": 41.0
+    }
+
+T0 = datetime(2026, 7, 19, 7, 0, tzinfo=timezone.utc).timestamp()
+
+def scada_reading(actual_mw, wind_speed_ms=12.0, solar_irradiance=150.0):
+    return {"actual_mw": actual_mw, "wind_speed_ms": wind_speed_ms, "solar_irradiance": solar_irradiance}
+
+def test_bar_aggregates_readings_of_one_interval():
+    """Test a bar holds mean, min, max and last of each metric and closes on the next interval"""
+    aggregator = ingestion.BarAggregator(interval_s=900, grace_s=5)
+    
+    assert aggregator.add("zone_a", T0 + 10, scada_reading(40.0)) == []
+    assert aggregator.add("zone_a", T0 + 890, scada_reading(42.0, wind_speed_ms=14.0)) == []
+    # Out-of-order reading inside the interval: counted, but not the latest value
+    assert aggregator.add("zone_a", T0 + 400, scada_reading(47.0)) == []
+    [bar] = aggregator.add("zone_a", T0 + 901, scada_reading(50.0))
+    
+    assert bar["timestamp"] == "2026-07-19T07:00:00Z"
+    assert bar["region_id"] == "zone_a"
+    assert bar["sample_count"] == 3
+    assert bar["actual_mw"] == 43.0
+    assert (bar["actual_mw_min"], bar["actual_mw_max"], bar["actual_mw_last"]) == (40.0, 47.0, 42.0)
+    assert bar["wind_speed_ms_last"] == 14.0
+
+def test_bar_closes_after_grace_period_once():
+    """Test silent regions are closed by the clock and late readings never reopen a bar"""
+    aggregator = ingestion.BarAggregator(interval_s=900, grace_s=5)
+    aggregator.add("zone_a", T0 + 10, scada_reading(40.0))
+    aggregator.add("zone_b", T0 + 20, scada_reading(30.0))
+    
+    assert aggregator.close_due(T0 + 904) == []
+    closed = aggregator.close_due(T0 + 905)
+    
+    assert sorted(bar["region_id"] for bar in closed) == ["zone_a", "zone_b"]
+    assert aggregator.close_due(T0 + 2000) == []
+    assert aggregator.add("zone_a", T0 + 30, scada_reading(41.0)) == []
+    assert aggregator.late_readings == 1
+    assert aggregator.close_due(T0 + 2000) == []
+
+def test_reading_timestamp():
+    """Test reading timestamps accept ISO strings and epoch seconds, falling back to receive time"""
+    assert ingestion.reading_timestamp({"timestamp": "2026-07-19T07:00:00Z"}, T0) == T0
+    assert ingestion.reading_timestamp({"timestamp": T0 + 1}, T0) == T0 + 1
+    assert ingestion.reading_timestamp({}, 123.0) == 123.0
+    assert ingestion.reading_timestamp({"timestamp": 1e300}, 123.0) == 123.0
+
+def test_future_reading_timestamps_fall_back_to_receive_time():
+    """Test a device clock far ahead cannot open a future bar that makes real readings late"""
+    assert ingestion.reading_timestamp({"timestamp": T0 + 900}, T0, max_ahead_s=900) == T0 + 900
+    assert ingestion.reading_timestamp({"timestamp": "2099-01-01T00:00:00Z"}, T0, max_ahead_s=900) == T0
+    
+    aggregator = ingestion.BarAggregator(interval_s=900, grace_s=5)
+    topic = "scada/zone_a/telemetry"
+    future = {**scada_reading(90.0), "timestamp": "2099-01-01T00:00:00Z"}
+    
+    ingestion.add_scada_message(aggregator, topic, json.dumps(future).encode(), T0 + 10)
+    for second in range(20, 120, 10):
+        ingestion.add_scada_message(aggregator, topic, json.dumps({**scada_reading(40.0), "timestamp": T0 + second}).encode(),
+                                    T0 + second)
+    [bar] = aggregator.close_due(T0 + 905)
+    
+    assert aggregator.late_readings == 0
+    assert bar["timestamp"] == "2026-07-19T07:00:00Z"
+    assert bar["sample_count"] == 11
+
+def test_invalid_scada_messages_are_skipped():
+    """Test malformed readings are counted and skipped without touching the open bar"""
+    aggregator = ingestion.BarAggregator(interval_s=900, grace_s=5)
+    topic = "scada/zone_a/telemetry"
+    good = {**scada_reading(40.0), "timestamp": T0 + 10}
+    invalid = [
+        (topic, b"not json"),
+        (topic, b"42"),
+        (topic, b"[1, 2]"),
+        (topic, json.dumps({**good, "actual_mw": "n/a"}).encode()),
+        (topic, json.dumps({**good, "wind_speed_ms": [12.0]}).encode()),
+        (topic, json.dumps({**good, "actual_mw": float("nan")}).encode()),
+        ("scada", json.dumps(good).encode()),
+        ("scada//telemetry", json.dumps(good).encode())
+    ]
+    
+    assert ingestion.add_scada_message(aggregator, topic, json.dumps(good).encode(), T0) == []
+    for bad_topic, payload in invalid:
+        assert ingestion.add_scada_message(aggregator, bad_topic, payload, T0) == []
+    assert ingestion.add_scada_message(aggregator, topic, json.dumps({**good, "actual_mw": 44.0}).encode(), T0) == []
+    [bar] = aggregator.close_due(T0 + 905)
+    
+    assert aggregator.invalid_readings == len(invalid)
+    assert bar["sample_count"] == 2
+    assert bar["actual_mw"] == 42.0
+    assert bar["wind_speed_ms"] == 12.0
+
+@pytest.fixture
+def mqtt_broker(tmp_path):
+    """Local mosquitto broker, or the broker given as MQTT_TEST_BROKER=host:port"""
+    address = os.getenv("MQTT_TEST_BROKER")
+    if address:
+        host, port = address.rsplit(":", 1)
+        yield host, int(port)
+        return
+    binary = shutil.which("mosquitto")
+    if binary is None:
+        pytest.skip("mosquitto is not installed (or set MQTT_TEST_BROKER=host:port)")
+    
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    config = tmp_path / "mosquitto.conf"
+    config.write_text(f"listener {port} 127.0.0.1\nallow_anonymous true\n")
+    process = subprocess.Popen([binary, "-c", str(config)], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+                break
+            except OSError:
+                if time.monotonic() > deadline:
+                    pytest.fail("mosquitto did not start")
+                time.sleep(0.05)
+        yield "127.0.0.1", port
+    finally:
+        process.terminate()
+        process.wait()
+
+def test_scada_bars_over_mqtt(mqtt_broker):
+    """Test readings published to the broker come out as one bar per closed interval"""
+    host, port = mqtt_broker
+    producer = Mock()
+    aggregator = ingestion.BarAggregator(interval_s=900, grace_s=5)
+    topic = f"scada/zone_{os.getpid()}/telemetry"
+    readings = [("07:00:10", 40.0), ("07:07:00", 44.0), ("07:14:59", 42.0), ("07:15:01", 50.0)]
+    
+    async def run():
+        subscriber = asyncio.create_task(ingestion.scada_loop(producer, aggregator, host, port, "scada/+/telemetry"))
+        await asyncio.sleep(0.5)
+        async with aiomqtt.Client(host, port) as client:
+            # A bad publisher must not stop the feed for the readings after it
+            await client.publish(topic, "42", qos=1)
+            await client.publish(topic, json.dumps(scada_reading("n/a")), qos=1)
+            for clock, actual_mw in readings:
+                # Past readings, so the receive-time check never replaces their timestamps
+                payload = {**scada_reading(actual_mw), "timestamp": f"2025-07-19T{clock}Z"}
+                await client.publish(topic, json.dumps(payload), qos=1)
+        deadline = time.monotonic() + 5
+        while not producer.produce.called and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        subscriber.cancel()
+    
+    asyncio.run(run())
+    
+    assert aggregator.invalid_readings == 2
+    producer.produce.assert_called_once()
+    bar = json.loads(producer.produce.call_args.kwargs["value"])
+    assert producer.produce.call_args.args[0] == "grid-consumption-raw"
+    assert bar["timestamp"] == "2025-07-19T07:00:00Z"
+    assert bar["sample_count"] == 3
+    assert (bar["actual_mw"], bar["actual_mw_min"], bar["actual_mw_max"], bar["actual_mw_last"]) == (42.0, 40.0, 44.0, 42.0)
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -7,6 +7,9 @@ import os
 # Add services to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../services/lstm_service'))
 
+# Import now, before other test modules put their own main.py first on the path
+import main
+
 def test_scale_features():
     """Test feature scaling function"""
     from main import scale_features, SCALER_MIN, SCALER_MAX
@@ -52,5 +55,175 @@ def test_kafka_message_parsing():
     assert isinstance(sample_message['actual_mw'], float)
     assert sample_message['actual_mw'] > 0
 
+def make_tick(region, hour, actual_mw=100.0):
+    msg = Mock()
+    msg.error.return_value = None
+    msg.value.return_value = json.dumps({
+        "timestamp": f"2026-07-19T{hour:02d}:00:00Z",
+        "region_id": region,
+        "actual_mw": actual_mw,
+        "wind_speed_ms": 12.4,
+        "solar_irradiance": 150.0
+    }).encode('utf-8')
+    return msg
+
+def test_region_windows_ring_buffer():
+    """Test that windows stay chronological across wrap-around and capacity growth"""
+    from main import RegionWindows
+    import numpy as np
+    
+    windows = RegionWindows(capacity=1, window_size=4, num_features=3)
+    for step in range(6):
+        ready = windows.append("zone_a", [step, step, step])
+        windows.append("zone_b", [10 + step, 0, 0])
+    
+    assert ready
+    assert windows.capacity == 2
+    batch = windows.windows([windows.slots["zone_b"], windows.slots["zone_a"]])
+    assert batch.shape == (2, 4, 3)
+    assert batch.dtype == np.float32
+    np.testing.assert_array_equal(batch[0, :, 0], [12, 13, 14, 15])
+    np.testing.assert_array_equal(batch[1, :, 0], [2, 3, 4, 5])
+
+def test_ready_regions_forecast_in_one_batch():
+    """Test that regions ready in the same poll cycle share one predict call"""
+    from main import RegionWindows, process_messages, scale_features, WINDOW_SIZE
+    import numpy as np
+    
+    windows = RegionWindows()
+    regions = [f"zone_{i}" for i in range(3)]
+    for region in regions:
+        for _ in range(WINDOW_SIZE - 1):
+            windows.append(region, scale_features([50.0, 12.4, 150.0]))
+    
+    model = Mock()
+    model.predict_on_batch.side_effect = lambda batch: np.full((len(batch), 1), 0.25)
+    
+    forecasts = process_messages([make_tick(region, 7) for region in regions], windows, model)
+    
+    assert model.predict_on_batch.call_count == 1
+    batch = model.predict_on_batch.call_args[0][0]
+    assert batch.shape == (3, WINDOW_SIZE, 3)
+    np.testing.assert_allclose(batch[:, -1, 0], 0.5, rtol=1e-6)
+    assert [f["region_id"] for f in forecasts] == regions
+    assert forecasts[0]["predicted_mw"] == 50.0
+    assert forecasts[0]["forecast_target_time"] == "2026-07-19T07:15:00Z"
+
+def test_region_ticking_twice_in_one_cycle():
+    """Test that a second tick of a region in one cycle still yields two forecasts"""
+    from main import RegionWindows, process_messages, scale_features, WINDOW_SIZE
+    import numpy as np
+    
+    windows = RegionWindows()
+    for _ in range(WINDOW_SIZE - 1):
+        windows.append("zone_a", scale_features([50.0, 12.4, 150.0]))
+    
+    model = Mock()
+    model.predict_on_batch.side_effect = lambda batch: batch[:, -1, :1]
+    
+    forecasts = process_messages([make_tick("zone_a", 7, 100.0), make_tick("zone_a", 8, 20.0)], windows, model)
+    
+    assert model.predict_on_batch.call_count == 2
+    assert [f["predicted_mw"] for f in forecasts] == [100.0, 20.0]
+
+def test_malformed_ticks_are_skipped():
+    """Test that malformed ticks are skipped and the rest of the cycle is still forecast"""
+    from main import RegionWindows, process_messages, scale_features, WINDOW_SIZE
+    import numpy as np
+    
+    windows = RegionWindows()
+    for region in ("zone_a", "zone_b"):
+        for _ in range(WINDOW_SIZE - 1):
+            windows.append(region, scale_features([50.0, 12.4, 150.0]))
+    
+    bad_ticks = []
+    for value in [b"not json", b"42", b'{"region_id": "zone_b"}', b'{"region_id": ["zone_b"], "timestamp": "t"}']:
+        bad = Mock()
+        bad.error.return_value = None
+        bad.value.return_value = value
+        bad_ticks.append(bad)
+    bad_tick = make_tick("zone_b", 7, "n/a")
+    
+    model = Mock()
+    model.predict_on_batch.side_effect = lambda batch: batch[:, -1, :1]
+    
+    forecasts = process_messages([make_tick("zone_a", 7, 100.0)] + bad_ticks + [bad_tick, make_tick("zone_b", 7, 20.0)],
+                                 windows, model)
+    
+    assert model.predict_on_batch.call_count == 1
+    assert [(f["region_id"], f["predicted_mw"]) for f in forecasts] == [("zone_a", 100.0), ("zone_b", 20.0)]
+    assert windows.counts[windows.slots["zone_b"]] == WINDOW_SIZE
+
+def test_ticks_with_invalid_timestamps_are_skipped():
+    """Test that an unparseable tick timestamp skips that tick instead of aborting the cycle"""
+    from main import RegionWindows, process_messages, scale_features, WINDOW_SIZE
+    
+    windows = RegionWindows()
+    for region in ("zone_a", "zone_b", "zone_c"):
+        for _ in range(WINDOW_SIZE - 1):
+            windows.append(region, scale_features([50.0, 12.4, 150.0]))
+    
+    bad_ticks = []
+    for timestamp in ["not-a-time", "", 1752908400]:
+        bad = Mock()
+        bad.error.return_value = None
+        bad.value.return_value = json.dumps({
+            "timestamp": timestamp,
+            "region_id": "zone_b",
+            "actual_mw": 80.0,
+            "wind_speed_ms": 12.4,
+            "solar_irradiance": 150.0
+        }).encode('utf-8')
+        bad_ticks.append(bad)
+    
+    model = Mock()
+    model.predict_on_batch.side_effect = lambda batch: batch[:, -1, :1]
+    
+    forecasts = process_messages([make_tick("zone_a", 7, 100.0)] + bad_ticks + [make_tick("zone_c", 7, 20.0)],
+                                 windows, model)
+    
+    assert [(f["region_id"], f["forecast_target_time"]) for f in forecasts] == [
+        ("zone_a", "2026-07-19T07:15:00Z"), ("zone_c", "2026-07-19T07:15:00Z")]
+    assert windows.counts[windows.slots["zone_b"]] == WINDOW_SIZE - 1
+
+def test_publish_forecasts_without_flush():
+    """Test that forecasts are queued with a delivery callback and polled, never flushed"""
+    from main import publish_forecasts, delivery_report
+    
+    producer = Mock()
+    forecasts = [{"region_id": f"zone_{i}", "predicted_mw": 40.0 + i} for i in range(3)]
+    
+    publish_forecasts(producer, forecasts)
+    
+    assert producer.produce.call_count == 3
+    assert producer.produce.call_args.kwargs["callback"] is delivery_report
+    assert producer.produce.call_args.kwargs["key"] == b"zone_2"
+    producer.poll.assert_called_once_with(0)
+    producer.flush.assert_not_called()
+
+def test_publish_forecasts_retries_when_queue_full():
+    """Test that a full local queue is drained by polling before producing again"""
+    from main import publish_forecasts
+    
+    producer = Mock()
+    producer.produce.side_effect = [BufferError(), None]
+    
+    publish_forecasts(producer, [{"region_id": "zone_a", "predicted_mw": 40.0}])
+    
+    assert producer.produce.call_count == 2
+    assert producer.poll.call_args_list[0].args == (1.0,)
+
+@patch.dict('main.delivery_stats', {'delivered': 0, 'failed': 0})
+def test_delivery_report_counts_outcomes():
+    """Test delivery callbacks update the error counters"""
+    from main import delivery_report, delivery_stats
+    
+    msg = Mock()
+    delivery_report(None, msg)
+    delivery_report(None, msg)
+    delivery_report("Broker: Message timed out", msg)
+    
+    assert delivery_stats == {'delivered': 2, 'failed': 1}
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
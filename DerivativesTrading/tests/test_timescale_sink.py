@@ -0,0 +1,200 @@
+import pytest
+import importlib.util
+import json
+import os
+from unittest.mock import MagicMock, Mock
+
+# Load by path: every service entry point is named main.py
+spec = importlib.util.spec_from_file_location(
+    'timescale_sink_main', os.path.join(os.path.dirname(__file__), '../services/timescale_sink/main.py'))
+sink_main = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(sink_main)
+
+def make_message(topic, payload):
+    msg = Mock()
+    msg.error.return_value = None
+    msg.topic.return_value = topic
+    msg.value.return_value = json.dumps(payload).encode('utf-8')
+    return msg
+
+def make_tick(region, minute, actual_mw=42.5):
+    return make_message('grid-consumption-raw', {
+        "timestamp": f"2026-07-19T07:{minute:02d}:00Z",
+        "region_id": region,
+        "actual_mw": actual_mw,
+        "wind_speed_ms": 12.4,
+        "solar_irradiance": 150.0
+    })
+
+def make_connection():
+    connection = MagicMock()
+    connection.closed = 0
+    cursor = connection.cursor.return_value.__enter__.return_value
+    cursor.copied = []
+    cursor.copy_expert.side_effect = lambda sql, buffer: cursor.copied.append((sql, buffer.read()))
+    return connection, cursor
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+    
+    def __call__(self):
+        return self.now
+
+def test_writer_copies_deduplicated_rows_and_upserts():
+    """Test one COPY and one upsert per table, with the latest event per key"""
+    connection, cursor = make_connection()
+    writer = sink_main.TimescaleWriter(lambda: connection)
+    
+    writer.add('grid-consumption-raw', json.loads(make_tick('zone_a', 0, 40.0).value()))
+    writer.add('grid-consumption-raw', json.loads(make_tick('zone_a', 0, 41.0).value()))
+    writer.add('grid-consumption-raw', json.loads(make_tick('zone_b', 0).value()))
+    writer.add('demand-forecasts-15m', {
+        "timestamp": "2026-07-19T07:00:00Z",
+        "forecast_target_time": "2026-07-19T07:15:00Z",
+        "region_id": "zone_a",
+        "predicted_mw": 44.1
+    })
+    
+    assert writer.flush() == 3
+    assert writer.pending == 0
+    assert len(cursor.copied) == 2
+    
+    copy_sql, copied_rows = cursor.copied[0]
+    assert copy_sql.startswith("COPY grid_consumption_staging (timestamp, region_id, actual_mw")
+    assert copied_rows.splitlines() == [
+        "2026-07-19T07:00:00Z,zone_a,41.0,12.4,150.0",
+        "2026-07-19T07:00:00Z,zone_b,42.5,12.4,150.0"
+    ]
+    
+    upserts = [c.args[0] for c in cursor.execute.call_args_list if c.args[0].startswith("INSERT")]
+    assert "ON CONFLICT (forecast_timestamp, target_timestamp, region_id)" in upserts[1]
+    # Backfilled columns are never overwritten by the forecast stream
+    assert "actual_mw" not in upserts[1]
+    connection.commit.assert_called()
+
+def test_writer_keeps_rows_when_write_fails():
+    """Test a failed transaction is rolled back and its rows stay buffered"""
+    connection, cursor = make_connection()
+    def execute(sql):
+        if sql.startswith("INSERT"):
+            raise RuntimeError("deadlock")
+    cursor.execute.side_effect = execute
+    writer = sink_main.TimescaleWriter(lambda: connection)
+    writer.add('grid-consumption-raw', json.loads(make_tick('zone_a', 0).value()))
+    
+    with pytest.raises(RuntimeError):
+        writer.flush()
+    
+    connection.rollback.assert_called_once()
+    assert writer.pending == 1
+
+def test_sink_writes_when_batch_is_full_or_old():
+    """Test batches are bounded by size and by time, committing offsets after each write"""
+    consumer = Mock()
+    writer = Mock(pending=0)
+    clock = FakeClock()
+    sink = sink_main.TimescaleSink(consumer, writer, batch_size=3, batch_interval=2.0, clock=clock)
+    
+    def add(topic, event):
+        writer.pending += 1
+    writer.add.side_effect = add
+    def flush():
+        written, writer.pending = writer.pending, 0
+        return written
+    writer.flush.side_effect = flush
+    
+    consumer.consume.return_value = [make_tick('zone_a', m) for m in range(3)]
+    sink.step()
+    consumer.consume.return_value = []
+    sink.step()
+    assert writer.flush.call_count == 1
+    consumer.commit.assert_called_once_with(asynchronous=False)
+    
+    consumer.consume.return_value = [make_tick('zone_a', 3)]
+    sink.step()
+    consumer.consume.return_value = []
+    clock.now = 1.0
+    sink.step()
+    assert writer.flush.call_count == 1
+    clock.now = 2.5
+    sink.step()
+    assert writer.flush.call_count == 2
+    assert sink.stats['written'] == 4
+
+def test_sink_pauses_consumption_while_database_lags():
+    """Test failed writes back off and pause the consumer once the buffer is full"""
+    consumer = Mock()
+    writer = Mock(pending=0)
+    clock = FakeClock()
+    sink = sink_main.TimescaleSink(consumer, writer, batch_size=2, max_pending=4, clock=clock)
+    
+    def add(topic, event):
+        writer.pending += 1
+    writer.add.side_effect = add
+    writer.flush.side_effect = RuntimeError("connection refused")
+    
+    consumer.consume.return_value = [make_tick('zone_a', m) for m in range(4)]
+    sink.step()
+    consumer.consume.return_value = []
+    sink.step()
+    
+    assert sink.stats['write_failures'] == 1
+    assert sink.paused
+    consumer.pause.assert_called_once()
+    consumer.commit.assert_not_called()
+    # Paused consumers keep polling to stay in the group
+    assert consumer.consume.call_count == 2
+    
+    # Retries wait for the backoff
+    sink.step()
+    assert writer.flush.call_count == 1
+    
+    def recover():
+        writer.pending = 0
+        return 4
+    writer.flush.side_effect = recover
+    clock.now = sink.retry_at
+    sink.step()
+    
+    assert not sink.paused
+    consumer.resume.assert_called_once()
+    consumer.commit.assert_called_once_with(asynchronous=False)
+
+def test_invalid_events_are_skipped():
+    """Test events missing required fields are counted and not buffered"""
+    connection, _ = make_connection()
+    writer = sink_main.TimescaleWriter(lambda: connection)
+    sink = sink_main.TimescaleSink(Mock(), writer)
+    
+    sink.add_messages([make_message('grid-consumption-raw', {"region_id": "zone_a"}), make_tick('zone_a', 0)])
+    
+    assert sink.stats == {'consumed': 1, 'written': 0, 'invalid': 1, 'write_failures': 0}
+    assert writer.pending == 1
+
+def test_events_with_malformed_fields_are_skipped():
+    """Test values COPY would reject are counted as invalid instead of poisoning the batch"""
+    connection, cursor = make_connection()
+    writer = sink_main.TimescaleWriter(lambda: connection)
+    sink = sink_main.TimescaleSink(Mock(), writer)
+    bad_timestamp = json.loads(make_tick('zone_b', 0).value())
+    bad_timestamp['timestamp'] = "not-a-time"
+    
+    sink.add_messages([
+        make_tick('zone_a', 0, actual_mw="n/a"),
+        make_tick('zone_a', 1, actual_mw=float('nan')),
+        make_message('grid-consumption-raw', bad_timestamp),
+        make_message('grid-consumption-raw', dict(bad_timestamp, timestamp=1752908400)),
+        make_message('demand-forecasts-15m', {"timestamp": "2026-07-19T07:00:00Z", "forecast_target_time": "soon",
+                                              "region_id": "zone_a", "predicted_mw": 44.1}),
+        make_message(sink_main.SIGNALS_TOPIC, {"signal_timestamp": "2026-07-19T07:00:00Z", "region_id": None,
+                                                 "signal_type": "HOLD"}),
+        make_tick('zone_a', 2, actual_mw="40.5")
+    ])
+    
+    assert sink.stats['invalid'] == 6
+    assert writer.flush() == 1
+    assert cursor.copied[0][1].splitlines() == ["2026-07-19T07:02:00Z,zone_a,40.5,12.4,150.0"]
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -1,4 +1,5 @@
 import pytest
+import importlib.util
 import json
 import sys
 import os
@@ -6,6 +7,12 @@ import os
 # Add services to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../services/trading_engine'))
 
+# Load by path: every service entry point is named main.py
+spec = importlib.util.spec_from_file_location(
+    'trading_engine_main', os.path.join(os.path.dirname(__file__), '../services/trading_engine/main.py'))
+trading_engine = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(trading_engine)
+
 def test_imbalance_calculation():
     """Test imbalance calculation logic"""
     predicted_generation = 44.0
@@ -66,5 +73,23 @@ def test_forecast_message_structure():
     assert 'region_id' in forecast
     assert isinstance(forecast['predicted_mw'], float)
 
+def test_evaluate_position_signals():
+    """Test forecasts are turned into the signal payloads written to trading_signals"""
+    commitments = {"wind_farm_zone_1": 40.0}
+    forecast = {"timestamp": "2026-07-19T07:00:00Z", "region_id": "wind_farm_zone_1", "predicted_mw": 44.1}
+    
+    signal = trading_engine.evaluate_position(forecast, threshold=2.5, commitments=commitments)
+    
+    assert signal == {
+        "signal_timestamp": "2026-07-19T07:00:00Z",
+        "region_id": "wind_farm_zone_1",
+        "signal_type": "SELL_SHORT",
+        "imbalance_mw": 4.1,
+        "predicted_generation_mw": 44.1,
+        "committed_mw": 40.0
+    }
+    assert trading_engine.evaluate_position({**forecast, "predicted_mw": 36.0}, 2.5, commitments)["signal_type"] == "BUY_LONG"
+    assert trading_engine.evaluate_position({**forecast, "predicted_mw": 41.0}, 2.5, commitments)["signal_type"] == "HOLD"
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
@@ -0,0 +1,62 @@
+import pytest
+import sys
+import os
+import numpy as np
+
+# Add training scripts to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../training'))
+
+def reference_sequences(data, window_size, horizon):
+    """Copying construction the windows must match"""
+    X = [data[i:i+window_size] for i in range(len(data) - window_size - horizon + 1)]
+    y = [data[i+window_size+horizon-1, 0] for i in range(len(data) - window_size - horizon + 1)]
+    return np.array(X), np.array(y)
+
+def test_create_sequences_are_views():
+    """Test windows equal the copied sequences without copying the series"""
+    from train_lstm import create_sequences
+    
+    data = np.random.default_rng(0).random((500, 3), dtype=np.float32)
+    X, y = create_sequences(data, 96, 4)
+    X_ref, y_ref = reference_sequences(data, 96, 4)
+    
+    assert X.shape == X_ref.shape == (401, 96, 3)
+    np.testing.assert_array_equal(X, X_ref)
+    np.testing.assert_array_equal(y[:len(X)], y_ref)
+    assert np.shares_memory(X, data)
+    assert np.shares_memory(y, data)
+
+def test_window_dataset_batches_match_sequences():
+    """Test lazily gathered batches hold the same windows and targets, split chronologically"""
+    import tensorflow as tf
+    from train_lstm import create_sequences, split_indices, window_dataset
+    
+    data = np.random.default_rng(1).random((300, 3), dtype=np.float32)
+    X, y = create_sequences(data, 96, 1)
+    train_range, val_range, test_range = split_indices(len(X))
+    
+    assert train_range[0] == 0 and train_range[1] == val_range[0] and val_range[1] == test_range[0]
+    assert test_range == (len(X) - 41, len(X))
+    
+    dataset = window_dataset(tf.constant(data), 96, 1, *val_range, batch_size=16)
+    windows, targets = zip(*[(w.numpy(), t.numpy()) for w, t in dataset])
+    
+    np.testing.assert_array_equal(np.concatenate(windows), X[val_range[0]:val_range[1]])
+    np.testing.assert_array_equal(np.concatenate(targets)[:, 0], y[val_range[0]:val_range[1]])
+    assert windows[0].shape == (16, 96, 3)
+
+def test_shuffled_window_dataset_covers_every_window_once():
+    """Test training batches are reshuffled but still contain each window exactly once"""
+    import tensorflow as tf
+    from train_lstm import window_dataset
+    
+    data = np.arange(200 * 3, dtype=np.float32).reshape(200, 3)
+    dataset = window_dataset(tf.constant(data), 10, 1, 0, 150, batch_size=32, shuffle=True, seed=0)
+    
+    first_steps = np.concatenate([w.numpy()[:, 0, 0] for w, _ in dataset]) / 3
+    
+    assert sorted(first_steps.astype(int)) == list(range(150))
+    assert list(first_steps.astype(int)) != list(range(150))
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
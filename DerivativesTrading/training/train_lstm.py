@@ -1,7 +1,8 @@
+import math
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from sklearn.preprocessing import MinMaxScaler
-from sklearn.model_selection import train_test_split
 import tensorflow as tf
 from tensorflow.keras.models import Sequential
 from tensorflow.keras.layers import LSTM, Dense, Dropout
@@ -16,6 +17,9 @@ HORIZON_LENGTH = 1      # Predict next 15-minute interval
 LSTM_UNITS_L1 = 64
 LSTM_UNITS_L2 = 32
 DROPOUT_RATE = 0.2
+BATCH_SIZE = 32
+TEST_SPLIT = 0.2
+VALIDATION_SPLIT = 0.2  # Of the training windows
 
 def load_and_prepare_data(data_path):
     """Load and prepare time series data"""
@@ -30,12 +34,56 @@ def load_and_prepare_data(data_path):
     return df
 
 def create_sequences(data, window_size, horizon):
-    """Create supervised learning sequences"""
-    X, y = [], []
-    for i in range(len(data) - window_size - horizon + 1):
-        X.append(data[i:i+window_size])
-        y.append(data[i+window_size+horizon-1, 0])  # Target: actual_mw
-    return np.array(X), np.array(y)
+    """
+    Create supervised learning sequences as read-only views of data.
+
+    X[i] is data[i:i+window_size] and y[i] the actual_mw horizon steps after
+    it; neither copies data, so memory stays at the size of the series.
+    """
+    num_windows = len(data) - window_size - horizon + 1
+    X = sliding_window_view(data, window_size, axis=0)[:num_windows].transpose(0, 2, 1)
+    y = data[window_size + horizon - 1:, 0]  # Target: actual_mw
+    return X, y
+
+def split_indices(num_windows, test_split=TEST_SPLIT, validation_split=VALIDATION_SPLIT):
+    """
+    Chronological train/validation/test ranges of window start indices.
+
+    Matches train_test_split(shuffle=False) for the test set and Keras
+    validation_split (the last windows of the training set) for validation.
+    """
+    test_start = num_windows - math.ceil(num_windows * test_split)
+    val_start = int(test_start * (1 - validation_split))
+    return (0, val_start), (val_start, test_start), (test_start, num_windows)
+
+def window_dataset(series, window_size, horizon, start, stop, batch_size=BATCH_SIZE, shuffle=False, seed=None):
+    """
+    Batches of (windows, targets) for window start indices [start, stop).
+
+    Only the start indices go through the pipeline; each batch gathers its
+    windows from the series tensor when it is consumed, so no array of all
+    windows is ever built.
+
+    Args:
+        series: Scaled features tensor of shape (time steps, NUM_FEATURES)
+        window_size: Time steps per window
+        horizon: Steps from the last window step to the target
+        start, stop: Range of window start indices
+        batch_size: Windows per batch
+        shuffle: Reshuffle the windows every epoch
+        seed: Shuffle seed
+    """
+    offsets = tf.range(window_size, dtype=tf.int64)
+
+    def gather(indices):
+        windows = tf.gather(series, indices[:, None] + offsets)
+        targets = tf.gather(series[:, 0], indices + window_size + horizon - 1)
+        return windows, targets[:, None]
+
+    dataset = tf.data.Dataset.range(start, stop)
+    if shuffle:
+        dataset = dataset.shuffle(stop - start, seed=seed, reshuffle_each_iteration=True)
+    return dataset.batch(batch_size).map(gather, num_parallel_calls=tf.data.AUTOTUNE).prefetch(tf.data.AUTOTUNE)
 
 def build_lstm_model():
     """Build LSTM model architecture"""
@@ -69,24 +117,26 @@ def train_model(data_path, output_dir, epochs=100):
     
     # Scale features
     scaler = MinMaxScaler(feature_range=(0, 1))
-    scaled_features = scaler.fit_transform(features)
+    scaled_features = scaler.fit_transform(features).astype(np.float32)
     
     # Save scaler parameters
     os.makedirs(output_dir, exist_ok=True)
     np.save(os.path.join(output_dir, 'scaler_min.npy'), scaler.data_min_)
     np.save(os.path.join(output_dir, 'scaler_max.npy'), scaler.data_max_)
     
-    # Create sequences
+    # Create sequences: windows are gathered per batch from the scaled series
     print("Creating sequences...")
-    X, y = create_sequences(scaled_features, WINDOW_LENGTH, HORIZON_LENGTH)
+    series = tf.constant(scaled_features)
+    num_windows = len(scaled_features) - WINDOW_LENGTH - HORIZON_LENGTH + 1
+    train_range, val_range, test_range = split_indices(num_windows)
     
-    # Train/test split
-    X_train, X_test, y_train, y_test = train_test_split(
-        X, y, test_size=0.2, shuffle=False
-    )
+    train_ds = window_dataset(series, WINDOW_LENGTH, HORIZON_LENGTH, *train_range, shuffle=True)
+    val_ds = window_dataset(series, WINDOW_LENGTH, HORIZON_LENGTH, *val_range)
+    test_ds = window_dataset(series, WINDOW_LENGTH, HORIZON_LENGTH, *test_range)
     
-    print(f"Training samples: {len(X_train)}")
-    print(f"Test samples: {len(X_test)}")
+    print(f"Training samples: {train_range[1] - train_range[0]}")
+    print(f"Validation samples: {val_range[1] - val_range[0]}")
+    print(f"Test samples: {test_range[1] - test_range[0]}")
     
     # Build model
     print("Building model...")
@@ -109,17 +159,16 @@ def train_model(data_path, output_dir, epochs=100):
     # Train model
     print("Training model...")
     history = model.fit(
-        X_train, y_train,
+        train_ds,
         epochs=epochs,
-        batch_size=32,
-        validation_split=0.2,
+        validation_data=val_ds,
         callbacks=[early_stop, checkpoint],
         verbose=1
     )
     
     # Evaluate on test set
     print("Evaluating model...")
-    test_loss, test_mae = model.evaluate(X_test, y_test, verbose=0)
+    test_loss, test_mae = model.evaluate(test_ds, verbose=0)
     print(f"Test Loss (MSE): {test_loss:.4f}")
     print(f"Test MAE: {test_mae:.4f}")
     